@@ -5,7 +5,7 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.core.config import settings
-from app.models import borrower, loan, payment
+from app.models import borrower, loan, payment, payment_transaction, sync, snapshot, borrower_stats, payment_archive, penalty, job, scheduler_state, audit, collection_batch
 from sqlmodel import SQLModel
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,37 @@
+"""add audit log
+
+Revision ID: add_audit_log
+Revises: add_scheduler_state
+Create Date: 2025-07-03 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_audit_log'
+down_revision = 'add_scheduler_state'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_log",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=True),
+        sa.Column("actor", sa.String, nullable=False),
+        sa.Column("entity", sa.String, nullable=False),
+        sa.Column("entity_id", sa.Integer, nullable=True),
+        sa.Column("action", sa.String, nullable=False),
+        sa.Column("changes", sa.JSON, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_audit_log_user_id_created_at", "audit_log", ["user_id", "created_at"])
+    op.create_index("ix_audit_log_user_id_entity_entity_id", "audit_log", ["user_id", "entity", "entity_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_log_user_id_entity_entity_id", table_name="audit_log")
+    op.drop_index("ix_audit_log_user_id_created_at", table_name="audit_log")
+    op.drop_table("audit_log")
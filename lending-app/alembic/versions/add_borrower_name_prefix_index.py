@@ -0,0 +1,32 @@
+"""add borrower name prefix index
+
+Revision ID: add_borrower_name_prefix_index
+Revises: add_missing_borrower_stats
+Create Date: 2025-07-04 00:10:00.000000
+
+Borrower search answers one and two character queries with a name prefix
+match, which the trigram indexes cannot serve.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_borrower_name_prefix_index'
+down_revision = 'add_missing_borrower_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Only Postgres searches in SQL; other databases use the in-process index
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_borrower_user_id_lower_name "
+                "ON borrower (user_id, lower(name) text_pattern_ops)"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_borrower_user_id_lower_name")
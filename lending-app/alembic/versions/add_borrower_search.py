@@ -0,0 +1,46 @@
+"""add borrower search
+
+Revision ID: add_borrower_search
+Revises: add_borrower_stats
+Create Date: 2025-06-24 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import re
+
+# revision identifiers, used by Alembic.
+revision = 'add_borrower_search'
+down_revision = 'add_borrower_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('borrower', sa.Column('mobile_digits', sa.String, nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE borrower SET mobile_digits = NULLIF(ltrim(regexp_replace(mobile, '\\D', '', 'g'), '0'), '') "
+            "WHERE mobile IS NOT NULL"
+        )
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_borrower_name_trgm ON borrower USING gin (lower(name) gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_borrower_mobile_digits_trgm ON borrower USING gin (mobile_digits gin_trgm_ops)")
+    else:
+        # Same normalization as app.core.search.normalize_mobile
+        rows = bind.execute(sa.text("SELECT id, mobile FROM borrower WHERE mobile IS NOT NULL")).all()
+        for borrower_id, mobile in rows:
+            digits = re.sub(r'\D', '', mobile).lstrip('0') or None
+            bind.execute(
+                sa.text("UPDATE borrower SET mobile_digits = :digits WHERE id = :id"),
+                {"digits": digits, "id": borrower_id}
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_borrower_mobile_digits_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_borrower_name_trgm")
+    op.drop_column('borrower', 'mobile_digits')
@@ -0,0 +1,39 @@
+"""add borrower stats
+
+Revision ID: add_borrower_stats
+Revises: add_portfolio_snapshot
+Create Date: 2025-06-23 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_borrower_stats'
+down_revision = 'add_portfolio_snapshot'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "borrower_stats",
+        sa.Column("borrower_id", sa.Integer, sa.ForeignKey("borrower.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False, index=True),
+        sa.Column("installments_due", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("missed_installments", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("late_settlements", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("total_days_late", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("arrears", sa.Float, nullable=False, server_default='0'),
+        sa.Column("on_time_ratio", sa.Float, nullable=False, server_default='1'),
+        sa.Column("avg_days_late", sa.Float, nullable=False, server_default='0'),
+        sa.Column("risk_score", sa.Float, nullable=False, server_default='0'),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    op.create_index('ix_borrower_stats_user_id_risk_score', 'borrower_stats', ['user_id', 'risk_score'])
+    # Empty rows for existing borrowers; the nightly recompute job fills in the counters
+    op.execute("INSERT INTO borrower_stats (borrower_id, user_id) SELECT id, user_id FROM borrower")
+
+
+def downgrade() -> None:
+    op.drop_table("borrower_stats")
@@ -0,0 +1,31 @@
+"""add collection batch
+
+Revision ID: add_collection_batch
+Revises: add_borrower_name_prefix_index
+Create Date: 2025-07-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_collection_batch'
+down_revision = 'add_borrower_name_prefix_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "collection_batch",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False),
+        sa.Column("collection_id", sa.String, nullable=False),
+        sa.Column("results", sa.JSON, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("user_id", "collection_id", name="uq_collection_batch_user_id_collection_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("collection_batch")
@@ -0,0 +1,31 @@
+"""add installment components
+
+Revision ID: add_installment_components
+Revises: add_jobs
+Create Date: 2025-07-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_installment_components'
+down_revision = 'add_jobs'
+branch_labels = None
+depends_on = None
+
+# Nullable without a default, so adding them does not rewrite the tables.
+# Existing rows are filled by the backfill_installment_components revision.
+TABLES = ('payment', 'payment_archive')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('principal_due', sa.Float, nullable=True))
+        op.add_column(table, sa.Column('interest_due', sa.Float, nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, 'interest_due')
+        op.drop_column(table, 'principal_due')
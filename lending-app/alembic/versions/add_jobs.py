@@ -0,0 +1,46 @@
+"""add jobs
+
+Revision ID: add_jobs
+Revises: add_loan_balance_columns
+Create Date: 2025-06-30 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_jobs'
+down_revision = 'add_loan_balance_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job",
+        sa.Column("id", sa.String, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False),
+        sa.Column("kind", sa.String, nullable=False),
+        sa.Column("params", sa.JSON, nullable=False),
+        sa.Column("status", sa.String, nullable=False, server_default='queued'),
+        sa.Column("progress", sa.Float, nullable=False, server_default='0'),
+        sa.Column("progress_message", sa.String, nullable=True),
+        sa.Column("result", sa.JSON, nullable=True),
+        sa.Column("error", sa.String, nullable=True),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("max_attempts", sa.Integer, nullable=False, server_default='3'),
+        sa.Column("cancel_requested", sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column("run_after", sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column("heartbeat_at", sa.DateTime, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime, nullable=True),
+        sa.Column("finished_at", sa.DateTime, nullable=True),
+    )
+    op.create_index("ix_job_status_run_after", "job", ["status", "run_after"])
+    op.create_index("ix_job_user_id_created_at", "job", ["user_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_user_id_created_at", table_name="job")
+    op.drop_index("ix_job_status_run_after", table_name="job")
+    op.drop_table("job")
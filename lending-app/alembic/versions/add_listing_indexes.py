@@ -0,0 +1,34 @@
+"""add listing indexes
+
+Revision ID: add_listing_indexes
+Revises: add_borrower_search
+Create Date: 2025-06-25 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_listing_indexes'
+down_revision = 'add_borrower_search'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_loan_user_id_status_start_date', 'loan', ['user_id', 'status', 'start_date']),
+    ('ix_loan_user_id_borrower_id', 'loan', ['user_id', 'borrower_id']),
+    ('ix_loan_user_id_created_at', 'loan', ['user_id', 'created_at']),
+    ('ix_loan_user_id_principal', 'loan', ['user_id', 'principal']),
+    ('ix_payment_user_id_due_date', 'payment', ['user_id', 'due_date']),
+    ('ix_payment_user_id_paid_at', 'payment', ['user_id', 'paid_at']),
+    ('ix_payment_loan_id_due_date', 'payment', ['loan_id', 'due_date']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""add loan balance columns
+
+Revision ID: add_loan_balance_columns
+Revises: add_penalties
+Create Date: 2025-06-29 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_loan_balance_columns'
+down_revision = 'add_penalties'
+branch_labels = None
+depends_on = None
+
+HISTORY = "(SELECT loan_id, due_date, amount_due, amount_paid, paid_at FROM payment UNION ALL SELECT loan_id, due_date, amount_due, amount_paid, paid_at FROM payment_archive)"
+
+
+def upgrade() -> None:
+    op.add_column('loan', sa.Column('outstanding_amount', sa.Float, nullable=False, server_default='0'))
+    op.add_column('loan', sa.Column('paid_installments', sa.Integer, nullable=False, server_default='0'))
+    op.add_column('loan', sa.Column('next_due_date', sa.Date, nullable=True))
+    op.add_column('loan', sa.Column('last_paid_at', sa.DateTime, nullable=True))
+
+    op.execute(
+        f"UPDATE loan SET "
+        f"outstanding_amount = COALESCE((SELECT CAST(ROUND(CAST(SUM(h.amount_due - h.amount_paid) AS NUMERIC), 2) AS FLOAT) "
+        f"FROM {HISTORY} h WHERE h.loan_id = loan.id AND h.amount_paid < h.amount_due), 0), "
+        f"paid_installments = (SELECT COUNT(*) FROM {HISTORY} h WHERE h.loan_id = loan.id AND h.amount_paid >= h.amount_due), "
+        f"next_due_date = (SELECT MIN(h.due_date) FROM {HISTORY} h WHERE h.loan_id = loan.id AND h.amount_paid < h.amount_due), "
+        f"last_paid_at = (SELECT MAX(h.paid_at) FROM {HISTORY} h WHERE h.loan_id = loan.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('loan', 'last_paid_at')
+    op.drop_column('loan', 'next_due_date')
+    op.drop_column('loan', 'paid_installments')
+    op.drop_column('loan', 'outstanding_amount')
@@ -0,0 +1,30 @@
+"""add missing borrower stats
+
+Revision ID: add_missing_borrower_stats
+Revises: add_audit_log
+Create Date: 2025-07-04 00:00:00.000000
+
+Borrowers created before create_borrower started adding a stats row get an
+empty one, so borrower listings can inner join the stats.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_missing_borrower_stats'
+down_revision = 'add_audit_log'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "INSERT INTO borrower_stats (borrower_id, user_id, installments_due, missed_installments, late_settlements, "
+        "total_days_late, arrears, on_time_ratio, avg_days_late, risk_score, updated_at) "
+        "SELECT b.id, b.user_id, 0, 0, 0, 0, 0, 1, 0, 0, CURRENT_TIMESTAMP FROM borrower b "
+        "WHERE NOT EXISTS (SELECT 1 FROM borrower_stats s WHERE s.borrower_id = b.id)"
+    )
+
+
+def downgrade() -> None:
+    # The rows are indistinguishable from ones the stats jobs created
+    pass
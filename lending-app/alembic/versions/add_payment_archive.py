@@ -0,0 +1,44 @@
+"""add payment archive
+
+Revision ID: add_payment_archive
+Revises: add_listing_indexes
+Create Date: 2025-06-26 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_payment_archive'
+down_revision = 'add_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('loan', sa.Column('closed_at', sa.DateTime, nullable=True))
+    # Loans closed before this revision count as closed since their last change
+    op.execute("UPDATE loan SET closed_at = updated_at WHERE status IN ('completed', 'cancelled')")
+
+    op.create_table(
+        "payment_archive",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("user_id", sa.String, nullable=False, index=True),
+        sa.Column("loan_id", sa.Integer, sa.ForeignKey("loan.id", ondelete="CASCADE"), nullable=False, index=True),
+        sa.Column("due_date", sa.Date, nullable=False),
+        sa.Column("amount_due", sa.Float, nullable=False),
+        sa.Column("amount_paid", sa.Float, nullable=False, server_default='0'),
+        sa.Column("paid_at", sa.DateTime, nullable=True),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("change_seq", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("archived_at", sa.DateTime, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "INSERT INTO payment (id, user_id, loan_id, due_date, amount_due, amount_paid, paid_at, updated_at, change_seq) "
+        "SELECT id, user_id, loan_id, due_date, amount_due, amount_paid, paid_at, updated_at, change_seq FROM payment_archive"
+    )
+    op.drop_table("payment_archive")
+    op.drop_column('loan', 'closed_at')
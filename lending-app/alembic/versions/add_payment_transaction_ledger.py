@@ -0,0 +1,39 @@
+"""add payment transaction ledger
+
+Revision ID: add_payment_transaction_ledger
+Revises: d44382c0362c
+Create Date: 2025-06-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_payment_transaction_ledger'
+down_revision = 'd44382c0362c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "payment_transaction",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False, index=True),
+        sa.Column("loan_id", sa.Integer, sa.ForeignKey("loan.id", ondelete="CASCADE"), nullable=False, index=True),
+        sa.Column("payment_id", sa.Integer, nullable=True, index=True),
+        sa.Column("collection_id", sa.String, nullable=False, index=True),
+        sa.Column("amount", sa.Float, nullable=False),
+        sa.Column("paid_at", sa.DateTime, nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    # Opening balances so that amount_paid == SUM(ledger) holds for existing rows
+    op.execute(
+        "INSERT INTO payment_transaction (user_id, loan_id, payment_id, collection_id, amount, paid_at, created_at) "
+        "SELECT user_id, loan_id, id, 'opening-balance', amount_paid, COALESCE(paid_at, CURRENT_TIMESTAMP), CURRENT_TIMESTAMP "
+        "FROM payment WHERE amount_paid > 0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("payment_transaction")
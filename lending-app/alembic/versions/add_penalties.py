@@ -0,0 +1,57 @@
+"""add penalties
+
+Revision ID: add_penalties
+Revises: add_payment_archive
+Create Date: 2025-06-28 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_penalties'
+down_revision = 'add_payment_archive'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('payment', sa.Column('penalty_amount', sa.Float, nullable=False, server_default='0'))
+    op.add_column('payment_archive', sa.Column('penalty_amount', sa.Float, nullable=False, server_default='0'))
+
+    op.create_table(
+        "penalty_rule",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False),
+        sa.Column("loan_id", sa.Integer, sa.ForeignKey("loan.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("grace_days", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("flat_fee", sa.Float, nullable=False, server_default='0'),
+        sa.Column("daily_rate_percent", sa.Float, nullable=False, server_default='0'),
+        sa.Column("max_penalty", sa.Float, nullable=True),
+        sa.Column("max_penalty_percent", sa.Float, nullable=True),
+        sa.Column("is_active", sa.Boolean, nullable=False, server_default=sa.true()),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    op.create_index("ix_penalty_rule_user_id_loan_id", "penalty_rule", ["user_id", "loan_id"])
+
+    op.create_table(
+        "penalty_charge",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False, index=True),
+        sa.Column("loan_id", sa.Integer, sa.ForeignKey("loan.id", ondelete="CASCADE"), nullable=False, index=True),
+        sa.Column("payment_id", sa.Integer, nullable=False),
+        sa.Column("rule_id", sa.Integer, nullable=True),
+        sa.Column("charge_date", sa.Date, nullable=False),
+        sa.Column("amount", sa.Float, nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.UniqueConstraint("payment_id", "charge_date", name="uq_penalty_charge_payment_id_charge_date"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("penalty_charge")
+    op.drop_index("ix_penalty_rule_user_id_loan_id", table_name="penalty_rule")
+    op.drop_table("penalty_rule")
+    op.drop_column('payment_archive', 'penalty_amount')
+    op.drop_column('payment', 'penalty_amount')
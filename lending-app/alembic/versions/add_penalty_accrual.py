@@ -0,0 +1,33 @@
+"""add penalty accrual watermark
+
+Revision ID: add_penalty_accrual
+Revises: add_collection_batch
+Create Date: 2025-07-05 00:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_penalty_accrual'
+down_revision = 'add_collection_batch'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "penalty_accrual",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("accrued_through", sa.Date, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+    # Resume from the last charged day, which is where the job used to restart
+    op.execute(
+        "INSERT INTO penalty_accrual (id, accrued_through, updated_at) "
+        "SELECT 1, MAX(charge_date), CURRENT_TIMESTAMP FROM penalty_charge HAVING MAX(charge_date) IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("penalty_accrual")
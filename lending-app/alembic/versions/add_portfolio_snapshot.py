@@ -0,0 +1,38 @@
+"""add portfolio snapshot
+
+Revision ID: add_portfolio_snapshot
+Revises: add_sync_change_feed
+Create Date: 2025-06-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_portfolio_snapshot'
+down_revision = 'add_sync_change_feed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_snapshot",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False),
+        sa.Column("snapshot_date", sa.Date, nullable=False),
+        sa.Column("borrowers", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("active_loans", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("outstanding", sa.Float, nullable=False, server_default='0'),
+        sa.Column("collected", sa.Float, nullable=False, server_default='0'),
+        sa.Column("overdue_1_7", sa.Float, nullable=False, server_default='0'),
+        sa.Column("overdue_8_30", sa.Float, nullable=False, server_default='0'),
+        sa.Column("overdue_31_60", sa.Float, nullable=False, server_default='0'),
+        sa.Column("overdue_over_60", sa.Float, nullable=False, server_default='0'),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.UniqueConstraint("user_id", "snapshot_date", name="uq_portfolio_snapshot_user_id_date"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_snapshot")
@@ -0,0 +1,44 @@
+"""add scheduler lease and job state
+
+Revision ID: add_scheduler_state
+Revises: backfill_installment_components
+Create Date: 2025-07-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_scheduler_state'
+down_revision = 'backfill_installment_components'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduler_lease",
+        sa.Column("name", sa.String, primary_key=True),
+        sa.Column("holder", sa.String, nullable=False),
+        sa.Column("acquired_at", sa.DateTime, nullable=False),
+        sa.Column("expires_at", sa.DateTime, nullable=False),
+    )
+    op.create_table(
+        "scheduled_job_state",
+        sa.Column("name", sa.String, primary_key=True),
+        sa.Column("last_scheduled_for", sa.DateTime, nullable=True),
+        sa.Column("last_started_at", sa.DateTime, nullable=True),
+        sa.Column("last_finished_at", sa.DateTime, nullable=True),
+        sa.Column("last_duration_seconds", sa.Float, nullable=True),
+        sa.Column("last_lag_seconds", sa.Float, nullable=True),
+        sa.Column("last_status", sa.String, nullable=True),
+        sa.Column("last_error", sa.String, nullable=True),
+        sa.Column("last_holder", sa.String, nullable=True),
+        sa.Column("run_count", sa.Integer, nullable=False, server_default='0'),
+        sa.Column("failure_count", sa.Integer, nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("scheduled_job_state")
+    op.drop_table("scheduler_lease")
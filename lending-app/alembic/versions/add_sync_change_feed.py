@@ -0,0 +1,50 @@
+"""add sync change feed
+
+Revision ID: add_sync_change_feed
+Revises: add_payment_transaction_ledger
+Create Date: 2025-06-09 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_sync_change_feed'
+down_revision = 'add_payment_transaction_ledger'
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ("borrower", "loan", "payment")
+
+
+def upgrade() -> None:
+    for table in SYNCED_TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime, server_default=sa.func.now(), nullable=False))
+        # Existing rows start at 0, so the first sync with since=0 returns them all
+        op.add_column(table, sa.Column('change_seq', sa.Integer, server_default='0', nullable=False))
+        op.create_index(f'ix_{table}_user_id_change_seq', table, ['user_id', 'change_seq'])
+
+    op.create_table(
+        "sync_state",
+        sa.Column("user_id", sa.String, primary_key=True),
+        sa.Column("last_seq", sa.Integer, nullable=False, server_default='0'),
+    )
+    op.create_table(
+        "sync_tombstone",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.String, nullable=False),
+        sa.Column("entity", sa.String, nullable=False),
+        sa.Column("entity_id", sa.Integer, nullable=False),
+        sa.Column("change_seq", sa.Integer, nullable=False),
+        sa.Column("deleted_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    op.create_index('ix_sync_tombstone_user_id_change_seq', 'sync_tombstone', ['user_id', 'change_seq'])
+
+
+def downgrade() -> None:
+    op.drop_table("sync_tombstone")
+    op.drop_table("sync_state")
+    for table in SYNCED_TABLES:
+        op.drop_index(f'ix_{table}_user_id_change_seq', table_name=table)
+        op.drop_column(table, 'change_seq')
+        op.drop_column(table, 'updated_at')
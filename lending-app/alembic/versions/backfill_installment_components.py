@@ -0,0 +1,143 @@
+"""backfill installment components
+
+Revision ID: backfill_installment_components
+Revises: add_installment_components
+Create Date: 2025-07-01 00:10:00.000000
+
+Fills principal_due and interest_due from each loan's schedule, a batch of
+loans per transaction, see app/core/backfill.py. Installments that no longer
+match the schedule (edited by hand), and those of loans whose terms cannot be
+scheduled, are left NULL.
+
+The split is a frozen copy of app/core/schedule.py as of this revision, so
+later changes to the schedule code cannot change what this migration writes.
+"""
+from alembic import op
+import sqlalchemy as sa
+from itertools import groupby
+
+from app.core.backfill import Backfill, run_in_migration
+
+# revision identifiers, used by Alembic.
+revision = 'backfill_installment_components'
+down_revision = 'add_installment_components'
+branch_labels = None
+depends_on = None
+
+loan = sa.table(
+    'loan',
+    sa.column('id', sa.Integer),
+    sa.column('principal', sa.Float),
+    sa.column('interest_rate_percent', sa.Float),
+    sa.column('term_units', sa.Integer),
+    sa.column('term_frequency', sa.String),
+    sa.column('repayment_type', sa.String),
+    sa.column('interest_cycle', sa.String),
+    sa.column('start_date', sa.Date),
+)
+INSTALLMENT_TABLES = [
+    sa.table(
+        name,
+        sa.column('id', sa.Integer),
+        sa.column('loan_id', sa.Integer),
+        sa.column('due_date', sa.Date),
+        sa.column('amount_due', sa.Float),
+        sa.column('principal_due', sa.Float),
+        sa.column('interest_due', sa.Float),
+    )
+    for name in ('payment', 'payment_archive')
+]
+PERIODS_PER_YEAR = {"daily": 365, "weekly": 52, "monthly": 12, "quarterly": 4, "yearly": 1}
+CYCLES_PER_YEAR = {"daily": 365, "weekly": 52, "monthly": 12, "yearly": 1, "one-time": 1}
+UPDATE_CHUNK = 500  # installments per UPDATE
+
+
+def planned_splits(principal, interest_rate_percent, term_units, term_frequency, repayment_type, interest_cycle):
+    """(amount_due, principal, interest) of each installment, in due date order."""
+    principal = round(float(principal), 2)
+    term_frequency = term_frequency.lower()
+    annual_rate = float(interest_rate_percent) * CYCLES_PER_YEAR.get((interest_cycle or 'yearly').lower(), 1)
+    rate = annual_rate / PERIODS_PER_YEAR.get(term_frequency, 1) / 100
+
+    if repayment_type.lower() == 'flat':
+        interest_per_period = principal * rate
+        principal_per_period = principal / term_units
+        payment_amount = principal_per_period + interest_per_period
+    elif rate:
+        payment_amount = principal * rate / (1 - (1 + rate) ** (-term_units))
+    else:
+        payment_amount = principal / term_units
+
+    splits = []
+    remaining_principal = principal
+    for _ in range(int(term_units)):
+        if repayment_type.lower() == 'flat':
+            interest_payment, principal_payment = interest_per_period, principal_per_period
+        else:
+            interest_payment = remaining_principal * rate
+            principal_payment = payment_amount - interest_payment
+        remaining_principal -= principal_payment
+        splits.append((round(payment_amount, 2), round(principal_payment, 2), round(interest_payment, 2)))
+    return splits
+
+
+def fill_components(connection, loan_ids):
+    schedules = {}
+    for row in connection.execute(sa.select(loan).where(loan.c.id.in_(loan_ids))):
+        try:
+            schedules[row.id] = planned_splits(
+                row.principal, row.interest_rate_percent, row.term_units, row.term_frequency,
+                row.repayment_type, row.interest_cycle
+            )
+        except (ArithmeticError, ValueError, TypeError) as e:
+            # One bad loan must not block the upgrade
+            print(f"[BACKFILL] installment_components: skipping loan {row.id}: {type(e).__name__}: {e}")
+    changed = 0
+    for table in INSTALLMENT_TABLES:
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.loan_id, table.c.amount_due)
+            .where(table.c.loan_id.in_(loan_ids))
+            .order_by(table.c.loan_id, table.c.due_date, table.c.id)
+        ).all()
+        updates = {}
+        for loan_id, installments in groupby(rows, key=lambda row: row.loan_id):
+            for row, (amount_due, principal, interest) in zip(installments, schedules.get(loan_id, ())):
+                if abs(row.amount_due - amount_due) < 0.01:
+                    updates[row.id] = (principal, interest)
+        ids = list(updates)
+        for start in range(0, len(ids), UPDATE_CHUNK):
+            chunk = ids[start:start + UPDATE_CHUNK]
+            # One statement per chunk rather than executemany, whose rowcount
+            # the Postgres drivers do not report reliably
+            result = connection.execute(
+                table.update()
+                .where(table.c.id.in_(chunk))
+                .where(table.c.interest_due.is_(None))
+                .values(
+                    principal_due=sa.case({i: updates[i][0] for i in chunk}, value=table.c.id),
+                    interest_due=sa.case({i: updates[i][1] for i in chunk}, value=table.c.id),
+                )
+            )
+            changed += result.rowcount
+    return changed
+
+
+BACKFILL = Backfill(
+    name='installment_components',
+    table='loan',
+    where=(
+        "EXISTS (SELECT 1 FROM payment p WHERE p.loan_id = loan.id AND p.interest_due IS NULL) "
+        "OR EXISTS (SELECT 1 FROM payment_archive a WHERE a.loan_id = loan.id AND a.interest_due IS NULL)"
+    ),
+    process=fill_components,
+)
+
+
+def upgrade() -> None:
+    run_in_migration(op, BACKFILL)
+
+
+def downgrade() -> None:
+    # The columns go away with add_installment_components; clear the checkpoint
+    # so a later upgrade fills them again
+    op.execute("DELETE FROM backfill_checkpoint WHERE name = 'installment_components'")
@@ -0,0 +1,226 @@
+"""
+Per-user admission control.
+
+Every authenticated request needs slots before it reaches a router, one
+per database session it can hold at once, and slots are bounded per user and
+in total, so the limits also bound the sessions a user can hold. Most
+requests use one session. GET /dashboard/bootstrap loads its sections on up
+to DASHBOARD_BOOTSTRAP_CONCURRENCY sessions at once and takes that many
+slots. The total limit is kept at the engine's pool size plus overflow.
+
+When no slot is free the request waits in its user's queue, ordered by
+priority (writes such as collections first, analytics and exports last) and
+then arrival. A freed slot goes to the waiting user with the fewest requests
+in flight, so one tenant's bulk script cannot starve the others. Queues are
+bounded, and low priority requests may only fill half of one. Requests that
+find the queue full, or wait longer than the limit, get 429 with Retry-After.
+
+Long-lived streams (/events) and unauthenticated requests are not governed.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import time
+
+from app.core.config import settings
+
+WRITE, NORMAL, ANALYTICS = 0, 1, 2
+PRIORITY_NAMES = {WRITE: "write", NORMAL: "normal", ANALYTICS: "analytics"}
+ANALYTICS_PREFIXES = ("/dashboard", "/reports", "/statements")
+EXEMPT_PREFIXES = ("/events", "/docs", "/redoc", "/openapi.json", "/admission")
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+def request_weight(method: str, path: str) -> int:
+    """Slots a request takes: the database sessions it can hold at once."""
+    if method == "GET" and path.rstrip("/") == "/dashboard/bootstrap":
+        return settings.DASHBOARD_BOOTSTRAP_CONCURRENCY
+    return 1
+
+def request_priority(method: str, path: str) -> int:
+    if path.startswith(ANALYTICS_PREFIXES) or "export" in path:
+        return ANALYTICS
+    if method in WRITE_METHODS:
+        return WRITE
+    return NORMAL
+
+class Rejected(Exception):
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+@dataclass
+class TenantState:
+    in_flight: int = 0  # slots held
+    waiting: List[Tuple[int, int, int, asyncio.Future]] = field(default_factory=list)  # (priority, arrival, weight, future)
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    avg_seconds: float = 0.1  # moving average of request duration, for Retry-After
+
+class AdmissionController:
+    def __init__(self, per_user_limit: int, total_limit: int, max_queue: int, max_wait_seconds: float):
+        self.per_user_limit = per_user_limit
+        self.total_limit = total_limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.tenants: Dict[str, TenantState] = {}
+        self.in_flight = 0
+        self._arrivals = itertools.count()
+
+    def _retry_after(self, tenant: TenantState) -> int:
+        return max(1, math.ceil((len(tenant.waiting) + 1) * tenant.avg_seconds / self.per_user_limit))
+
+    def _fits(self, tenant: TenantState, weight: int) -> bool:
+        return tenant.in_flight + weight <= self.per_user_limit and self.in_flight + weight <= self.total_limit
+
+    def _admit(self, tenant: TenantState, weight: int) -> None:
+        tenant.in_flight += weight
+        tenant.admitted += 1
+        self.in_flight += weight
+
+    async def acquire(self, user_id: str, priority: int, weight: int = 1) -> None:
+        tenant = self.tenants.setdefault(user_id, TenantState())
+        weight = max(1, min(weight, self.per_user_limit, self.total_limit))
+        if not tenant.waiting and self._fits(tenant, weight):
+            self._admit(tenant, weight)
+            return
+
+        queue_limit = self.max_queue if priority < ANALYTICS else self.max_queue // 2
+        if len(tenant.waiting) >= queue_limit:
+            tenant.rejected += 1
+            raise Rejected(self._retry_after(tenant), "Too many requests queued for this account")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(tenant.waiting, (priority, next(self._arrivals), weight, future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return  # admitted just as the wait expired
+            future.cancel()
+            tenant.waiting = [entry for entry in tenant.waiting if entry[3] is not future]
+            heapq.heapify(tenant.waiting)
+            tenant.timed_out += 1
+            tenant.rejected += 1
+            raise Rejected(self._retry_after(tenant), "Request waited too long for a free slot")
+        except asyncio.CancelledError:
+            # Client went away; hand the slot on if we were granted one
+            if future.done() and not future.cancelled():
+                self.release(user_id, tenant.avg_seconds, weight)
+            else:
+                future.cancel()
+            raise
+
+    def release(self, user_id: str, seconds: float, weight: int = 1) -> None:
+        tenant = self.tenants[user_id]
+        weight = max(1, min(weight, self.per_user_limit, self.total_limit))
+        tenant.in_flight -= weight
+        self.in_flight -= weight
+        tenant.avg_seconds = 0.9 * tenant.avg_seconds + 0.1 * seconds
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.total_limit:
+            candidates = []
+            for user_id, tenant in self.tenants.items():
+                while tenant.waiting and tenant.waiting[0][3].cancelled():
+                    heapq.heappop(tenant.waiting)
+                if tenant.waiting and self._fits(tenant, tenant.waiting[0][2]):
+                    candidates.append((tenant.in_flight, tenant.waiting[0][0], tenant.waiting[0][1], user_id))
+            if not candidates:
+                return
+            *_, user_id = min(candidates)
+            tenant = self.tenants[user_id]
+            _, _, weight, future = heapq.heappop(tenant.waiting)
+            self._admit(tenant, weight)
+            future.set_result(None)
+
+    def stats(self, user_id: Optional[str] = None) -> Dict:
+        def tenant_stats(tenant: TenantState) -> Dict:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _, future in tenant.waiting:
+                if not future.cancelled():
+                    depth[PRIORITY_NAMES[priority]] += 1
+            return {
+                "in_flight": tenant.in_flight,
+                "queued": depth,
+                "admitted": tenant.admitted,
+                "rejected": tenant.rejected,
+                "timed_out": tenant.timed_out,
+                "avg_seconds": round(tenant.avg_seconds, 3),
+            }
+
+        result = {
+            "in_flight": self.in_flight,
+            "total_limit": self.total_limit,
+            "per_user_limit": self.per_user_limit,
+            "tenants": len(self.tenants),
+            "queued": sum(len(tenant.waiting) for tenant in self.tenants.values()),
+            "rejected": sum(tenant.rejected for tenant in self.tenants.values()),
+        }
+        if user_id is not None:
+            result["tenant"] = tenant_stats(self.tenants.get(user_id, TenantState()))
+        return result
+
+controller = AdmissionController(
+    per_user_limit=settings.ADMISSION_PER_USER_LIMIT,
+    total_limit=settings.ADMISSION_TOTAL_LIMIT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_wait_seconds=settings.ADMISSION_MAX_WAIT_SECONDS
+)
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController = controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        from app.core.auth import user_id_from_token
+        token = _bearer_token(scope)
+        user_id = user_id_from_token(token) if token else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        weight = request_weight(scope["method"], scope["path"])
+        try:
+            await self.controller.acquire(user_id, request_priority(scope["method"], scope["path"]), weight)
+        except Rejected as e:
+            await self._reject(send, e)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(user_id, time.monotonic() - started, weight)
+
+    async def _reject(self, send, rejected: Rejected) -> None:
+        body = json.dumps({"detail": rejected.reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejected.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,263 @@
+"""
+Write-behind audit log of changes to borrowers, loans and installments.
+
+Changes are captured from SQLAlchemy session events, so crud functions do
+not write audit rows themselves:
+
+- Flushed objects (`after_flush`) give one record each with the before and
+  after value of every changed column.
+- Set-based UPDATE and DELETE statements on those tables (`do_orm_execute`)
+  give one `bulk_*` record with the statement, its parameters and the row
+  count. Statements that record their own per-row changes with `record`,
+  or that only move or derive data, opt out with `execution_options(audit=False)`.
+
+Records wait in `session.info` until the transaction commits and are
+dropped on rollback. On commit they go into `writer`'s in-memory queue and a
+background task inserts them in batches, with one multi-row INSERT per batch,
+off the request path. When the queue holds AUDIT_BUFFER_SIZE records, or the
+writer is not running (serverless), the committing caller writes its own
+records before it continues. That keeps memory bounded and nothing is lost.
+
+The actor is the authenticated user (`current_actor`, set by
+get_current_user), the job's user for background jobs, or "system".
+"""
+from collections import deque
+from datetime import date, datetime
+from typing import Any, Deque, Dict, List, Optional
+import asyncio
+import traceback
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from app.core.auth import current_actor
+from app.core.config import settings
+from app.core.database import engine
+from app.models.audit import AuditLog
+from app.models.borrower import Borrower
+from app.models.loan import Loan
+from app.models.payment import Payment
+
+AUDITED = {Borrower: "borrower", Loan: "loan", Payment: "payment"}
+IGNORED_COLUMNS = {"updated_at", "change_seq"}  # bookkeeping, changes on every write
+MAX_STATEMENT_LENGTH = 2000
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_jsonable(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def _actor() -> str:
+    return current_actor.get() or "system"
+
+def _pending(session: Session) -> List[Dict[str, Any]]:
+    return session.info.setdefault("audit", [])
+
+def record(session, obj: Any, action: str, changes: Dict[str, List[Any]]) -> None:
+    """
+    Add a record for a change the unit of work does not see, such as a
+    set-based UPDATE of rows already loaded. `session` may be async.
+    """
+    record_row(session, type(obj), obj.id, getattr(obj, "user_id", None), action, changes)
+
+def record_row(session, model: type, entity_id: int, user_id: Optional[str], action: str, changes: Dict[str, List[Any]]) -> None:
+    """`record` for a row that was never loaded, known only by its key and owner."""
+    session = getattr(session, "sync_session", session)
+    _pending(session).append({
+        "user_id": user_id,
+        "actor": _actor(),
+        "entity": AUDITED[model],
+        "entity_id": entity_id,
+        "action": action,
+        "changes": _jsonable(changes),
+    })
+
+def _column_changes(obj: Any, action: str) -> Dict[str, List[Any]]:
+    state = inspect(obj)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in IGNORED_COLUMNS:
+            continue
+        if action == "insert":
+            value = state.dict.get(attr.key)
+            if value is not None:
+                changes[attr.key] = [None, value]
+        elif action == "delete":
+            value = state.dict.get(attr.key)
+            if value is not None:
+                changes[attr.key] = [value, None]
+        else:
+            history = state.attrs[attr.key].history
+            if not history.has_changes():
+                continue
+            before = history.deleted[0] if history.deleted else None
+            after = history.added[0] if history.added else None
+            if before != after:
+                changes[attr.key] = [before, after]
+    return changes
+
+@event.listens_for(Session, "after_flush")
+def _capture_flush(session: Session, flush_context) -> None:
+    # New, dirty and deleted still show the pre-flush state here, and ids are assigned
+    for action, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            if type(obj) not in AUDITED:
+                continue
+            changes = _column_changes(obj, action)
+            if not changes:
+                continue
+            _pending(session).append({
+                "user_id": getattr(obj, "user_id", None),
+                "actor": _actor(),
+                "entity": AUDITED[type(obj)],
+                "entity_id": obj.id,
+                "action": action,
+                "changes": _jsonable(changes),
+            })
+
+@event.listens_for(Session, "do_orm_execute")
+def _capture_statement(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    if orm_execute_state.execution_options.get("audit") is False:
+        return None
+    mapper = orm_execute_state.bind_mapper
+    entity = AUDITED.get(mapper.class_) if mapper is not None else None
+    if entity is None:
+        return None
+
+    result = orm_execute_state.invoke_statement()
+    if result.rowcount:
+        compiled = orm_execute_state.statement.compile(dialect=orm_execute_state.session.get_bind().dialect)
+        actor = _actor()
+        _pending(orm_execute_state.session).append({
+            # Requests only touch their user's rows; cross-user jobs have no single owner
+            "user_id": actor if current_actor.get() else None,
+            "actor": actor,
+            "entity": entity,
+            "entity_id": None,
+            "action": "bulk_update" if orm_execute_state.is_update else "bulk_delete",
+            "changes": _jsonable({
+                "statement": str(compiled)[:MAX_STATEMENT_LENGTH],
+                "params": compiled.params,
+                "rowcount": result.rowcount,
+            }),
+        })
+    return result
+
+@event.listens_for(Session, "after_commit")
+def _commit(session: Session) -> None:
+    records = session.info.pop("audit", None)
+    if records:
+        now = datetime.utcnow()
+        for entry in records:
+            entry["created_at"] = now
+        writer.enqueue(records)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard(session: Session, transaction) -> None:
+    # After a commit the records are already queued; anything left was rolled back
+    if transaction.parent is None:
+        session.info.pop("audit", None)
+
+async def write_records(records: List[Dict[str, Any]]) -> None:
+    """Insert records with one multi-row INSERT, on a connection of its own."""
+    async with engine.begin() as conn:
+        await conn.execute(AuditLog.__table__.insert(), records)
+
+class AuditWriter:
+    def __init__(self, buffer_size: int, batch_size: int, flush_seconds: float):
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.written_inline = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            traceback.print_exc()
+            print(f"[AUDIT] {len(self._queue)} audit records were not written at shutdown")
+
+    def enqueue(self, records: List[Dict[str, Any]]) -> None:
+        """Called on commit. Writes inline when the queue is full or nobody drains it."""
+        if self.running and len(self._queue) + len(records) <= self.buffer_size:
+            self._queue.extend(records)
+            if len(self._queue) >= self.batch_size:
+                self._wake.set()
+            return
+        try:
+            # Commit runs in the async session's greenlet, so this blocks only the committing caller
+            await_only(write_records(records))
+            self.written_inline += len(records)
+        except Exception:
+            traceback.print_exc()
+            self.dropped += len(records)
+            print(f"[AUDIT] Dropped {len(records)} audit records that could not be written")
+
+    async def flush(self) -> int:
+        """Write everything queued. Returns the number of records written."""
+        written = 0
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            try:
+                await write_records(batch)
+            except Exception:
+                # Keep them for the next attempt; the buffer bound still applies to new records
+                self._queue.extendleft(reversed(batch))
+                raise
+            written += len(batch)
+            self.written += len(batch)
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "written_inline": self.written_inline,
+            "dropped": self.dropped,
+        }
+
+writer = AuditWriter(
+    buffer_size=settings.AUDIT_BUFFER_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_seconds=settings.AUDIT_FLUSH_SECONDS
+)
@@ -1,9 +1,9 @@
 import os
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from pydantic import ValidationError
 from typing import Optional
+from contextvars import ContextVar
 from app.models.user import User
 
 # Environment variables (ensure these are set in your Vercel environment)
@@ -19,8 +19,15 @@ if not SUPABASE_JWT_SECRET:
     raise RuntimeError("SUPABASE_JWT_SECRET environment variable not set.")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token") # tokenUrl is not used by Supabase but required by FastAPI
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+# Who is making the current change, for the audit log (app/core/audit.py)
+current_actor: ContextVar[Optional[str]] = ContextVar("current_actor", default=None)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    # Imported on first use to keep serverless cold starts short
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -47,6 +54,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         # For example, if Supabase includes email in the token:
         email: Optional[str] = payload.get("email")
 
+        current_actor.set(user_id)
         return User(id=user_id, email=email)
     except JWTError as e:
         print(f"JWTError: {e}") # For debugging
@@ -55,6 +63,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         print(f"ValidationError: {e}") # For debugging
         raise credentials_exception
 
+def user_id_from_token(token: str) -> Optional[str]:
+    """Verified subject of a token, or None. For middleware that runs before dependencies."""
+    from jose import JWTError, jwt
+    try:
+        payload = jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=[ALGORITHM], audience=SUPABASE_AUDIENCE)
+    except JWTError:
+        return None
+    return payload.get("sub")
+
 # Example of a dependency to get the optional current user (if token is provided)
 async def get_optional_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[User]:
     if not token:
@@ -62,4 +79,12 @@ async def get_optional_current_user(token: Optional[str] = Depends(oauth2_scheme
     try:
         return await get_current_user(token)
     except HTTPException:
-        return None 
\ No newline at end of file
+        return None 
+
+# Browsers cannot set headers on an EventSource, so streaming endpoints also
+# accept the token as an `access_token` query parameter.
+async def get_current_user_for_stream(
+    access_token: Optional[str] = Query(None),
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+) -> User:
+    return await get_current_user(token or access_token or "")
@@ -0,0 +1,257 @@
+"""
+Online, batched data backfills for Alembic revisions.
+
+A plain `UPDATE` in a revision rewrites the whole table in the migration's
+transaction and holds its row locks until the end. A `Backfill` instead walks
+the table in primary key order, `batch_size` keys at a time, and commits every
+batch in its own short transaction on a separate connection. Between batches
+it sleeps so that writing takes at most `duty_cycle` of the wall time, plus
+`pause_seconds`. Live traffic only ever waits for one batch.
+
+Progress is checkpointed in `backfill_checkpoint` in the same transaction as
+each batch. An interrupted run resumes after the last committed key when the
+revision is run again, and a finished backfill is skipped.
+
+Because the batches commit, the migration's transaction is committed first
+(Alembic's autocommit block). Schema changes therefore go in their own
+revision before the backfill revision, otherwise a rerun would repeat them.
+
+A batch either sets columns to SQL expressions (`values`) or calls
+`process(connection, keys)` for work that needs Python, and returns the rows
+it changed. `where` selects the keys that still need work, which also makes a
+batch safe to repeat.
+
+Options come from `alembic -x`:
+
+    alembic -x backfill_batch_size=5000 -x backfill_duty_cycle=0.25 upgrade head
+    alembic -x backfill_dry_run=1 upgrade head
+
+A dry run counts the remaining rows and times one batch in a savepoint that
+is rolled back. It then prints an estimate and aborts the upgrade, so nothing
+is stamped and no data changes.
+
+`create_index_online` builds indexes with CREATE INDEX CONCURRENTLY on
+Postgres, which does not block writes, and with a plain CREATE INDEX elsewhere.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+from datetime import datetime
+import math
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+BATCH_SIZE = 1000
+PAUSE_SECONDS = 0.05
+DUTY_CYCLE = 0.5  # share of wall time spent writing
+
+checkpoint_metadata = sa.MetaData()
+checkpoints = sa.Table(
+    "backfill_checkpoint",
+    checkpoint_metadata,
+    sa.Column("name", sa.String, primary_key=True),
+    sa.Column("last_key", sa.BigInteger, nullable=True),
+    sa.Column("rows_done", sa.BigInteger, nullable=False, default=0),
+    sa.Column("batches_done", sa.Integer, nullable=False, default=0),
+    sa.Column("started_at", sa.DateTime, nullable=False),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+    sa.Column("finished_at", sa.DateTime, nullable=True),
+)
+
+class BackfillDryRun(Exception):
+    """Raised after a dry run to abort the Alembic upgrade."""
+
+@dataclass
+class Backfill:
+    name: str                       # checkpoint key, unique across revisions
+    table: str
+    key: str = "id"                 # integer primary key walked in order
+    where: Optional[str] = None     # SQL condition on `table` for rows that still need work
+    values: Optional[Dict[str, str]] = None  # column -> SQL expression
+    process: Optional[Callable[[Connection, List[int]], int]] = None
+
+    def __post_init__(self):
+        if (self.values is None) == (self.process is None):
+            raise ValueError("A backfill needs exactly one of values or process")
+
+@dataclass
+class BackfillOptions:
+    batch_size: int = BATCH_SIZE
+    pause_seconds: float = PAUSE_SECONDS
+    duty_cycle: float = DUTY_CYCLE
+    dry_run: bool = False
+
+    @classmethod
+    def from_alembic(cls) -> "BackfillOptions":
+        from alembic import context
+        x = context.get_x_argument(as_dictionary=True)
+        return cls(
+            batch_size=int(x.get("backfill_batch_size", BATCH_SIZE)),
+            pause_seconds=float(x.get("backfill_pause", PAUSE_SECONDS)),
+            duty_cycle=min(1.0, max(0.01, float(x.get("backfill_duty_cycle", DUTY_CYCLE)))),
+            dry_run=x.get("backfill_dry_run", "0").lower() in ("1", "true", "yes"),
+        )
+
+def _remaining_condition(backfill: Backfill, last_key: Optional[int]) -> str:
+    conditions = [backfill.where] if backfill.where else []
+    if last_key is not None:
+        conditions.append(f"{backfill.key} > :last_key")
+    return " AND ".join(f"({condition})" for condition in conditions) or "1 = 1"
+
+def _next_keys(connection: Connection, backfill: Backfill, last_key: Optional[int], batch_size: int) -> List[int]:
+    result = connection.execute(
+        sa.text(
+            f"SELECT {backfill.key} FROM {backfill.table} WHERE {_remaining_condition(backfill, last_key)} "
+            f"ORDER BY {backfill.key} LIMIT :limit"
+        ),
+        {"last_key": last_key, "limit": batch_size}
+    )
+    return [row[0] for row in result]
+
+def _run_batch(connection: Connection, backfill: Backfill, keys: List[int]) -> int:
+    if backfill.process is not None:
+        return backfill.process(connection, keys)
+    assignments = ", ".join(f"{column} = {expression}" for column, expression in backfill.values.items())
+    where = f" AND ({backfill.where})" if backfill.where else ""
+    result = connection.execute(
+        sa.text(
+            f"UPDATE {backfill.table} SET {assignments} "
+            f"WHERE {backfill.key} >= :low AND {backfill.key} <= :high{where}"
+        ),
+        {"low": keys[0], "high": keys[-1]}
+    )
+    return result.rowcount
+
+def _load_checkpoint(connection: Connection, name: str):
+    return connection.execute(sa.select(checkpoints).where(checkpoints.c.name == name)).first()
+
+def _save_checkpoint(connection: Connection, name: str, last_key: int, rows: int, exists: bool) -> None:
+    now = datetime.utcnow()
+    if not exists:
+        connection.execute(checkpoints.insert().values(
+            name=name, last_key=last_key, rows_done=rows, batches_done=1, started_at=now, updated_at=now
+        ))
+    else:
+        connection.execute(
+            checkpoints.update().where(checkpoints.c.name == name).values(
+                last_key=last_key,
+                rows_done=checkpoints.c.rows_done + rows,
+                batches_done=checkpoints.c.batches_done + 1,
+                updated_at=now
+            )
+        )
+
+def _finish_checkpoint(connection: Connection, name: str, exists: bool) -> None:
+    now = datetime.utcnow()
+    if not exists:
+        connection.execute(checkpoints.insert().values(
+            name=name, rows_done=0, batches_done=0, started_at=now, updated_at=now, finished_at=now
+        ))
+    else:
+        connection.execute(checkpoints.update().where(checkpoints.c.name == name).values(updated_at=now, finished_at=now))
+
+def estimate_backfill(connection: Connection, backfill: Backfill, options: BackfillOptions) -> Dict:
+    """Rows left and the expected duration, from one batch run in a rolled back savepoint."""
+    checkpoint_metadata.create_all(connection, checkfirst=True)
+    checkpoint = _load_checkpoint(connection, backfill.name)
+    if checkpoint is not None and checkpoint.finished_at is not None:
+        return {"name": backfill.name, "finished": True, "remaining_keys": 0, "batches": 0, "estimated_seconds": 0.0}
+    last_key = checkpoint.last_key if checkpoint is not None else None
+
+    remaining = connection.execute(
+        sa.text(f"SELECT count(*) FROM {backfill.table} WHERE {_remaining_condition(backfill, last_key)}"),
+        {"last_key": last_key}
+    ).scalar_one()
+    batches = math.ceil(remaining / options.batch_size)
+    sample_seconds = sample_rows = 0
+    keys = _next_keys(connection, backfill, last_key, options.batch_size)
+    if keys:
+        savepoint = connection.begin_nested()
+        started = time.monotonic()
+        try:
+            sample_rows = _run_batch(connection, backfill, keys)
+            sample_seconds = time.monotonic() - started
+        finally:
+            savepoint.rollback()
+    per_batch = sample_seconds / options.duty_cycle + options.pause_seconds
+    return {
+        "name": backfill.name,
+        "finished": False,
+        "remaining_keys": remaining,
+        "batches": batches,
+        "sample_batch_seconds": round(sample_seconds, 3),
+        "sample_batch_rows": sample_rows,
+        "estimated_seconds": round(batches * per_batch, 1),
+    }
+
+def run_backfill(bind: Connection, backfill: Backfill, options: BackfillOptions, log: Callable[[str], None] = print) -> Dict:
+    """
+    Run a backfill to completion on a new connection from `bind`'s engine,
+    one committed batch at a time. `bind` must not hold an open transaction
+    that the batches would wait on. Returns the checkpoint totals.
+    """
+    with bind.engine.connect() as connection:
+        with connection.begin():
+            checkpoint_metadata.create_all(connection, checkfirst=True)
+            checkpoint = _load_checkpoint(connection, backfill.name)
+        if checkpoint is not None and checkpoint.finished_at is not None:
+            log(f"[BACKFILL] {backfill.name} already finished")
+            return {"name": backfill.name, "rows": checkpoint.rows_done, "batches": checkpoint.batches_done}
+
+        exists = checkpoint is not None
+        last_key = checkpoint.last_key if exists else None
+        if last_key is not None:
+            log(f"[BACKFILL] {backfill.name} resuming after {backfill.key} {last_key}")
+        started = time.monotonic()
+        rows = batches = 0
+        while True:
+            batch_started = time.monotonic()
+            with connection.begin():
+                keys = _next_keys(connection, backfill, last_key, options.batch_size)
+                if not keys:
+                    _finish_checkpoint(connection, backfill.name, exists)
+                    break
+                changed = _run_batch(connection, backfill, keys)
+                _save_checkpoint(connection, backfill.name, keys[-1], changed, exists)
+            exists = True
+            last_key = keys[-1]
+            rows += changed
+            batches += 1
+            if batches % 100 == 0:
+                log(f"[BACKFILL] {backfill.name} {batches} batches, {rows} rows, at {backfill.key} {last_key}")
+
+            elapsed = time.monotonic() - batch_started
+            time.sleep(elapsed * (1 / options.duty_cycle - 1) + options.pause_seconds)
+
+    log(f"[BACKFILL] {backfill.name} finished: {rows} rows in {batches} batches, {time.monotonic() - started:.1f}s")
+    return {"name": backfill.name, "rows": rows, "batches": batches}
+
+def run_in_migration(op, backfill: Backfill, options: Optional[BackfillOptions] = None) -> None:
+    """Run a backfill from a revision's upgrade(), honouring the -x options."""
+    options = options or BackfillOptions.from_alembic()
+    if options.dry_run:
+        estimate = estimate_backfill(op.get_bind(), backfill, options)
+        print(f"[BACKFILL] dry run {estimate}")
+        raise BackfillDryRun(f"Dry run of {backfill.name}: about {estimate['estimated_seconds']}s, nothing was changed")
+    with op.get_context().autocommit_block():
+        run_backfill(op.get_bind(), backfill, options)
+
+def create_index_online(op, name: str, table: str, columns: Sequence[str], **kw) -> None:
+    """
+    Create an index without blocking writes where the database allows it.
+    Safe to rerun: an invalid index left by an interrupted concurrent build
+    is dropped and rebuilt.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(name, table, columns, if_not_exists=True, **kw)
+        return
+    with op.get_context().autocommit_block():
+        invalid = bind.execute(
+            sa.text("SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name AND NOT i.indisvalid"),
+            {"name": name}
+        ).first()
+        if invalid:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
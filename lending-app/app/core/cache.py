@@ -0,0 +1,37 @@
+"""
+In-process cache for per-user read models.
+
+Entries are tagged with the user's change feed position (`sync_state.last_seq`,
+see app/crud/sync.py) when they were built. A lookup passes the current
+position, so any committed write to the user's borrowers, loans or payments
+invalidates their entries on every worker without messaging. The TTL bounds
+staleness for data outside the feed, such as the nightly borrower stats.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import time
+
+class VersionedCache:
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry_version, expires_at, value = entry
+        if entry_version != version or expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (version, time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
+import os
+import tempfile
 
 load_dotenv()
 
@@ -8,6 +10,38 @@ class Settings(BaseSettings):
     SUPABASE_JWT_SECRET: str
     SECRET_KEY: str = "supersecretkey"
     APP_NAME: str = "Lending App"
+    PUBSUB_BROKER: str = "memory"  # memory | postgres (LISTEN/NOTIFY, fans out across workers)
+    PUSH_DEBOUNCE_SECONDS: float = 2.0
+    DB_ECHO: bool = False
+    # Serverless mode (e.g. Vercel): routers load on first request, no create_all,
+    # no scheduler, and the schema revision is checked lazily, see app/core/startup.py
+    SERVERLESS: bool = bool(os.environ.get("VERCEL"))
+    ARCHIVE_AFTER_DAYS: int = 180  # closed loans' installments move to payment_archive after this
+    DEFAULT_AFTER_DAYS: int = 90  # active loans with an installment overdue this long become defaulted
+    # Per-user admission control, see app/core/admission.py. The total matches
+    # SQLAlchemy's default pool (5 connections + 10 overflow).
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_PER_USER_LIMIT: int = 4
+    ADMISSION_TOTAL_LIMIT: int = 15
+    ADMISSION_MAX_QUEUE: int = 20
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0
+    PROCESS_POOL_WORKERS: int = max(1, (os.cpu_count() or 2) - 1)  # CPU-bound work, see app/core/executor.py
+    # Background jobs, see app/core/jobs.py
+    JOB_WORKERS: int = 2
+    JOB_POLL_SECONDS: float = 5.0
+    JOB_HEARTBEAT_SECONDS: float = 5.0
+    JOB_STALE_SECONDS: float = 120.0  # running jobs without a heartbeat this long are requeued
+    JOB_RETRY_BASE_SECONDS: float = 30.0  # doubled on every further attempt
+    SCHEDULER_LEASE_SECONDS: float = 60.0  # another process takes over this long after the leader stops renewing
+    SCHEDULER_RENEW_SECONDS: float = 15.0
+    SCHEDULER_CATCHUP_HOURS: float = 24.0  # missed runs older than this are not caught up
+    AUDIT_BUFFER_SIZE: int = 10000  # queued audit records before commits write their own, see app/core/audit.py
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_SECONDS: float = 1.0
+    DASHBOARD_SECTION_TIMEOUT_SECONDS: float = 5.0  # per section of GET /dashboard/bootstrap
+    DASHBOARD_BOOTSTRAP_CONCURRENCY: int = 2  # sections loaded at once, each on its own session; also its admission slots
+    BORROWER_OVERVIEW_CACHE_SECONDS: float = 30.0  # 0 disables, see app/core/cache.py
+    STATEMENTS_DIR: str = os.path.join(tempfile.gettempdir(), "lending-statements")  # statement archives, per user
 
     class Config:
         env_file = ".env"
@@ -3,11 +3,13 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-# Create async engine
+# Create async engine. No connection is opened until the first query.
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,
-    future=True
+    echo=settings.DB_ECHO,
+    future=True,
+    # Frozen lambdas leave stale connections in the pool
+    pool_pre_ping=settings.SERVERLESS
 )
 
 # Create async session
@@ -0,0 +1,36 @@
+"""
+Shared process pool for CPU-bound work (simulations, report rendering).
+
+The pool is created on first use with the "spawn" start method: forking a
+process that holds database connections and scheduler threads is unsafe.
+Functions sent to it must be importable top-level functions with picklable
+arguments, so keep them in modules without database imports.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+import asyncio
+import multiprocessing
+
+from app.core.config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+async def run_in_process(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run `fn(*args)` in the process pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), fn, *args)
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,34 @@
+"""
+Sparse fieldsets: `?fields=id,due_date,amount_due` on list and detail
+endpoints.
+
+The selected names go straight into the crud query as bare columns
+(`select(Loan.id, Loan.due_date, ...)`) and rows come back as mappings, so
+the database reads and sends only those columns and the session builds no
+ORM objects and tracks nothing in its identity map. Without `fields` an
+endpoint selects its full response columns the same way.
+"""
+from typing import Callable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+
+def parse_fields(value: Optional[str], allowed: Sequence[str]) -> Tuple[str, ...]:
+    """Comma separated field names in request order, or all of `allowed` when empty."""
+    if not value:
+        return tuple(allowed)
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Must be among: {', '.join(allowed)}")
+    return names
+
+def fields_query(allowed: Sequence[str]) -> Callable[..., Tuple[str, ...]]:
+    """A dependency that reads and validates `?fields=` against `allowed`."""
+    def dependency(
+        fields: Optional[str] = Query(None, description=f"Comma separated subset of: {', '.join(allowed)}")
+    ) -> Tuple[str, ...]:
+        try:
+            return parse_fields(fields, allowed)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return dependency
@@ -0,0 +1,143 @@
+"""
+Built-in job handlers. Each one re-checks ownership with `ctx.user_id`, since
+the job row is all it gets, and must be safe to retry from the start.
+"""
+from sqlmodel import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import deque
+from datetime import date, timedelta
+from pathlib import Path
+import asyncio
+import csv
+import io
+import shutil
+import tempfile
+import zipfile
+
+from app.core.config import settings
+from app.core.jobs import JobContext, job_handler
+from app.core import statements as statements_core
+from app.crud import loan as loan_crud
+from app.crud import payment as payment_crud
+from app.crud import statement as statement_crud
+from app.models.payment import Payment
+
+STATEMENT_CHUNK_SIZE = 500  # borrowers per render call
+STATEMENT_UPCOMING_DAYS = 31  # upcoming dues shown after the period
+
+@job_handler("loan.recalculate_schedule", public=True)
+async def recalculate_schedule(ctx: JobContext, db: AsyncSession):
+    """Regenerate a loan's installments from its terms. Deletion and regeneration commit together."""
+    loan_id = int(ctx.params["loan_id"])
+    db_loan = await loan_crud.get_loan(db, loan_id, user_id=ctx.user_id)
+    if db_loan is None:
+        raise LookupError(f"Loan {loan_id} not found or not owned by user")
+
+    await ctx.progress(0.1, "Deleting installments")
+    await payment_crud.delete_payments_by_loan(db, loan_id, user_id=ctx.user_id)
+    await loan_crud.generate_schedule(db, db_loan, user_id=ctx.user_id)
+
+    result = await db.execute(select(func.count()).select_from(Payment).where(Payment.loan_id == loan_id))
+    return {"loan_id": loan_id, "payment_count": result.scalar_one()}
+
+@job_handler("reminders.send", max_attempts=1, public=True)
+async def send_reminders(ctx: JobContext, db: AsyncSession):
+    """
+    Simulate sending reminders for installments due in the next `days` days.
+    In a real system, this would integrate with Twilio or similar service.
+    Not retried, so a failure halfway does not message borrowers twice.
+    """
+    upcoming = await payment_crud.get_upcoming_payments(db=db, days=int(ctx.params.get("days", 7)), user_id=ctx.user_id)
+    for i, payment in enumerate(upcoming):
+        # Just print to console for now
+        print(f"[REMINDER] Payment ID {payment.id} of ₱{payment.amount_due} is due on {payment.due_date}")
+        if i % 100 == 99:
+            await ctx.progress((i + 1) / len(upcoming))
+    return {"sent": len(upcoming)}
+
+def statement_period(month: str = None):
+    """First and last day of `month` (YYYY-MM), by default the previous calendar month."""
+    if month:
+        start = date.fromisoformat(f"{month}-01")
+    else:
+        start = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+def statement_archive_path(user_id: str, filename: str) -> Path:
+    return Path(settings.STATEMENTS_DIR) / user_id / filename
+
+def _write_documents(archive: zipfile.ZipFile, summary, rendered) -> None:
+    documents, summary_rows = rendered
+    for filename, document in documents:
+        archive.writestr(filename, document)
+    text = io.StringIO()
+    csv.writer(text).writerows(summary_rows)
+    summary.write(text.getvalue().encode("utf-8"))
+
+@job_handler("statements.generate", public=True)
+async def generate_statements(ctx: JobContext, db: AsyncSession):
+    """
+    Render a statement per borrower for one month into a zip archive with a
+    summary.csv index. Chunks of borrowers stream from the database while
+    earlier chunks render in the process pool; at most one chunk per pool
+    worker is in flight, so memory stays flat however many borrowers there are.
+    """
+    fmt = ctx.params.get("format", "html")
+    if fmt not in statements_core.FORMATS:
+        raise ValueError(f"Unknown statement format {fmt}")
+    period_start, period_end = statement_period(ctx.params.get("month"))
+    as_of = min(period_end + timedelta(days=1), date.today())
+    total = await statement_crud.count_statement_borrowers(db, ctx.user_id, period_start, period_end)
+
+    filename = f"statements-{period_start:%Y-%m}-{fmt}-{ctx.id}.zip"
+    path = statement_archive_path(ctx.user_id, filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".part")
+    in_flight = deque()
+    borrowers = documents = 0
+    try:
+        with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED) as archive, \
+                tempfile.SpooledTemporaryFile(max_size=1 << 20) as summary:
+            summary.write((",".join(statements_core.SUMMARY_COLUMNS) + "\r\n").encode("utf-8"))
+
+            async def write_oldest():
+                nonlocal borrowers, documents
+                rendered = await in_flight.popleft()
+                await asyncio.to_thread(_write_documents, archive, summary, rendered)
+                borrowers += len(rendered[1])
+                documents += len(rendered[0])
+                await ctx.progress(borrowers / max(total, 1), f"{borrowers} of {total} borrowers")
+
+            chunks = statement_crud.stream_statement_borrowers(
+                db, ctx.user_id, period_start, period_end,
+                period_end + timedelta(days=STATEMENT_UPCOMING_DAYS), STATEMENT_CHUNK_SIZE
+            )
+            async for chunk in chunks:
+                in_flight.append(asyncio.ensure_future(
+                    ctx.run_in_process(statements_core.render_chunk, chunk, fmt, period_start, period_end, as_of)
+                ))
+                if len(in_flight) > settings.PROCESS_POOL_WORKERS:
+                    await write_oldest()
+            while in_flight:
+                await write_oldest()
+
+            summary.seek(0)
+            with archive.open("summary.csv", "w") as dest:
+                await asyncio.to_thread(shutil.copyfileobj, summary, dest)
+        partial.replace(path)
+    except BaseException:
+        for future in in_flight:
+            future.cancel()
+        partial.unlink(missing_ok=True)
+        raise
+
+    return {
+        "file": filename,
+        "format": fmt,
+        "period_start": period_start.isoformat(),
+        "period_end": period_end.isoformat(),
+        "borrowers": borrowers,
+        "documents": documents,
+        "bytes": path.stat().st_size,
+    }
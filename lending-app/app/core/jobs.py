@@ -0,0 +1,191 @@
+"""
+Background jobs.
+
+Work that outlives a request is stored as a `Job` row and run by a small pool
+of asyncio workers in the API process. Endpoints enqueue with `submit` and
+return 202 with the job, clients poll GET /jobs/{id}.
+
+Handlers are registered with `job_handler(kind)` and receive a `JobContext`
+and their own database session. They report progress through
+`ctx.progress`, which also raises `JobCancelled` once a cancel was requested,
+and send CPU-bound steps to the process pool with `ctx.run_in_process`. A
+handler that raises is retried with exponential backoff until its attempts
+run out. Handlers must therefore be safe to run again from the start.
+
+While a handler runs, its worker heartbeats the row. Jobs whose heartbeat goes
+stale (the process died or was restarted) are requeued by the reaper. In
+serverless mode there is no pool, so `submit` runs the job inline, once.
+"""
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import traceback
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth import current_actor
+from app.core.config import settings
+from app.core.database import async_session
+from app.core import executor
+from app.crud import job as job_crud
+from app.models.job import Job
+
+class JobCancelled(Exception):
+    pass
+
+class UnknownJobKind(ValueError):
+    pass
+
+@dataclass
+class JobHandler:
+    fn: Callable[["JobContext", AsyncSession], Awaitable[Optional[Dict[str, Any]]]]
+    max_attempts: int
+    public: bool  # may be enqueued directly through POST /jobs
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+def job_handler(kind: str, max_attempts: int = 3, public: bool = False):
+    def register(fn):
+        HANDLERS[kind] = JobHandler(fn, max_attempts, public)
+        return fn
+    return register
+
+class JobContext:
+    def __init__(self, job: Job):
+        self.id = job.id
+        self.user_id = job.user_id
+        self.params = dict(job.params or {})
+        self.attempt = job.attempts
+
+    async def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        async with async_session() as db:
+            cancel_requested = await job_crud.heartbeat(db, self.id, fraction, message)
+        if cancel_requested:
+            raise JobCancelled()
+
+    async def run_in_process(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # A cancelled job stops waiting, but the pool finishes the call it already started
+        return await executor.run_in_process(fn, *args)
+
+async def _call(handler: JobHandler, ctx: JobContext) -> Optional[Dict[str, Any]]:
+    # Runs in its own task, so this only attributes the job's own changes
+    current_actor.set(ctx.user_id)
+    async with async_session() as db:
+        return await handler.fn(ctx, db)
+
+async def run_job(job: Job) -> str:
+    """Run a claimed job to its next state. Returns the status it ended in."""
+    handler = HANDLERS[job.kind]
+    task = asyncio.create_task(_call(handler, JobContext(job)))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.JOB_HEARTBEAT_SECONDS)
+            if done:
+                break
+            try:
+                async with async_session() as db:
+                    if await job_crud.heartbeat(db, job.id):
+                        task.cancel()
+            except Exception:
+                # A missed heartbeat is harmless unless it lasts past the stale limit
+                traceback.print_exc()
+    except asyncio.CancelledError:
+        # Worker shutdown: the row stays running and the reaper requeues it
+        task.cancel()
+        raise
+
+    async with async_session() as db:
+        try:
+            result = task.result()
+        except (JobCancelled, asyncio.CancelledError):
+            await job_crud.finish_job(db, job.id, "cancelled")
+            return "cancelled"
+        except Exception as e:
+            traceback.print_exc()
+            return await job_crud.retry_or_fail(db, job, f"{type(e).__name__}: {e}", settings.JOB_RETRY_BASE_SECONDS)
+        await job_crud.finish_job(db, job.id, "succeeded", result=result or {})
+        return "succeeded"
+
+class JobWorkerPool:
+    def __init__(self, workers: int, poll_seconds: float, stale_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def _worker(self) -> None:
+        while True:
+            # Cleared before claiming, so a job submitted meanwhile still wakes us
+            self._wake.clear()
+            try:
+                async with async_session() as db:
+                    job = await job_crud.claim_next_job(db, HANDLERS)
+                if job is not None:
+                    status = await run_job(job)
+                    print(f"[JOBS] {job.kind} {job.id} {status}")
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _reaper(self) -> None:
+        while True:
+            try:
+                async with async_session() as db:
+                    count = await job_crud.requeue_stale_jobs(db, self.stale_seconds)
+                if count:
+                    print(f"[JOBS] Recovered {count} jobs from stopped workers")
+                    self.wake()
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(self.stale_seconds / 2)
+
+pool = JobWorkerPool(
+    workers=settings.JOB_WORKERS,
+    poll_seconds=settings.JOB_POLL_SECONDS,
+    stale_seconds=settings.JOB_STALE_SECONDS
+)
+
+async def submit(db: AsyncSession, user_id: str, kind: str, params: Optional[Dict[str, Any]] = None) -> Job:
+    """Enqueue a job for the worker pool, or run it inline when there is no pool."""
+    handler = HANDLERS.get(kind)
+    if handler is None:
+        raise UnknownJobKind(kind)
+    if pool.running:
+        job = await job_crud.create_job(db, user_id, kind, params or {}, handler.max_attempts)
+        pool.wake()
+        return job
+
+    job = await job_crud.create_job(db, user_id, kind, params or {}, max_attempts=1)
+    claimed = await job_crud.claim_job(db, job.id)
+    if claimed is not None:
+        await run_job(claimed)
+    await db.refresh(job)
+    return job
+
+# Registers the built-in handlers
+from app.core import job_handlers  # noqa: E402,F401
@@ -0,0 +1,132 @@
+"""
+In-process pub/sub used to push change notifications to connected clients.
+
+Write paths never call this directly: `app/crud/sync.py` publishes the
+entities a user touched once their transaction commits. The broker is chosen
+by `settings.PUBSUB_BROKER`; "memory" only reaches subscribers in the same
+process, "postgres" relays through LISTEN/NOTIFY so every worker sees every
+publish.
+"""
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+def user_channel(user_id: str) -> str:
+    return f"user:{user_id}"
+
+class Broker(ABC):
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> None:
+        ...
+
+    @abstractmethod
+    async def subscribe(self, channel: str) -> asyncio.Queue:
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        ...
+
+class InMemoryBroker(Broker):
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def deliver(self, channel: str, message: str) -> None:
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                # Slow consumer: drop the oldest notification, the next one supersedes it
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def publish(self, channel: str, message: str) -> None:
+        self.deliver(channel, message)
+
+    async def subscribe(self, channel: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    async def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(channel)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[channel]
+
+class PostgresBroker(Broker):
+    NOTIFY_CHANNEL = "lendist_events"
+
+    def __init__(self, dsn: str):
+        self._dsn = dsn.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self._local = InMemoryBroker()
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def _connection(self):
+        if self._conn is None or self._conn.is_closed():
+            import asyncpg
+            self._conn = await asyncpg.connect(self._dsn)
+            await self._conn.add_listener(self.NOTIFY_CHANNEL, self._on_notify)
+        return self._conn
+
+    def _on_notify(self, connection, pid, notify_channel, payload):
+        envelope = json.loads(payload)
+        self._local.deliver(envelope["channel"], envelope["message"])
+
+    async def publish(self, channel: str, message: str) -> None:
+        async with self._lock:
+            conn = await self._connection()
+            await conn.execute(
+                "SELECT pg_notify($1, $2)",
+                self.NOTIFY_CHANNEL,
+                json.dumps({"channel": channel, "message": message})
+            )
+
+    async def subscribe(self, channel: str) -> asyncio.Queue:
+        async with self._lock:
+            await self._connection()
+        return await self._local.subscribe(channel)
+
+    async def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        await self._local.unsubscribe(channel, queue)
+
+_broker: Optional[Broker] = None
+_pending: Set[asyncio.Task] = set()
+
+def get_broker() -> Broker:
+    global _broker
+    if _broker is None:
+        if settings.PUBSUB_BROKER == "postgres":
+            _broker = PostgresBroker(settings.DATABASE_URL)
+        else:
+            _broker = InMemoryBroker()
+    return _broker
+
+def set_broker(broker: Broker) -> None:
+    global _broker
+    _broker = broker
+
+async def _publish(channel: str, message: str) -> None:
+    try:
+        await get_broker().publish(channel, message)
+    except Exception as e:
+        logger.warning(f"Failed to publish to {channel}: {e}")
+
+def publish_changes(user_id: str, entities: Iterable[str]) -> None:
+    """Fire-and-forget notification that `entities` changed for `user_id`."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # no event loop, e.g. a migration script
+    message = json.dumps({"entities": sorted(entities)})
+    task = loop.create_task(_publish(user_channel(user_id), message))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
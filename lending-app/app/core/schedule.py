@@ -0,0 +1,179 @@
+"""
+Pure repayment schedule calculation.
+
+`compute_schedule` is the single source of truth for installment dates and
+amounts: `generate_schedule` persists its output and `POST /loans/preview`
+returns it for terms that are not saved yet. Results are memoized on the
+normalized terms, so repeated previews while a user edits the create-loan form
+cost nothing. The effective annual rate is informational and only the preview
+reports it, see `effective_annual_rate_percent`.
+"""
+from functools import lru_cache
+import math
+from typing import NamedTuple, Optional, Tuple
+from datetime import date, timedelta
+
+PERIODS_PER_YEAR = {"daily": 365, "weekly": 52, "monthly": 12, "quarterly": 4, "yearly": 1}
+CYCLES_PER_YEAR = {"daily": 365, "weekly": 52, "monthly": 12, "yearly": 1, "one-time": 1}
+
+class Installment(NamedTuple):
+    number: int
+    due_date: date
+    amount_due: float
+    principal: float
+    interest: float
+    balance: float  # principal still owed after this installment
+
+class Schedule(NamedTuple):
+    installments: Tuple[Installment, ...]
+    installment_amount: float
+    total_payable: float
+    total_interest: float
+    periodic_rate_percent: float
+    payoff_date: date
+
+def add_months(date_obj, months):
+    """Add a specified number of months to a date object."""
+    month = date_obj.month - 1 + months
+    year = date_obj.year + month // 12
+    month = month % 12 + 1
+    day = min(date_obj.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month-1])
+    return date(year, month, day)
+
+def next_due_date(current: date, term_frequency: str) -> date:
+    if term_frequency == "daily":
+        return current + timedelta(days=1)
+    if term_frequency == "weekly":
+        return current + timedelta(days=7)
+    if term_frequency == "quarterly":
+        return add_months(current, 3)
+    if term_frequency == "yearly":
+        return add_months(current, 12)
+    return add_months(current, 1)
+
+def periodic_rate_percent(interest_rate_percent: float, term_frequency: str, interest_cycle: str) -> float:
+    """The rate charged per installment, from a rate quoted per `interest_cycle`."""
+    annual_rate = interest_rate_percent * CYCLES_PER_YEAR.get(interest_cycle, 1)
+    return annual_rate / PERIODS_PER_YEAR.get(term_frequency, 1)
+
+def normalize_terms(
+    principal: float,
+    interest_rate_percent: float,
+    term_units: int,
+    term_frequency: str,
+    repayment_type: str,
+    interest_cycle: Optional[str],
+    start_date: date
+) -> Tuple:
+    """Cache key: casing and float noise must not create separate entries."""
+    return (
+        round(float(principal), 2),
+        round(float(interest_rate_percent), 6),
+        int(term_units),
+        term_frequency.lower(),
+        "flat" if repayment_type.lower() == "flat" else "amortized",
+        (interest_cycle or "yearly").lower(),
+        start_date,
+    )
+
+def _effective_annual_rate(principal: float, payments: Tuple[float, ...], periods_per_year: int) -> float:
+    """
+    Annualized internal rate of return of the installments, by bisection.
+    Discount factors are computed in log space, so long schedules and high
+    rates underflow to zero instead of overflowing.
+    """
+    if principal <= 0 or sum(payments) <= principal:
+        return 0.0
+    low, high = 0.0, 1.0
+    if len(set(payments)) == 1:
+        # Level installments (every schedule compute_schedule builds): the
+        # annuity formula makes each step O(1) instead of O(term_units)
+        amount, count = payments[0], len(payments)
+        present_value = lambda rate: amount * -math.expm1(-count * math.log1p(rate)) / rate if rate else amount * count
+    else:
+        present_value = lambda rate: sum(amount * math.exp(-(i + 1) * math.log1p(rate)) for i, amount in enumerate(payments))
+    while present_value(high) > principal:
+        high *= 2
+    for _ in range(100):
+        mid = (low + high) / 2
+        if present_value(mid) > principal:
+            low = mid
+        else:
+            high = mid
+    return math.expm1(periods_per_year * math.log1p((low + high) / 2)) * 100
+
+@lru_cache(maxsize=4096)
+def _effective_annual_rate_percent(principal: float, payments: Tuple[float, ...], periods_per_year: int) -> Optional[float]:
+    try:
+        return round(_effective_annual_rate(principal, payments, periods_per_year), 4)
+    except OverflowError:
+        return None
+
+def effective_annual_rate_percent(schedule: Schedule, principal: float, term_frequency: str) -> Optional[float]:
+    """The schedule's annualized cost, or None when it is too large to represent."""
+    return _effective_annual_rate_percent(
+        round(float(principal), 2),
+        tuple(installment.amount_due for installment in schedule.installments),
+        PERIODS_PER_YEAR.get(term_frequency.lower(), 12)
+    )
+
+@lru_cache(maxsize=4096)
+def _compute(principal, interest_rate_percent, term_units, term_frequency, repayment_type, interest_cycle, start_date) -> Schedule:
+    rate_percent = periodic_rate_percent(interest_rate_percent, term_frequency, interest_cycle)
+    rate = rate_percent / 100
+
+    if repayment_type == "flat":
+        interest_per_period = principal * rate
+        principal_per_period = principal / term_units
+        payment_amount = principal_per_period + interest_per_period
+    elif rate:
+        payment_amount = principal * rate / (1 - (1 + rate) ** (-term_units))
+    else:
+        payment_amount = principal / term_units
+
+    installments = []
+    due = start_date
+    remaining_principal = principal
+    for i in range(term_units):
+        due = next_due_date(due, term_frequency)
+        if repayment_type == "flat":
+            interest_payment, principal_payment = interest_per_period, principal_per_period
+        else:
+            interest_payment = remaining_principal * rate
+            principal_payment = payment_amount - interest_payment
+        remaining_principal -= principal_payment
+        installments.append(Installment(
+            number=i + 1,
+            due_date=due,
+            amount_due=round(payment_amount, 2),
+            principal=round(principal_payment, 2),
+            interest=round(interest_payment, 2),
+            balance=round(max(remaining_principal, 0.0), 2),
+        ))
+
+    amounts = tuple(installment.amount_due for installment in installments)
+    total_payable = round(sum(amounts), 2)
+    return Schedule(
+        installments=tuple(installments),
+        installment_amount=round(payment_amount, 2),
+        total_payable=total_payable,
+        total_interest=round(total_payable - principal, 2),
+        periodic_rate_percent=round(rate_percent, 6),
+        payoff_date=due,
+    )
+
+def compute_schedule(
+    principal: float,
+    interest_rate_percent: float,
+    term_units: int,
+    term_frequency: str,
+    repayment_type: str,
+    interest_cycle: Optional[str],
+    start_date: date
+) -> Schedule:
+    return _compute(*normalize_terms(
+        principal, interest_rate_percent, term_units, term_frequency, repayment_type, interest_cycle, start_date
+    ))
+
+def schedule_cache_info():
+    return _compute.cache_info()
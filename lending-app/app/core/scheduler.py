@@ -1,24 +1,240 @@
+"""
+Daily and nightly cron jobs.
+
+Every API process starts `leader`, but only the process holding the
+`scheduler_lease` row runs jobs. The leader renews its lease every
+SCHEDULER_RENEW_SECONDS; if it dies, another process takes over once the
+lease has been expired for SCHEDULER_LEASE_SECONDS, and on shutdown it
+releases the lease at once.
+
+Each job's last fire time is stored in `scheduled_job_state`. A new leader
+runs, once, any job whose latest fire time in the last
+SCHEDULER_CATCHUP_HOURS has not run yet, so a restart or failover at 07:00
+delays the reminders instead of skipping them. A run is claimed with a
+conditional update on that fire time, so it happens once even if two
+processes briefly both think they lead. Run duration and lag (start minus
+fire time) are recorded too, see GET /scheduler/jobs.
+"""
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import date, timedelta
-from sqlmodel import Session, select
-from app.core.database import engine
+from apscheduler.triggers.cron import CronTrigger
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from sqlmodel import select
+import asyncio
+import os
+import socket
+import time
+import traceback
+import uuid
+
+from app.core.config import settings
+from app.core.database import async_session
 from app.models.payment import Payment
+from app.crud import scheduler_state as state_crud
+from app.crud.snapshot import take_snapshots
+from app.crud.borrower_stats import record_missed_due, recompute_borrower_stats
+from app.crud.archive import archive_closed_loans
+from app.crud.penalty import accrue_penalties
+from app.crud.lifecycle import run_lifecycle
+from app.crud.loan_balance import repair_loan_balances
+
+LEASE_NAME = "scheduler"
+
+@dataclass
+class ScheduledJob:
+    name: str
+    fn: Callable[[], Awaitable[None]]
+    trigger: CronTrigger
+    schedule: str                           # human readable, for the status endpoint
+
+JOBS: Dict[str, ScheduledJob] = {}
+
+def scheduled_job(hour: int, minute: int):
+    def register(fn):
+        JOBS[fn.__name__] = ScheduledJob(fn.__name__, fn, CronTrigger(hour=hour, minute=minute), f"daily at {hour:02d}:{minute:02d}")
+        return fn
+    return register
+
+@scheduled_job(hour=7, minute=0)
+async def daily_due_alerts():
+    today, tomorrow = date.today(), date.today() + timedelta(days=1)
+    async with async_session() as db:
+        stmt = select(Payment).where(
+            Payment.amount_paid == 0,
+            Payment.due_date.between(today, tomorrow),
+        )
+        due = (await db.execute(stmt)).scalars().all()
+        if due:
+            # simplest: dump to a `reminders` table or just log
+            print(f"[REMINDER] {len(due)} payments are due today/tomorrow")
+
+@scheduled_job(hour=23, minute=50)
+async def nightly_portfolio_snapshot():
+    async with async_session() as db:
+        count = await take_snapshots(db)
+        print(f"[SNAPSHOT] Stored portfolio snapshots for {count} users")
+
+@scheduled_job(hour=0, minute=5)
+async def borrower_missed_due():
+    async with async_session() as db:
+        count = await record_missed_due(db)
+        print(f"[STATS] Recorded yesterday's due installments for {count} borrowers")
+
+@scheduled_job(hour=0, minute=15)
+async def penalty_accrual():
+    async with async_session() as db:
+        count = await accrue_penalties(db)
+        print(f"[PENALTY] Charged {count} late penalties")
+
+@scheduled_job(hour=0, minute=30)
+async def loan_lifecycle():
+    async with async_session() as db:
+        counts = await run_lifecycle(db, default_after_days=settings.DEFAULT_AFTER_DAYS)
+        print(f"[LIFECYCLE] Completed {counts['completed']} loans, marked {counts['defaulted']} as defaulted")
+
+@scheduled_job(hour=2, minute=30)
+async def borrower_stats_recompute():
+    async with async_session() as db:
+        count = await recompute_borrower_stats(db)
+        print(f"[STATS] Recomputed repayment stats for {count} borrowers")
 
-def build_scheduler() -> AsyncIOScheduler:
-    scheduler = AsyncIOScheduler()
+@scheduled_job(hour=3, minute=30)
+async def payment_archival():
+    async with async_session() as db:
+        count = await archive_closed_loans(db, older_than_days=settings.ARCHIVE_AFTER_DAYS)
+        print(f"[ARCHIVE] Moved {count} installments of closed loans to the archive")
 
-    @scheduler.scheduled_job("cron", hour=7, minute=0)
-    async def daily_due_alerts():
-        today, tomorrow = date.today(), date.today() + timedelta(days=1)
-        async with Session(engine) as db:
-            stmt = select(Payment).where(
-                Payment.amount_paid == 0,
-                Payment.due_date.between(today, tomorrow),
+@scheduled_job(hour=4, minute=0)
+async def loan_balance_repair():
+    async with async_session() as db:
+        count = await repair_loan_balances(db)
+        print(f"[BALANCE] Repaired balance columns of {count} loans")
+
+def _utc(moment: datetime) -> datetime:
+    """Naive UTC, as stored in the database."""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+def latest_fire_time(job: ScheduledJob, now: datetime, lookback: timedelta) -> Optional[datetime]:
+    """The job's last fire time at or before `now` (aware), within `lookback`."""
+    latest = None
+    fire_time = job.trigger.get_next_fire_time(None, now - lookback)
+    while fire_time is not None and fire_time <= now:
+        latest = fire_time
+        fire_time = job.trigger.get_next_fire_time(fire_time, fire_time + timedelta(seconds=1))
+    return latest
+
+def next_fire_time(job: ScheduledJob, now: datetime) -> Optional[datetime]:
+    return job.trigger.get_next_fire_time(None, now)
+
+class SchedulerLeader:
+    def __init__(self, lease_seconds: float, renew_seconds: float, catchup_hours: float):
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.catchup = timedelta(hours=catchup_hours)
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.scheduler: Optional[AsyncIOScheduler] = None
+        self._lease_expires_at = 0.0  # monotonic
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def leading(self) -> bool:
+        return self.scheduler is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.leading:
+            self._step_down()
+            try:
+                async with async_session() as db:
+                    await state_crud.release_lease(db, LEASE_NAME, self.holder)
+            except Exception:
+                traceback.print_exc()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                renewed_at = time.monotonic()
+                async with async_session() as db:
+                    acquired = await state_crud.acquire_lease(db, LEASE_NAME, self.holder, self.lease_seconds)
+                if acquired:
+                    self._lease_expires_at = renewed_at + self.lease_seconds
+                    if not self.leading:
+                        await self._lead()
+                elif self.leading:
+                    print(f"[SCHEDULER] {self.holder} lost the lease, stopping jobs")
+                    self._step_down()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                # Without a renewal another process may already have taken over
+                if self.leading and time.monotonic() >= self._lease_expires_at:
+                    print(f"[SCHEDULER] {self.holder} could not renew the lease, stopping jobs")
+                    self._step_down()
+            await asyncio.sleep(self.renew_seconds)
+
+    async def _lead(self) -> None:
+        print(f"[SCHEDULER] {self.holder} is now running scheduled jobs")
+        scheduler = AsyncIOScheduler()
+        for job in JOBS.values():
+            scheduler.add_job(
+                self.run_job,
+                job.trigger,
+                args=[job],
+                id=job.name,
+                coalesce=True,
+                misfire_grace_time=int(self.catchup.total_seconds())
+            )
+        scheduler.start()
+        self.scheduler = scheduler
+        await self._catch_up()
+
+    def _step_down(self) -> None:
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+
+    async def _catch_up(self) -> None:
+        now = datetime.now(timezone.utc)
+        latest = {name: latest_fire_time(job, now, self.catchup) for name, job in JOBS.items()}
+        async with async_session() as db:
+            states = await state_crud.ensure_job_states(
+                db, {name: _utc(fire_time) if fire_time else None for name, fire_time in latest.items()}
             )
-            due = (await db.exec(stmt)).all()
-            if due:
-                # simplest: dump to a `reminders` table or just log
-                print(f"[REMINDER] {len(due)} payments are due today/tomorrow")
+        for name, fire_time in latest.items():
+            last = states[name].last_scheduled_for
+            if fire_time is None or (last is not None and last >= _utc(fire_time)):
+                continue
+            print(f"[SCHEDULER] Catching up {name}, missed at {fire_time.isoformat()}")
+            self.scheduler.add_job(self.run_job, "date", run_date=now, args=[JOBS[name], fire_time], id=f"{name}:catch-up")
+
+    async def run_job(self, job: ScheduledJob, fire_time: Optional[datetime] = None) -> None:
+        fire_time = fire_time or latest_fire_time(job, datetime.now(timezone.utc), self.catchup) or datetime.now(timezone.utc)
+        async with async_session() as db:
+            claimed = await state_crud.claim_run(db, job.name, _utc(fire_time), self.holder)
+        if not claimed:
+            print(f"[SCHEDULER] {job.name} for {fire_time.isoformat()} already ran, skipping")
+            return
+        started = time.monotonic()
+        status, error = "succeeded", None
+        try:
+            await job.fn()
+        except Exception as e:
+            traceback.print_exc()
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        async with async_session() as db:
+            await state_crud.finish_run(db, job.name, status, round(time.monotonic() - started, 3), error)
 
-    scheduler.start()
-    return scheduler 
\ No newline at end of file
+leader = SchedulerLeader(
+    lease_seconds=settings.SCHEDULER_LEASE_SECONDS,
+    renew_seconds=settings.SCHEDULER_RENEW_SECONDS,
+    catchup_hours=settings.SCHEDULER_CATCHUP_HOURS
+)
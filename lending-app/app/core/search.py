@@ -0,0 +1,114 @@
+"""
+In-process trigram index for borrower search on databases without pg_trgm.
+
+Postgres deployments search with pg_trgm GIN indexes instead, see
+`app.crud.borrower.search_borrowers`. This index mirrors pg_trgm's trigram
+scheme and similarity so both backends rank results the same way.
+"""
+import re
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+FUZZY_THRESHOLD = 0.3  # pg_trgm's default similarity threshold
+
+_WORD = re.compile(r"[^\W_]+")
+_NON_DIGIT = re.compile(r"\D")
+
+def normalize_mobile(mobile: Optional[str]) -> Optional[str]:
+    """Digits only, without leading zeros, so '0917-123 4567' matches '+63 917 123 4567'."""
+    if not mobile:
+        return None
+    digits = _NON_DIGIT.sub("", mobile).lstrip("0")
+    return digits or None
+
+def trigrams(text: str) -> Set[str]:
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class TrigramIndex:
+    def __init__(self):
+        self.change_seq = 0  # change feed position this index reflects
+        self._names: Dict[int, str] = {}
+        self._grams: Dict[int, Set[str]] = {}
+        self._mobiles: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def upsert(self, borrower_id: int, name: str, mobile_digits: Optional[str]) -> None:
+        self.remove(borrower_id)
+        grams = trigrams(name)
+        self._names[borrower_id] = name.lower()
+        self._grams[borrower_id] = grams
+        if mobile_digits:
+            self._mobiles[borrower_id] = mobile_digits
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(borrower_id)
+
+    def remove(self, borrower_id: int) -> None:
+        for gram in self._grams.pop(borrower_id, ()):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(borrower_id)
+                if not ids:
+                    del self._postings[gram]
+        self._names.pop(borrower_id, None)
+        self._mobiles.pop(borrower_id, None)
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, str, float]]:
+        """
+        Return (borrower_id, match, score) ranked prefix > substring/mobile > fuzzy,
+        then by trigram similarity.
+        """
+        text = query.strip().lower()
+        query_grams = trigrams(text)
+        hits: Dict[int, Tuple[int, str, float]] = {}
+
+        overlaps = Counter()
+        for gram in query_grams:
+            overlaps.update(self._postings.get(gram, ()))
+        # Short queries have too few trigrams to find substrings, scan names instead
+        candidates = self._names.keys() if len(text) < 3 else overlaps.keys()
+
+        for borrower_id in candidates:
+            name = self._names[borrower_id]
+            shared = overlaps.get(borrower_id, 0)
+            similarity = shared / (len(query_grams) + len(self._grams[borrower_id]) - shared) if shared else 0.0
+            if text and name.startswith(text):
+                hits[borrower_id] = (3, "prefix", similarity)
+            elif text and text in name:
+                hits[borrower_id] = (2, "substring", similarity)
+            elif similarity >= FUZZY_THRESHOLD:
+                hits[borrower_id] = (1, "fuzzy", similarity)
+
+        digits = normalize_mobile(query)
+        if digits and len(digits) >= 3:
+            for borrower_id, mobile in self._mobiles.items():
+                if borrower_id not in hits and digits in mobile:
+                    hits[borrower_id] = (2, "mobile", 1.0)
+
+        ranked = sorted(hits.items(), key=lambda item: (-item[1][0], -item[1][2], self._names[item[0]]))
+        return [(borrower_id, match, round(score, 3)) for borrower_id, (_, match, score) in ranked[:limit]]
+
+class IndexCache:
+    """Least-recently-used TrigramIndex per user."""
+
+    def __init__(self, max_users: int = 16):
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, TrigramIndex]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[TrigramIndex]:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            self._indexes.move_to_end(user_id)
+        return index
+
+    def put(self, user_id: str, index: TrigramIndex) -> None:
+        self._indexes[user_id] = index
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > self.max_users:
+            self._indexes.popitem(last=False)
@@ -0,0 +1,105 @@
+"""
+Application wiring for long-running and serverless deployments.
+
+A long-running server includes every router up front. In serverless mode each
+router module is imported the first time a request hits its prefix, and the
+first request also checks that the database is at the Alembic head revision.
+That check replaces `create_all` and opens the first pooled connection, which
+the request then reuses.
+"""
+from sqlalchemy import text
+from app.core.database import engine
+from pathlib import Path
+from typing import Iterable, Set, Tuple
+import importlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# (module in app.routers, prefix, tag)
+ROUTERS = [
+    ("borrower", "/borrowers", "Borrowers"),
+    ("loan", "/loans", "Loans"),
+    ("payment", "/payments", "Payments"),
+    ("penalty", "/penalties", "Penalties"),
+    ("dashboard", "/dashboard", "Dashboard"),
+    ("reminders", "/reminders", "Reminders"),
+    ("sync", "/sync", "Sync"),
+    ("events", "/events", "Events"),
+    ("admission", "/admission", "Admission"),
+    ("jobs", "/jobs", "Jobs"),
+    ("statements", "/statements", "Statements"),
+    ("scheduler", "/scheduler", "Scheduler"),
+    ("audit", "/audit", "Audit"),
+]
+DOCS_PATHS = ("/docs", "/redoc", "/openapi.json")
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+_REVISION = re.compile(r"^revision(?:\s*:[^=]+)?\s*=\s*['\"]([^'\"]+)['\"]", re.M)
+_DOWN_REVISION = re.compile(r"^down_revision(?:\s*:[^=]+)?\s*=\s*(.+)$", re.M)
+
+def include_router(app, name: str, prefix: str, tag: str) -> None:
+    module = importlib.import_module(f"app.routers.{name}")
+    app.include_router(module.router, prefix=prefix, tags=[tag])
+
+def alembic_heads(versions_dir: Path = VERSIONS_DIR) -> Set[str]:
+    """Head revisions, read from the revision files without importing Alembic."""
+    revisions, parents = set(), set()
+    for path in versions_dir.glob("*.py"):
+        source = path.read_text()
+        revision = _REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION.search(source)
+        if down_revision is not None:
+            parents.update(re.findall(r"['\"]([^'\"]+)['\"]", down_revision.group(1)))
+    return revisions - parents
+
+async def check_schema_revision() -> bool:
+    expected = alembic_heads()
+    if not expected:
+        logger.warning("No Alembic revisions found in %s, skipping the schema check", VERSIONS_DIR)
+        return True
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        current = set(result.scalars().all())
+    if current != expected:
+        logger.error("Database is at revision %s but the code expects %s; run `alembic upgrade head`", sorted(current), sorted(expected))
+        return False
+    return True
+
+class ServerlessMiddleware:
+    """
+    Includes routers by path prefix on first use and checks the schema
+    revision once per process.
+    """
+
+    def __init__(self, app, fastapi_app, routers: Iterable[Tuple[str, str, str]] = ROUTERS):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.pending = {prefix: (name, prefix, tag) for name, prefix, tag in routers}
+        self.schema_checked = False
+
+    def load_routers(self, path: str) -> None:
+        if path in DOCS_PATHS:
+            prefixes = list(self.pending)
+        else:
+            prefixes = [prefix for prefix in self.pending if path == prefix or path.startswith(prefix + "/")]
+        for prefix in prefixes:
+            include_router(self.fastapi_app, *self.pending.pop(prefix))
+        if prefixes:
+            self.fastapi_app.openapi_schema = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            if self.pending:
+                self.load_routers(scope["path"])
+            if not self.schema_checked:
+                self.schema_checked = True
+                try:
+                    await check_schema_revision()
+                except Exception as e:
+                    logger.error(f"Schema revision check failed: {e}")
+        await self.app(scope, receive, send)
@@ -0,0 +1,160 @@
+"""
+Borrower statement rendering.
+
+Runs in the process pool (see app/core/executor.py), so this module must not
+import the database layer. Input is a chunk of borrowers as built by
+app/crud/statement.py: plain dicts and tuples, cheap to pickle.
+
+    {"id", "name", "mobile", "loans": [
+        {"id", "principal", "status", "start_date", "outstanding",
+         "installments": [(due_date, amount_due, amount_paid, penalty, paid_in_period), ...]}]}
+
+`outstanding` is the loan's balance at the end of the period. `installments`
+holds the period's installments, older ones still unpaid,
+older ones paid during the period, and the upcoming ones after the period.
+Installments count as overdue when unpaid and due before `as_of`, the
+statement date (the end of the period, or today for the current month).
+"""
+from datetime import date
+from typing import Any, Dict, List, Tuple
+import csv
+import html
+import io
+import re
+
+FORMATS = {"csv": "csv", "html": "html", "text": "txt"}  # format -> file extension
+SUMMARY_COLUMNS = ["borrower_id", "name", "loans", "paid_in_period", "due_in_period", "overdue", "balance", "next_due_date", "file"]
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}"
+
+def _filename(borrower: Dict[str, Any], ext: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", borrower["name"].lower()).strip("-")[:40] or "borrower"
+    return f"{borrower['id']:07d}-{slug}.{ext}"
+
+def summarize(borrower: Dict[str, Any], period_start: date, period_end: date, as_of: date) -> Dict[str, Any]:
+    """The figures every format shows, per loan and in total."""
+    loans = []
+    for loan in borrower["loans"]:
+        in_period, upcoming = [], []
+        paid = overdue = due = 0.0
+        for due_date, amount_due, amount_paid, penalty, paid_in_period in loan["installments"]:
+            paid += paid_in_period
+            if due_date > period_end:
+                if amount_paid < amount_due:
+                    upcoming.append((due_date, amount_due - amount_paid))
+                continue
+            if due_date >= period_start:
+                in_period.append((due_date, amount_due, amount_paid, penalty))
+                due += amount_due
+            if due_date < as_of and amount_paid < amount_due:
+                overdue += amount_due - amount_paid + penalty
+        loans.append({
+            "id": loan["id"],
+            "principal": loan["principal"],
+            "status": loan["status"],
+            "start_date": loan["start_date"],
+            "balance": loan["outstanding"],
+            "paid": round(paid, 2),
+            "due": round(due, 2),
+            "overdue": round(overdue, 2),
+            "installments": in_period,
+            "upcoming": upcoming,
+        })
+    next_due = [upcoming[0][0] for upcoming in (loan["upcoming"] for loan in loans) if upcoming]
+    return {
+        "loans": loans,
+        "paid": round(sum(loan["paid"] for loan in loans), 2),
+        "due": round(sum(loan["due"] for loan in loans), 2),
+        "overdue": round(sum(loan["overdue"] for loan in loans), 2),
+        "balance": round(sum(loan["balance"] for loan in loans), 2),
+        "next_due_date": min(next_due) if next_due else None,
+    }
+
+def render_csv(borrower: Dict[str, Any], summary: Dict[str, Any], period_start: date, period_end: date) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["borrower", borrower["name"], "period", period_start, period_end])
+    writer.writerow(["loan_id", "line", "due_date", "amount_due", "amount_paid", "penalty", "balance"])
+    for loan in summary["loans"]:
+        for due_date, amount_due, amount_paid, penalty in loan["installments"]:
+            writer.writerow([loan["id"], "installment", due_date, amount_due, amount_paid, penalty, ""])
+        for due_date, amount in loan["upcoming"]:
+            writer.writerow([loan["id"], "upcoming", due_date, amount, "", "", ""])
+        writer.writerow([loan["id"], "paid_in_period", "", "", loan["paid"], "", ""])
+        writer.writerow([loan["id"], "balance", "", "", "", "", loan["balance"]])
+    writer.writerow(["", "total_balance", "", "", summary["paid"], "", summary["balance"]])
+    return out.getvalue()
+
+def render_text(borrower: Dict[str, Any], summary: Dict[str, Any], period_start: date, period_end: date) -> str:
+    lines = [
+        f"STATEMENT {period_start:%B %Y}",
+        f"{borrower['name']}" + (f" ({borrower['mobile']})" if borrower["mobile"] else ""),
+        f"Period: {period_start} to {period_end}",
+        "",
+    ]
+    for loan in summary["loans"]:
+        lines.append(f"Loan #{loan['id']}  principal {_money(loan['principal'])}  started {loan['start_date']}  {loan['status']}")
+        for due_date, amount_due, amount_paid, penalty in loan["installments"]:
+            penalty_note = f"  penalty {_money(penalty)}" if penalty else ""
+            lines.append(f"  {due_date}  due {_money(amount_due):>12}  paid {_money(amount_paid):>12}{penalty_note}")
+        lines.append(f"  Paid this period: {_money(loan['paid'])}")
+        if loan["overdue"]:
+            lines.append(f"  Overdue: {_money(loan['overdue'])}")
+        lines.append(f"  Balance: {_money(loan['balance'])}")
+        if loan["upcoming"]:
+            lines.append("  Upcoming: " + ", ".join(f"{due_date} {_money(amount)}" for due_date, amount in loan["upcoming"]))
+        lines.append("")
+    lines.append(f"Total paid this period: {_money(summary['paid'])}")
+    lines.append(f"Total balance: {_money(summary['balance'])}")
+    if summary["next_due_date"]:
+        lines.append(f"Next due date: {summary['next_due_date']}")
+    return "\n".join(lines) + "\n"
+
+def render_html(borrower: Dict[str, Any], summary: Dict[str, Any], period_start: date, period_end: date) -> str:
+    e = html.escape
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">",
+        f"<title>Statement {period_start:%B %Y} - {e(borrower['name'])}</title>",
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}td,th{padding:2px 8px;text-align:right}"
+        "td:first-child,th:first-child{text-align:left}</style></head><body>",
+        f"<h1>Statement {period_start:%B %Y}</h1>",
+        f"<p>{e(borrower['name'])}{' (' + e(borrower['mobile']) + ')' if borrower['mobile'] else ''}<br>"
+        f"Period: {period_start} to {period_end}</p>",
+    ]
+    for loan in summary["loans"]:
+        parts.append(f"<h2>Loan #{loan['id']}</h2><p>Principal {_money(loan['principal'])}, started {loan['start_date']}, {e(loan['status'])}</p>")
+        parts.append("<table><tr><th>Due date</th><th>Due</th><th>Paid</th><th>Penalty</th></tr>")
+        for due_date, amount_due, amount_paid, penalty in loan["installments"]:
+            parts.append(f"<tr><td>{due_date}</td><td>{_money(amount_due)}</td><td>{_money(amount_paid)}</td><td>{_money(penalty)}</td></tr>")
+        parts.append("</table>")
+        parts.append(f"<p>Paid this period: {_money(loan['paid'])}<br>Overdue: {_money(loan['overdue'])}<br>Balance: {_money(loan['balance'])}</p>")
+        if loan["upcoming"]:
+            parts.append("<p>Upcoming: " + ", ".join(f"{due_date} {_money(amount)}" for due_date, amount in loan["upcoming"]) + "</p>")
+    parts.append(f"<h2>Total balance: {_money(summary['balance'])}</h2>")
+    if summary["next_due_date"]:
+        parts.append(f"<p>Next due date: {summary['next_due_date']}</p>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+RENDERERS = {"csv": render_csv, "html": render_html, "text": render_text}
+
+def render_chunk(
+    borrowers: List[Dict[str, Any]],
+    fmt: str,
+    period_start: date,
+    period_end: date,
+    as_of: date
+) -> Tuple[List[Tuple[str, bytes]], List[List[Any]]]:
+    """Render a chunk of borrowers. Returns (filename, document) pairs and their summary.csv rows."""
+    render, ext = RENDERERS[fmt], FORMATS[fmt]
+    documents, summary_rows = [], []
+    for borrower in borrowers:
+        summary = summarize(borrower, period_start, period_end, as_of)
+        filename = _filename(borrower, ext)
+        documents.append((filename, render(borrower, summary, period_start, period_end).encode("utf-8")))
+        summary_rows.append([
+            borrower["id"], borrower["name"], len(summary["loans"]), summary["paid"], summary["due"],
+            summary["overdue"], summary["balance"], summary["next_due_date"] or "", filename
+        ])
+    return documents, summary_rows
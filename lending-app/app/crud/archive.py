@@ -0,0 +1,97 @@
+"""
+Cold archival of installments that belong to closed loans.
+
+`archive_closed_loans` moves the payments of loans completed or cancelled more
+than N days ago into `payment_archive`, one batch of loans per transaction with
+a pause between batches so the nightly run does not starve live traffic. History
+reads (`get_payments_by_loan`, the borrower stats recompute) union both tables,
+and reopening a loan moves its installments back with `restore_payments`.
+"""
+from sqlmodel import select, Session, delete
+from sqlalchemy import event, exists, insert, literal
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.models.payment_archive import PaymentArchive
+from app.crud.sync import next_change_seq
+from datetime import datetime, timedelta
+import asyncio
+
+CLOSED_STATUSES = ("completed", "cancelled")
+ARCHIVE_BATCH_SIZE = 200  # loans per transaction
+ARCHIVE_PAUSE_SECONDS = 0.5
+ARCHIVED_COLUMNS = ["id", "user_id", "loan_id", "due_date", "amount_due", "amount_paid", "paid_at", "penalty_amount", "principal_due", "interest_due", "updated_at", "change_seq"]
+
+@event.listens_for(Loan.status, "set")
+def _track_closed_at(target, value, oldvalue, initiator):
+    if value in CLOSED_STATUSES:
+        if oldvalue not in CLOSED_STATUSES or target.closed_at is None:
+            target.closed_at = datetime.utcnow()
+    else:
+        target.closed_at = None
+
+def payment_history():
+    """Hot and archived installments as one selectable with the Payment columns."""
+    return (
+        select(*[getattr(Payment, column) for column in ARCHIVED_COLUMNS])
+        .union_all(select(*[getattr(PaymentArchive, column) for column in ARCHIVED_COLUMNS]))
+        .subquery()
+    )
+
+async def archive_closed_loans(
+    db: Session,
+    older_than_days: int,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause_seconds: float = ARCHIVE_PAUSE_SECONDS
+) -> int:
+    """Returns the number of installments archived."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        result = await db.execute(
+            select(Loan.id)
+            .where(Loan.status.in_(CLOSED_STATUSES))
+            .where(Loan.closed_at < cutoff)
+            .where(exists().where(Payment.loan_id == Loan.id))
+            .order_by(Loan.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        loan_ids = result.scalars().all()
+        if not loan_ids:
+            break
+
+        await db.execute(
+            insert(PaymentArchive).from_select(
+                ARCHIVED_COLUMNS,
+                select(*[getattr(Payment, column) for column in ARCHIVED_COLUMNS]).where(Payment.loan_id.in_(loan_ids))
+            )
+        )
+        # Moved, not changed, so not audited
+        moved = await db.execute(delete(Payment).where(Payment.loan_id.in_(loan_ids)).execution_options(audit=False))
+        await db.commit()
+        archived += moved.rowcount
+        await asyncio.sleep(pause_seconds)
+
+    return archived
+
+async def restore_payments(db: Session, loan_id: int, user_id: str) -> None:
+    """Move a reopened loan's installments back to the hot table. The caller commits."""
+    has_archived = await db.execute(
+        select(PaymentArchive.id).where(PaymentArchive.loan_id == loan_id).where(PaymentArchive.user_id == user_id).limit(1)
+    )
+    if has_archived.first() is None:
+        return
+
+    seq = await next_change_seq(db, user_id, "payment")
+    columns = [getattr(PaymentArchive, column) for column in ARCHIVED_COLUMNS[:-2]]
+    await db.execute(
+        insert(Payment).from_select(
+            ARCHIVED_COLUMNS,
+            select(*columns, literal(datetime.utcnow()), literal(seq))
+            .where(PaymentArchive.loan_id == loan_id)
+            .where(PaymentArchive.user_id == user_id)
+        )
+    )
+    await db.execute(
+        delete(PaymentArchive).where(PaymentArchive.loan_id == loan_id).where(PaymentArchive.user_id == user_id)
+    )
@@ -0,0 +1,32 @@
+from sqlmodel import select, Session
+from app.models.audit import AuditLog
+from typing import List, Optional
+from datetime import datetime
+
+async def get_audit_logs(
+    db: Session,
+    user_id: str,
+    entity: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    actor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100
+) -> List[AuditLog]:
+    """The user's audit records, newest first. Page with `before_id`, the last id seen."""
+    query = select(AuditLog).where(AuditLog.user_id == user_id)
+    if entity is not None:
+        query = query.where(AuditLog.entity == entity)
+    if entity_id is not None:
+        query = query.where(AuditLog.entity_id == entity_id)
+    if actor is not None:
+        query = query.where(AuditLog.actor == actor)
+    if since is not None:
+        query = query.where(AuditLog.created_at >= since)
+    if until is not None:
+        query = query.where(AuditLog.created_at < until)
+    if before_id is not None:
+        query = query.where(AuditLog.id < before_id)
+    result = await db.execute(query.order_by(AuditLog.id.desc()).limit(limit))
+    return result.scalars().all()
@@ -1,14 +1,31 @@
-from sqlmodel import select, Session, col
+from sqlmodel import select, Session, func
+from sqlalchemy import bindparam, case, or_, literal
 from app.models.borrower import Borrower
+from app.models.borrower_stats import BorrowerStats
+from app.models.loan import Loan
+from app.models.sync import SyncState, SyncTombstone
 from app.schemas.borrower import BorrowerCreate, BorrowerUpdate
-from typing import List, Optional
+from app.core.cache import VersionedCache
+from app.core.config import settings
+from app.core.search import IndexCache, TrigramIndex, normalize_mobile
+from app.crud.archive import payment_history
+from app.crud.lifecycle import OPEN_STATUSES
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date
+import asyncio
+import re
+import weakref
 
 async def create_borrower(db: Session, borrower_data: BorrowerCreate, user_id: str) -> Borrower:
     db_borrower = Borrower(
         **borrower_data.model_dump(),
+        mobile_digits=normalize_mobile(borrower_data.mobile),
         user_id=user_id
     )
     db.add(db_borrower)
+    await db.flush()
+    # Every borrower has a stats row, so listings can sort on the bare indexed columns
+    db.add(BorrowerStats(borrower_id=db_borrower.id, user_id=user_id))
     await db.commit()
     await db.refresh(db_borrower)
     return db_borrower
@@ -30,6 +47,301 @@ async def get_borrowers(db: Session, user_id: str, skip: int = 0, limit: int = 1
     )
     return result.scalars().all()
 
+BORROWER_SORT_COLUMNS = {
+    "created_at": Borrower.created_at,
+    "name": Borrower.name,
+    "risk_score": BorrowerStats.risk_score,
+    "on_time_ratio": BorrowerStats.on_time_ratio,
+    "arrears": BorrowerStats.arrears,
+    "avg_days_late": BorrowerStats.avg_days_late,
+}
+
+def repayment_fields(stats: Optional[BorrowerStats]) -> Dict[str, Any]:
+    """Repayment stats for a borrower response; borrowers without history score as on time."""
+    on_time_ratio = stats.on_time_ratio if stats else 1.0
+    return {
+        "repayment_rate": round(on_time_ratio * 100, 2),
+        "on_time_ratio": on_time_ratio,
+        "avg_days_late": stats.avg_days_late if stats else 0.0,
+        "arrears": round(stats.arrears, 2) if stats else 0.0,
+        "risk_score": round(stats.risk_score, 2) if stats else 0.0,
+    }
+
+def _loan_totals(user_id: str):
+    return (
+        select(
+            Loan.borrower_id.label("borrower_id"),
+            func.count(Loan.id).label("loan_count"),
+            func.sum(Loan.principal).label("total_principal"),
+        )
+        .where(Loan.user_id == user_id)
+        .group_by(Loan.borrower_id)
+        .subquery()
+    )
+
+async def get_borrower_with_stats(db: Session, borrower_id: int, user_id: str) -> Optional[Any]:
+    """One borrower as a (Borrower, BorrowerStats | None, loan_count, total_principal) row."""
+    loan_totals = _loan_totals(user_id)
+    result = await db.execute(
+        select(Borrower, BorrowerStats, loan_totals.c.loan_count, loan_totals.c.total_principal)
+        .outerjoin(BorrowerStats, BorrowerStats.borrower_id == Borrower.id)
+        .outerjoin(loan_totals, loan_totals.c.borrower_id == Borrower.id)
+        .where(Borrower.id == borrower_id)
+        .where(Borrower.user_id == user_id)
+    )
+    return result.first()
+
+async def get_borrowers_with_stats(
+    db: Session,
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: str = "created_at",
+    descending: bool = False,
+    min_risk: Optional[float] = None,
+    max_risk: Optional[float] = None,
+    in_arrears: Optional[bool] = None
+) -> List[Any]:
+    """
+    Borrowers with their loan totals and repayment stats in a single query.
+    Rows are (Borrower, BorrowerStats, loan_count, total_principal). Every
+    borrower has a stats row, so stats are inner joined and sorted on bare
+    columns, and ix_borrower_stats_user_id_risk_score serves the risk sort.
+    """
+    loan_totals = _loan_totals(user_id)
+    query = (
+        select(Borrower, BorrowerStats, loan_totals.c.loan_count, loan_totals.c.total_principal)
+        .join(BorrowerStats, BorrowerStats.borrower_id == Borrower.id)
+        .outerjoin(loan_totals, loan_totals.c.borrower_id == Borrower.id)
+        .where(Borrower.user_id == user_id)
+        .where(BorrowerStats.user_id == user_id)
+    )
+    if min_risk is not None:
+        query = query.where(BORROWER_SORT_COLUMNS["risk_score"] >= min_risk)
+    if max_risk is not None:
+        query = query.where(BORROWER_SORT_COLUMNS["risk_score"] <= max_risk)
+    if in_arrears is not None:
+        arrears = BORROWER_SORT_COLUMNS["arrears"]
+        query = query.where(arrears > 0.005 if in_arrears else arrears <= 0.005)
+
+    order_column = BORROWER_SORT_COLUMNS[sort_by]
+    query = query.order_by(order_column.desc() if descending else order_column, Borrower.id)
+
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.all()
+
+async def get_borrower_stats(db: Session, borrower_id: int, user_id: str) -> Optional[BorrowerStats]:
+    result = await db.execute(
+        select(BorrowerStats)
+        .where(BorrowerStats.borrower_id == borrower_id)
+        .where(BorrowerStats.user_id == user_id)
+    )
+    return result.scalars().first()
+
+_overviews = VersionedCache(ttl_seconds=settings.BORROWER_OVERVIEW_CACHE_SECONDS)
+
+async def get_borrower_overview(db: Session, borrower_id: int, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The borrower, their loans with balances and installments, and totals, in
+    three queries however many loans there are: borrower with repayment stats
+    and the user's change feed position, loans, then the installments of all
+    loans (hot and archived). Results are cached per borrower until the feed
+    moves or the TTL passes, so a hit costs only the first query.
+    """
+    result = await db.execute(
+        select(Borrower, BorrowerStats, SyncState.last_seq)
+        .outerjoin(BorrowerStats, BorrowerStats.borrower_id == Borrower.id)
+        .outerjoin(SyncState, SyncState.user_id == Borrower.user_id)
+        .where(Borrower.id == borrower_id)
+        .where(Borrower.user_id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    borrower, stats, last_seq = row
+    version = last_seq or 0
+    cached = _overviews.get((user_id, borrower_id), version)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(
+        select(Loan)
+        .where(Loan.borrower_id == borrower_id)
+        .where(Loan.user_id == user_id)
+        .order_by(Loan.start_date.desc(), Loan.id.desc())
+    )
+    loans = result.scalars().all()
+
+    installments: Dict[int, List[Dict[str, Any]]] = {loan.id: [] for loan in loans}
+    if loans:
+        history = payment_history()
+        result = await db.execute(
+            select(history)
+            .where(history.c.loan_id.in_(list(installments)))
+            .order_by(history.c.loan_id, history.c.due_date, history.c.id)
+        )
+        for payment in result.mappings():
+            installments[payment["loan_id"]].append({
+                "id": payment["id"],
+                "due_date": payment["due_date"],
+                "amount_due": payment["amount_due"],
+                "amount_paid": payment["amount_paid"],
+                "paid_at": payment["paid_at"],
+                "penalty_amount": payment["penalty_amount"],
+                "principal_due": payment["principal_due"],
+                "interest_due": payment["interest_due"],
+            })
+
+    today = date.today()
+    open_loans = [loan for loan in loans if loan.status in OPEN_STATUSES]
+    overdue = [
+        payment
+        for loan in open_loans
+        for payment in installments[loan.id]
+        if payment["due_date"] < today and payment["amount_paid"] < payment["amount_due"]
+    ]
+    status_counts: Dict[str, int] = {}
+    for loan in loans:
+        status_counts[loan.status] = status_counts.get(loan.status, 0) + 1
+    next_due_dates = [loan.next_due_date for loan in open_loans if loan.next_due_date]
+    last_paid = [loan.last_paid_at for loan in loans if loan.last_paid_at]
+
+    overview = {
+        "borrower": {
+            "id": borrower.id,
+            "user_id": borrower.user_id,
+            "name": borrower.name,
+            "mobile": borrower.mobile,
+            "created_at": borrower.created_at,
+            **repayment_fields(stats),
+        },
+        "loans": [
+            {
+                **loan.model_dump(exclude={"change_seq"}),
+                "installments": installments[loan.id],
+            }
+            for loan in loans
+        ],
+        "stats": {
+            "total_loans": len(loans),
+            "open_loans": len(open_loans),
+            "loans_by_status": status_counts,
+            "total_principal": round(sum(loan.principal for loan in loans), 2),
+            "outstanding_amount": round(sum(loan.outstanding_amount for loan in open_loans), 2),
+            "overdue_amount": round(sum(p["amount_due"] - p["amount_paid"] for p in overdue), 2),
+            "overdue_installments": len(overdue),
+            "penalty_amount": round(sum(p["penalty_amount"] for p in overdue), 2),
+            "total_paid": round(sum(p["amount_paid"] for payments in installments.values() for p in payments), 2),
+            "next_due_date": min(next_due_dates) if next_due_dates else None,
+            "last_paid_at": max(last_paid) if last_paid else None,
+        },
+        "token": str(version),
+    }
+    _overviews.put((user_id, borrower_id), version, overview)
+    return overview
+
+TRIGRAM_MIN_LENGTH = 3  # pg_trgm cannot use its index for shorter LIKE patterns
+_search_indexes = IndexCache()
+_search_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()  # gone once no refresh holds or awaits it
+
+async def _refresh_search_index(db: Session, user_id: str) -> TrigramIndex:
+    """
+    Build the user's in-process index on first use, then catch it up from the
+    change feed: only borrowers stamped or tombstoned after the index position
+    are reloaded.
+    """
+    async with _search_locks.setdefault(user_id, asyncio.Lock()):
+        state = await db.execute(select(SyncState.last_seq).where(SyncState.user_id == user_id))
+        last_seq = state.scalar_one_or_none() or 0
+        index = _search_indexes.get(user_id)
+        if index is not None and index.change_seq >= last_seq:
+            return index
+
+        query = select(Borrower.id, Borrower.name, Borrower.mobile_digits).where(Borrower.user_id == user_id)
+        if index is None:
+            index = TrigramIndex()
+        else:
+            query = query.where(Borrower.change_seq > index.change_seq)
+            deleted = await db.execute(
+                select(SyncTombstone.entity_id)
+                .where(SyncTombstone.user_id == user_id)
+                .where(SyncTombstone.entity == "borrower")
+                .where(SyncTombstone.change_seq > index.change_seq)
+            )
+            for borrower_id in deleted.scalars().all():
+                index.remove(borrower_id)
+
+        result = await db.execute(query)
+        for borrower_id, name, mobile_digits in result.all():
+            index.upsert(borrower_id, name, mobile_digits)
+        index.change_seq = last_seq
+        _search_indexes.put(user_id, index)
+        return index
+
+async def search_borrowers(db: Session, user_id: str, q: str, limit: int = 20) -> List[Tuple[Borrower, str, float]]:
+    """
+    Borrowers matching `q` by name prefix, name substring, fuzzy name
+    similarity or mobile digits. Rows are (Borrower, match, score), best first.
+    """
+    text = q.strip().lower()
+    digits = normalize_mobile(q)
+    if not text:
+        return []
+
+    if db.bind.dialect.name != "postgresql":
+        index = await _refresh_search_index(db, user_id)
+        hits = index.search(text, limit=limit)
+        if not hits:
+            return []
+        result = await db.execute(
+            select(Borrower)
+            .where(Borrower.id.in_([borrower_id for borrower_id, _, _ in hits]))
+            .where(Borrower.user_id == user_id)
+        )
+        borrowers = {borrower.id: borrower for borrower in result.scalars().all()}
+        return [(borrowers[borrower_id], match, score) for borrower_id, match, score in hits if borrower_id in borrowers]
+
+    name = func.lower(Borrower.name)
+    if len(text) < TRIGRAM_MIN_LENGTH and not (digits and len(digits) >= TRIGRAM_MIN_LENGTH):
+        # pg_trgm cannot use its GIN index for one or two characters; a name
+        # prefix is a range scan of ix_borrower_user_id_lower_name instead
+        result = await db.execute(
+            select(Borrower, func.similarity(name, text))
+            .where(Borrower.user_id == user_id)
+            # Rendered inline so the planner sees a constant prefix and turns it into an index range
+            .where(name.like(bindparam("prefix", re.sub(r"([/%_])", r"/\1", text) + "%", literal_execute=True), escape="/"))
+            .order_by(name, Borrower.id)
+            .limit(limit)
+        )
+        return [(borrower, "prefix", round(float(score), 3)) for borrower, score in result.all()]
+
+    # Every predicate below is served by the pg_trgm GIN indexes on
+    # lower(name) and mobile_digits, see the add_borrower_search revision
+    prefix = name.startswith(text, autoescape=True)
+    substring = name.contains(text, autoescape=True)
+    fuzzy = name.op("%")(text)
+    conditions = [prefix, substring, fuzzy]
+    mobile = None
+    if digits and len(digits) >= TRIGRAM_MIN_LENGTH:
+        mobile = Borrower.mobile_digits.contains(digits, autoescape=True)
+        conditions.append(mobile)
+
+    similarity = func.similarity(name, text)
+    ranks = [(prefix, 3), (substring, 2)] + ([(mobile, 2)] if mobile is not None else [])
+    matches = [(prefix, "prefix"), (substring, "substring")] + ([(mobile, "mobile")] if mobile is not None else [])
+    rank = case(*ranks, else_=1)
+    result = await db.execute(
+        select(Borrower, case(*matches, else_=literal("fuzzy")), similarity)
+        .where(Borrower.user_id == user_id)
+        .where(or_(*conditions))
+        .order_by(rank.desc(), similarity.desc(), Borrower.name)
+        .limit(limit)
+    )
+    return [
+        (borrower, match, round(float(score), 3) if match != "mobile" else 1.0)
+        for borrower, match, score in result.all()
+    ]
+
 async def update_borrower(db: Session, borrower_id: int, borrower_update_data: BorrowerUpdate, user_id: str) -> Optional[Borrower]:
     db_borrower = await get_borrower(db, borrower_id, user_id=user_id)
     if not db_borrower:
@@ -41,6 +353,8 @@ async def update_borrower(db: Session, borrower_id: int, borrower_update_data: B
         
     for key, value in update_data.items():
         setattr(db_borrower, key, value)
+    if 'mobile' in update_data:
+        db_borrower.mobile_digits = normalize_mobile(db_borrower.mobile)
     
     await db.commit()
     await db.refresh(db_borrower)
@@ -0,0 +1,214 @@
+"""
+Per-borrower repayment statistics.
+
+Counters are maintained incrementally: `record_collections` runs inside every
+collection transaction and `record_missed_due` runs once a day for the
+installments that just fell due. `recompute_borrower_stats` rebuilds all
+counters from the payment table in borrower_id batches to correct any drift.
+The derived columns (on-time ratio, average days late, risk score) are always
+recalculated in SQL from the counters.
+"""
+from sqlmodel import select, Session, func
+from sqlalchemy import update, case, cast, and_, or_, Float, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models.borrower import Borrower
+from app.models.borrower_stats import BorrowerStats
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.crud.archive import payment_history
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import date, datetime, timedelta
+
+RECOMPUTE_BATCH_SIZE = 5000
+
+def _derived_values() -> Dict:
+    due = BorrowerStats.installments_due
+    late = BorrowerStats.late_settlements
+    on_time_ratio = case((due > 0, cast(due - BorrowerStats.missed_installments, Float) / due), else_=1.0)
+    avg_days_late = case((late > 0, cast(BorrowerStats.total_days_late, Float) / late), else_=0.0)
+    # 50 points for the missed share, up to 30 for lateness (capped at 30 days), 20 while in arrears
+    risk_score = (
+        50 * (1 - on_time_ratio)
+        + case((avg_days_late > 30, 30.0), else_=avg_days_late)
+        + case((BorrowerStats.arrears > 0.005, 20.0), else_=0.0)
+    )
+    return {
+        "on_time_ratio": on_time_ratio,
+        "avg_days_late": avg_days_late,
+        "risk_score": risk_score,
+        "updated_at": datetime.utcnow(),
+    }
+
+async def _ensure_rows(db: Session, rows: Iterable[Tuple[int, str]]) -> None:
+    values = [{"borrower_id": borrower_id, "user_id": user_id} for borrower_id, user_id in rows]
+    if not values:
+        return
+    upsert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    await db.execute(upsert(BorrowerStats).values(values).on_conflict_do_nothing(index_elements=["borrower_id"]))
+
+def _days_between(later, earlier, dialect_name: str):
+    if dialect_name == "postgresql":
+        return later - earlier
+    return func.julianday(later) - func.julianday(earlier)
+
+async def record_collections(
+    db: Session,
+    user_id: str,
+    collections: Iterable[Tuple[int, date, float, float, float, datetime]]
+) -> None:
+    """
+    Update stats for (loan_id, due_date, amount_due, amount_paid_after, applied, paid_at)
+    collections. Runs inside the caller's transaction; the caller commits.
+    """
+    collections = list(collections)
+    if not collections:
+        return
+
+    result = await db.execute(
+        select(Loan.id, Loan.borrower_id)
+        .where(Loan.id.in_(list({c[0] for c in collections})))
+        .where(Loan.user_id == user_id)
+    )
+    borrower_of = dict(result.all())
+
+    today = date.today()
+    arrears_paid: Dict[int, float] = {}
+    late_settlements: Dict[int, int] = {}
+    days_late: Dict[int, int] = {}
+    for loan_id, due_date, amount_due, amount_paid, applied, paid_at in collections:
+        borrower_id = borrower_of.get(loan_id)
+        if borrower_id is None:
+            continue
+        if due_date < today:
+            arrears_paid[borrower_id] = round(arrears_paid.get(borrower_id, 0.0) + applied, 2)
+        settled_now = amount_paid >= amount_due and amount_paid - applied < amount_due
+        if settled_now and paid_at.date() > due_date:
+            late_settlements[borrower_id] = late_settlements.get(borrower_id, 0) + 1
+            days_late[borrower_id] = days_late.get(borrower_id, 0) + (paid_at.date() - due_date).days
+
+    borrower_ids = list(set(arrears_paid) | set(late_settlements))
+    if not borrower_ids:
+        return
+
+    await _ensure_rows(db, ((borrower_id, user_id) for borrower_id in borrower_ids))
+    counters = {}
+    if arrears_paid:
+        arrears = BorrowerStats.arrears - case(arrears_paid, value=BorrowerStats.borrower_id, else_=0.0)
+        counters["arrears"] = case((arrears < 0, 0.0), else_=arrears)
+    if late_settlements:
+        counters["late_settlements"] = BorrowerStats.late_settlements + case(late_settlements, value=BorrowerStats.borrower_id, else_=0)
+        counters["total_days_late"] = BorrowerStats.total_days_late + case(days_late, value=BorrowerStats.borrower_id, else_=0)
+    await db.execute(update(BorrowerStats).where(BorrowerStats.borrower_id.in_(borrower_ids)).values(**counters))
+    await db.execute(update(BorrowerStats).where(BorrowerStats.borrower_id.in_(borrower_ids)).values(**_derived_values()))
+
+async def record_missed_due(db: Session, day: Optional[date] = None) -> int:
+    """
+    Count the installments that fell due on `day` (default yesterday) for every
+    borrower, with one grouped SELECT and one UPDATE ... FROM. Running it twice
+    for the same day double counts, which the nightly recompute corrects.
+    """
+    day = day or date.today() - timedelta(days=1)
+    unpaid = Payment.amount_paid < Payment.amount_due
+    due_today = (
+        select(
+            Loan.borrower_id.label("borrower_id"),
+            Loan.user_id.label("user_id"),
+            func.count().label("due"),
+            func.sum(case((unpaid, 1), else_=0)).label("missed"),
+            func.sum(case((unpaid, Payment.amount_due - Payment.amount_paid), else_=0.0)).label("arrears"),
+        )
+        .join(Loan, Payment.loan_id == Loan.id)
+        .where(Payment.due_date == day)
+        .group_by(Loan.borrower_id, Loan.user_id)
+    )
+    rows = (await db.execute(due_today)).all()
+    if not rows:
+        return 0
+
+    await _ensure_rows(db, ((row.borrower_id, row.user_id) for row in rows))
+    transitions = due_today.subquery()
+    await db.execute(
+        update(BorrowerStats)
+        .where(BorrowerStats.borrower_id == transitions.c.borrower_id)
+        .values(
+            installments_due=BorrowerStats.installments_due + transitions.c.due,
+            missed_installments=BorrowerStats.missed_installments + transitions.c.missed,
+            arrears=BorrowerStats.arrears + transitions.c.arrears,
+        )
+    )
+    await db.execute(
+        update(BorrowerStats)
+        .where(BorrowerStats.borrower_id.in_([row.borrower_id for row in rows]))
+        .values(**_derived_values())
+    )
+    await db.commit()
+    return len(rows)
+
+async def recompute_borrower_stats(db: Session, batch_size: int = RECOMPUTE_BATCH_SIZE) -> int:
+    """
+    Rebuild every borrower's stats from the payment history, one borrower_id
+    range per transaction. Returns the number of borrowers processed.
+    """
+    dialect_name = db.bind.dialect.name
+    today = date.today()
+    # Archived installments of closed loans still count towards the history
+    history = payment_history()
+    past_due = history.c.due_date < today
+    unpaid = history.c.amount_paid < history.c.amount_due
+    paid_date = func.date(history.c.paid_at)
+    settled_late = and_(history.c.amount_paid >= history.c.amount_due, paid_date > history.c.due_date)
+
+    processed = 0
+    last_id = 0
+    while True:
+        ids_result = await db.execute(
+            select(Borrower.id, Borrower.user_id)
+            .where(Borrower.id > last_id)
+            .order_by(Borrower.id)
+            .limit(batch_size)
+        )
+        batch = ids_result.all()
+        if not batch:
+            break
+        first_id, last_id = batch[0][0], batch[-1][0]
+        in_batch = and_(BorrowerStats.borrower_id >= first_id, BorrowerStats.borrower_id <= last_id)
+
+        await _ensure_rows(db, batch)
+
+        totals = (
+            select(
+                Loan.borrower_id.label("borrower_id"),
+                func.sum(case((past_due, 1), else_=0)).label("due"),
+                func.sum(case((and_(past_due, or_(unpaid, paid_date > history.c.due_date)), 1), else_=0)).label("missed"),
+                func.sum(case((settled_late, 1), else_=0)).label("late"),
+                cast(func.sum(case((settled_late, _days_between(paid_date, history.c.due_date, dialect_name)), else_=0)), Integer).label("days_late"),
+                func.sum(case((and_(past_due, unpaid), history.c.amount_due - history.c.amount_paid), else_=0.0)).label("arrears"),
+            )
+            .join(Loan, history.c.loan_id == Loan.id)
+            .where(Loan.borrower_id.between(first_id, last_id))
+            .group_by(Loan.borrower_id)
+            .subquery()
+        )
+        # Borrowers without installments in this range are reset first
+        await db.execute(
+            update(BorrowerStats)
+            .where(in_batch)
+            .values(installments_due=0, missed_installments=0, late_settlements=0, total_days_late=0, arrears=0.0)
+        )
+        await db.execute(
+            update(BorrowerStats)
+            .where(BorrowerStats.borrower_id == totals.c.borrower_id)
+            .values(
+                installments_due=totals.c.due,
+                missed_installments=totals.c.missed,
+                late_settlements=totals.c.late,
+                total_days_late=totals.c.days_late,
+                arrears=totals.c.arrears,
+            )
+        )
+        await db.execute(update(BorrowerStats).where(in_batch).values(**_derived_values()))
+        await db.commit()
+        processed += len(batch)
+
+    return processed
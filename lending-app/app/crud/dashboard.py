@@ -0,0 +1,226 @@
+from sqlmodel import select, func, Session
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.models.borrower import Borrower
+from app.crud.snapshot import get_latest_snapshot_on_or_before
+from app.crud.lifecycle import OPEN_STATUSES
+from typing import Dict, Any, List
+from datetime import date, timedelta
+import calendar
+
+async def get_summary(db: Session, user_id: str) -> Dict[str, Any]:
+    today = date.today()
+    
+    # Count active borrowers
+    borrower_count_result = await db.execute(select(func.count()).select_from(Borrower).where(Borrower.user_id == user_id))
+    active_borrowers = borrower_count_result.scalar() or 0
+    
+    # Count loans
+    loan_count_result = await db.execute(select(func.count()).select_from(Loan).where(Loan.user_id == user_id))
+    loan_count = loan_count_result.scalar() or 0
+    
+    # Get all active loans with outstanding balances
+    # Calculate the total loans value (includes both principal and interest)
+    outstanding_balance_result = await db.execute(
+        select(func.sum(Payment.amount_due - Payment.amount_paid))
+        .join(Loan, Payment.loan_id == Loan.id)
+        .where(Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id, Loan.status.in_(OPEN_STATUSES))
+    )
+    outstanding_balance = outstanding_balance_result.scalar() or 0
+    
+    # Also get the principal sum for historical comparison
+    principal_result = await db.execute(select(func.sum(Loan.principal)).where(Loan.user_id == user_id))
+    principal_sum = principal_result.scalar() or 0
+    
+    # Use the sum of outstanding balances as the total loans amount
+    total_loans_amount = outstanding_balance
+    
+    # Sum payments due today
+    due_today_result = await db.execute(
+        select(func.sum(Payment.amount_due - Payment.amount_paid))
+        .join(Loan, Payment.loan_id == Loan.id)
+        .where(Payment.due_date == today, Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id, Loan.status.in_(OPEN_STATUSES))
+    )
+    due_today = due_today_result.scalar() or 0
+    
+    # Sum overdue payments
+    overdue_result = await db.execute(
+        select(func.sum(Payment.amount_due - Payment.amount_paid))
+        .join(Loan, Payment.loan_id == Loan.id)
+        .where(Payment.due_date < today, Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id, Loan.status.in_(OPEN_STATUSES))
+    )
+    overdue_amount = overdue_result.scalar() or 0
+    
+    # Calculate percentage changes (if possible)
+    # Compare with the nightly snapshot from a week ago; before snapshots
+    # exist, fall back to estimating last week from today's rows
+    last_week = today - timedelta(days=7)
+    last_week_snapshot = await get_latest_snapshot_on_or_before(db, user_id, last_week)
+
+    if last_week_snapshot is not None:
+        last_week_outstanding = last_week_snapshot.outstanding or 1  # avoid division by zero
+        last_week_borrowers = last_week_snapshot.borrowers or 1
+    else:
+        # For outstanding balances, get last week's data
+        last_week_outstanding_result = await db.execute(
+            select(func.sum(Payment.amount_due - Payment.amount_paid))
+            .join(Loan, Payment.loan_id == Loan.id)
+            .where(Loan.created_at <= last_week, Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id)
+        )
+        last_week_outstanding = last_week_outstanding_result.scalar() or 1  # avoid division by zero
+
+        # For borrowers, compare with previous week
+        last_week_borrowers_result = await db.execute(
+            select(func.count())
+            .select_from(Borrower)
+            .where(Borrower.created_at <= last_week, Borrower.user_id == user_id)
+        )
+        last_week_borrowers = last_week_borrowers_result.scalar() or 1  # avoid division by zero
+    
+    # Calculate percentage changes
+    if last_week_outstanding > 0 and total_loans_amount > 0:
+        loans_change = round(((total_loans_amount - last_week_outstanding) / last_week_outstanding) * 100)
+    else:
+        loans_change = 0
+        
+    if last_week_borrowers > 0 and active_borrowers > 0:
+        borrowers_change = round(((active_borrowers - last_week_borrowers) / last_week_borrowers) * 100)
+    else:
+        borrowers_change = 0
+    
+    return {
+        "active_borrowers": int(active_borrowers),
+        "total_loans_amount": float(total_loans_amount),
+        "due_today": float(due_today),
+        "overdue_amount": float(overdue_amount),
+        "loans_change": int(loans_change),
+        "borrowers_change": int(borrowers_change)
+    }
+
+async def get_expected_profit(db: Session, user_id: str, months: int = 12) -> List[Dict[str, Any]]:
+    """Expected interest collected per month for the next `months` months, from active loans."""
+    today = date.today()
+    result = []
+    
+    # Calculate the expected profit for each month
+    for i in range(months):
+        # Calculate the month we're looking at
+        target_month = today.month + i
+        target_year = today.year + (target_month - 1) // 12
+        target_month = ((target_month - 1) % 12) + 1
+        
+        # Get the first and last day of the target month
+        first_day = date(target_year, target_month, 1)
+        last_day = date(target_year, target_month, 
+                        calendar.monthrange(target_year, target_month)[1])
+        
+        # Query for expected payments in this month from active loans
+        # For profit calculation, we only consider the interest portion of payments
+        query = select(
+            func.sum(Payment.amount_due - Payment.amount_paid)
+        ).join(
+            Loan, Payment.loan_id == Loan.id
+        ).where(
+            Payment.due_date >= first_day,
+            Payment.due_date <= last_day,
+            Loan.status == "active",
+            Loan.user_id == user_id
+        )
+        
+        total_due_result = await db.execute(query)
+        total_due = total_due_result.scalar() or 0
+        
+        # Get principal portion from the same time period to calculate interest
+        principal_query = select(
+            func.sum(Loan.principal / Loan.term_units)
+        ).join(
+            Payment, Payment.loan_id == Loan.id
+        ).where(
+            Payment.due_date >= first_day,
+            Payment.due_date <= last_day,
+            Loan.status == "active",
+            Loan.user_id == user_id
+        )
+        
+        principal_result = await db.execute(principal_query)
+        principal_portion = principal_result.scalar() or 0
+        
+        # Calculate expected profit (total due minus principal portion)
+        expected_profit = max(0, total_due - principal_portion)
+        
+        # Add to results
+        result.append({
+            "month": f"{calendar.month_name[target_month]} {target_year}",
+            "month_key": f"{target_year}-{target_month:02d}",
+            "expected_profit": round(expected_profit, 2)
+        })
+    
+    return result
+
+async def get_todays_reminders(db: Session, user_id: str) -> List[Dict[str, Any]]:
+    """Unpaid installments due today or tomorrow, with the borrower's name."""
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+    
+    # Get payments due today or tomorrow along with loan and borrower info
+    query = select(
+        Payment, 
+        Loan.id.label("loan_id"), 
+        Borrower.name.label("borrower_name")
+    ).join(
+        Loan, Payment.loan_id == Loan.id
+    ).join(
+        Borrower, Loan.borrower_id == Borrower.id
+    ).where(
+        Payment.due_date.between(today, tomorrow),
+        Payment.amount_paid < Payment.amount_due,
+        Loan.user_id == user_id
+    )
+    
+    result = await db.execute(query)
+    rows = result.all()
+    
+    # Format the results for the frontend
+    reminders = []
+    for row in rows:
+        payment, loan_id, borrower_name = row
+        reminders.append({
+            "id": payment.id,
+            "loan_id": payment.loan_id,
+            "borrower_name": borrower_name,
+            "type": "due_today" if payment.due_date == today else "due_tomorrow",
+            "message": f"Payment of ₱{payment.amount_due - payment.amount_paid:.2f} is due today" 
+                if payment.due_date == today 
+                else f"Payment of ₱{payment.amount_due - payment.amount_paid:.2f} is due tomorrow",
+            "amount": payment.amount_due - payment.amount_paid
+        })
+    
+    return reminders
+
+async def get_recent_payments(db: Session, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """The latest collected installments with their borrower."""
+    # Get payments that have been paid (paid_at is not null)
+    query = (
+        select(Payment, Borrower)
+        .join(Loan, Payment.loan_id == Loan.id)
+        .join(Borrower, Loan.borrower_id == Borrower.id)
+        .where(Payment.paid_at.is_not(None))
+        .where(Payment.user_id == user_id)
+        .order_by(Payment.paid_at.desc())
+        .limit(limit)
+    )
+    
+    result = await db.execute(query)
+    return [
+        {
+            "id": payment.id,
+            "loan_id": payment.loan_id,
+            "user_id": payment.user_id,
+            "borrower_id": borrower.id,
+            "borrower_name": borrower.name,
+            "amount_paid": payment.amount_paid,
+            "payment_date": payment.paid_at,
+            "payment_method": "cash"  # Default to cash as payment method isn't stored
+        }
+        for payment, borrower in result
+    ]
@@ -0,0 +1,92 @@
+"""
+Predicate builders for the filtered `/loans/` and `/payments/` listings.
+
+Every predicate compares a bare column against bound values (equality, IN or
+a range), so it can use the composite (user_id, ...) indexes on loan and
+payment. Nothing wraps a column in a function. Case variants of enum-like
+values become an IN list rather than lower(column).
+"""
+from sqlmodel import select
+from app.models.loan import Loan
+from app.models.payment import Payment
+from typing import List, Optional
+from datetime import date, timedelta
+
+def _variants(value: str) -> List[str]:
+    return list({value, value.lower(), value.upper()})
+
+def _range(column, low, high) -> List:
+    conditions = []
+    if low is not None:
+        conditions.append(column >= low)
+    if high is not None:
+        conditions.append(column <= high)
+    return conditions
+
+def loan_conditions(
+    user_id: str,
+    status: Optional[str] = None,
+    term_frequency: Optional[str] = None,
+    repayment_type: Optional[str] = None,
+    borrower_id: Optional[int] = None,
+    start_from: Optional[date] = None,
+    start_to: Optional[date] = None,
+    principal_min: Optional[float] = None,
+    principal_max: Optional[float] = None,
+    outstanding_min: Optional[float] = None,
+    outstanding_max: Optional[float] = None
+) -> List:
+    conditions = [Loan.user_id == user_id]
+    if status is not None:
+        conditions.append(Loan.status.in_(_variants(status)))
+    if term_frequency is not None:
+        conditions.append(Loan.term_frequency.in_(_variants(term_frequency)))
+    if repayment_type is not None:
+        conditions.append(Loan.repayment_type.in_(_variants(repayment_type)))
+    if borrower_id is not None:
+        conditions.append(Loan.borrower_id == borrower_id)
+    conditions += _range(Loan.start_date, start_from, start_to)
+    conditions += _range(Loan.principal, principal_min, principal_max)
+    conditions += _range(Loan.outstanding_amount, outstanding_min, outstanding_max)
+    return conditions
+
+def payment_conditions(
+    user_id: str,
+    loan_id: Optional[int] = None,
+    status: Optional[str] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    paid_from: Optional[date] = None,
+    paid_to: Optional[date] = None,
+    loan_status: Optional[str] = None,
+    today: Optional[date] = None,
+    **loan_filters
+) -> List:
+    """
+    `status` is paid, unpaid or overdue; `loan_status` filters on the loan.
+    Loan filters (borrower_id, term_frequency, ...) are applied through an IN
+    subquery on the loan indexes.
+    """
+    today = today or date.today()
+    conditions = [Payment.user_id == user_id]
+    if loan_id is not None:
+        conditions.append(Payment.loan_id == loan_id)
+    if status == "paid":
+        conditions.append(Payment.amount_paid >= Payment.amount_due)
+    elif status == "unpaid":
+        conditions.append(Payment.amount_paid < Payment.amount_due)
+    elif status == "overdue":
+        conditions += [Payment.amount_paid < Payment.amount_due, Payment.due_date < today]
+    conditions += _range(Payment.due_date, due_from, due_to)
+    if paid_from is not None:
+        conditions.append(Payment.paid_at >= paid_from)
+    if paid_to is not None:
+        # paid_at is a timestamp; compare against the start of the next day
+        conditions.append(Payment.paid_at < paid_to + timedelta(days=1))
+
+    loan_filters["status"] = loan_status
+    active_loan_filters = {key: value for key, value in loan_filters.items() if value is not None}
+    if active_loan_filters:
+        loans = select(Loan.id).where(*loan_conditions(user_id, **active_loan_filters))
+        conditions.append(Payment.loan_id.in_(loans))
+    return conditions
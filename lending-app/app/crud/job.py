@@ -0,0 +1,126 @@
+"""
+Job rows and their state transitions. The worker loop lives in app/core/jobs.py.
+
+Claiming is a conditional UPDATE (status still queued), so two workers can
+never both start the same job, with or without row locks.
+"""
+from sqlmodel import select, Session
+from sqlalchemy import update
+from app.models.job import Job
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
+import uuid
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+async def create_job(db: Session, user_id: str, kind: str, params: Dict[str, Any], max_attempts: int = 3) -> Job:
+    job = Job(id=uuid.uuid4().hex, user_id=user_id, kind=kind, params=params, max_attempts=max_attempts)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def get_job(db: Session, job_id: str, user_id: Optional[str] = None) -> Optional[Job]:
+    query = select(Job).where(Job.id == job_id)
+    if user_id is not None:
+        query = query.where(Job.user_id == user_id)
+    result = await db.execute(query)
+    return result.scalars().first()
+
+async def get_jobs(db: Session, user_id: str, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+    query = select(Job).where(Job.user_id == user_id)
+    if status is not None:
+        query = query.where(Job.status == status)
+    result = await db.execute(query.order_by(Job.created_at.desc()).limit(limit))
+    return result.scalars().all()
+
+async def request_cancel(db: Session, job: Job) -> Job:
+    """Queued jobs are cancelled at once; running ones are flagged for the worker."""
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+    elif job.status == "running":
+        job.cancel_requested = True
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def claim_next_job(db: Session, kinds: Iterable[str]) -> Optional[Job]:
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(Job.id)
+        .where(Job.status == "queued")
+        .where(Job.run_after <= now)
+        .where(Job.kind.in_(list(kinds)))
+        .order_by(Job.run_after, Job.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = result.scalar_one_or_none()
+    if job_id is None:
+        await db.rollback()
+        return None
+    return await claim_job(db, job_id)
+
+async def claim_job(db: Session, job_id: str) -> Optional[Job]:
+    """Move a queued job to running. Returns None if another worker got there first."""
+    now = datetime.utcnow()
+    claimed = await db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.status == "queued")
+        .values(status="running", attempts=Job.attempts + 1, started_at=now, heartbeat_at=now, error=None)
+    )
+    await db.commit()
+    if claimed.rowcount != 1:
+        return None
+    return await db.get(Job, job_id, populate_existing=True)
+
+async def heartbeat(db: Session, job_id: str, progress: Optional[float] = None, message: Optional[str] = None) -> bool:
+    """Mark the job alive, optionally with progress. Returns True if cancellation was requested."""
+    values: Dict[str, Any] = {"heartbeat_at": datetime.utcnow()}
+    if progress is not None:
+        values["progress"] = max(0.0, min(1.0, progress))
+    if message is not None:
+        values["progress_message"] = message
+    await db.execute(update(Job).where(Job.id == job_id).values(**values))
+    result = await db.execute(select(Job.cancel_requested).where(Job.id == job_id))
+    await db.commit()
+    return bool(result.scalar_one_or_none())
+
+async def finish_job(db: Session, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+    values: Dict[str, Any] = {"status": status, "finished_at": datetime.utcnow(), "error": error}
+    if status == "succeeded":
+        values.update(progress=1.0, result=result)
+    await db.execute(update(Job).where(Job.id == job_id).values(**values))
+    await db.commit()
+
+async def retry_or_fail(db: Session, job: Job, error: str, base_delay_seconds: float) -> str:
+    """Requeue with exponential backoff while attempts remain. Returns the new status."""
+    if job.attempts < job.max_attempts:
+        delay = base_delay_seconds * 2 ** (job.attempts - 1)
+        await db.execute(
+            update(Job)
+            .where(Job.id == job.id)
+            .values(status="queued", error=error, run_after=datetime.utcnow() + timedelta(seconds=delay))
+        )
+        await db.commit()
+        return "queued"
+    await finish_job(db, job.id, "failed", error=error)
+    return "failed"
+
+async def requeue_stale_jobs(db: Session, stale_after_seconds: float) -> int:
+    """Running jobs whose worker stopped heartbeating go back to the queue (or fail if out of attempts)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+    stale = (Job.status == "running", Job.heartbeat_at < cutoff)
+    cancelled = await db.execute(
+        update(Job).where(*stale, Job.cancel_requested == True).values(status="cancelled", finished_at=datetime.utcnow())
+    )
+    failed = await db.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status="failed", error="Worker stopped while running the job", finished_at=datetime.utcnow())
+    )
+    requeued = await db.execute(update(Job).where(*stale).values(status="queued", run_after=datetime.utcnow()))
+    await db.commit()
+    return cancelled.rowcount + failed.rowcount + requeued.rowcount
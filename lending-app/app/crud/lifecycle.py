@@ -0,0 +1,123 @@
+"""
+Automatic loan status transitions.
+
+A loan is completed once every installment is paid and defaulted once an
+installment has been overdue for `settings.DEFAULT_AFTER_DAYS`. The nightly
+`run_lifecycle` job applies both rules with one UPDATE per batch of loans.
+Collections also call `complete_paid_loans` for the loans they touched, so a
+loan closes in the same transaction as its last payment. Corrections, added
+installments and regenerated schedules that reopen a balance call
+`reopen_unpaid_loans`.
+
+These are set-based statements, so they stamp change_seq and closed_at
+themselves (see app/crud/sync.py and app/crud/archive.py) and write one audit
+record per loan with its old and new status.
+"""
+from sqlmodel import select, Session
+from sqlalchemy import update, case, exists
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.core import audit
+from app.crud.sync import next_change_seq
+from app.crud.archive import CLOSED_STATUSES
+from typing import Iterable, Optional
+from datetime import date, datetime, timedelta
+
+OPEN_STATUSES = ("active", "defaulted")  # loans that can still have money to collect
+LIFECYCLE_BATCH_SIZE = 500  # loans per transaction
+
+def _has_installments():
+    return exists().where(Payment.loan_id == Loan.id)
+
+def _has_unpaid(due_before: Optional[date] = None):
+    query = exists().where(Payment.loan_id == Loan.id).where(Payment.amount_paid < Payment.amount_due)
+    if due_before is not None:
+        query = query.where(Payment.due_date < due_before)
+    return query
+
+async def _set_status(db: Session, loans, status: str) -> None:
+    """Move (id, user_id, status) rows to `status`, stamping each user's next change seq."""
+    seqs = {}
+    for user_id in sorted({user_id for _, user_id, _ in loans}):
+        seqs[user_id] = await next_change_seq(db, user_id, "loan")
+    now = datetime.utcnow()
+    await db.execute(
+        update(Loan)
+        .where(Loan.id.in_([loan_id for loan_id, _, _ in loans]))
+        .values(
+            status=status,
+            closed_at=now if status in CLOSED_STATUSES else None,
+            updated_at=now,
+            change_seq=case(seqs, value=Loan.user_id)
+        )
+        # Audited per loan below instead of as one statement
+        .execution_options(synchronize_session=False, audit=False)
+    )
+    for loan_id, user_id, old_status in loans:
+        audit.record_row(db, Loan, loan_id, user_id, "update", {"status": [old_status, status]})
+
+async def _transition_all(db: Session, from_statuses, status: str, batch_size: int, *criteria) -> int:
+    moved = 0
+    while True:
+        result = await db.execute(
+            select(Loan.id, Loan.user_id, Loan.status)
+            .where(Loan.status.in_(from_statuses), *criteria)
+            .order_by(Loan.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        loans = result.all()
+        if not loans:
+            return moved
+        await _set_status(db, loans, status)
+        await db.commit()
+        moved += len(loans)
+
+async def complete_paid_loans(db: Session, user_id: str, loan_ids: Iterable[int]) -> int:
+    """Complete the given open loans that have nothing left to pay. The caller commits."""
+    loan_ids = list(set(loan_ids))
+    if not loan_ids:
+        return 0
+    result = await db.execute(
+        select(Loan.id, Loan.user_id, Loan.status)
+        .where(Loan.id.in_(loan_ids))
+        .where(Loan.user_id == user_id)
+        .where(Loan.status.in_(OPEN_STATUSES))
+        .where(_has_installments())
+        .where(~_has_unpaid())
+    )
+    loans = result.all()
+    if loans:
+        await _set_status(db, loans, "completed")
+    return len(loans)
+
+async def reopen_unpaid_loans(db: Session, user_id: str, loan_ids: Iterable[int]) -> int:
+    """Reactivate completed loans whose balance was reopened by a correction. The caller commits."""
+    loan_ids = list(set(loan_ids))
+    if not loan_ids:
+        return 0
+    result = await db.execute(
+        select(Loan.id, Loan.user_id, Loan.status)
+        .where(Loan.id.in_(loan_ids))
+        .where(Loan.user_id == user_id)
+        .where(Loan.status == "completed")
+        .where(_has_unpaid())
+    )
+    loans = result.all()
+    if loans:
+        await _set_status(db, loans, "active")
+    return len(loans)
+
+async def run_lifecycle(
+    db: Session,
+    default_after_days: int,
+    today: Optional[date] = None,
+    batch_size: int = LIFECYCLE_BATCH_SIZE
+) -> dict:
+    """Complete fully paid loans and default long-delinquent ones. Returns counts per transition."""
+    today = today or date.today()
+    completed = await _transition_all(db, OPEN_STATUSES, "completed", batch_size, _has_installments(), ~_has_unpaid())
+    defaulted = await _transition_all(
+        db, ("active",), "defaulted", batch_size, _has_unpaid(today - timedelta(days=default_after_days))
+    )
+    return {"completed": completed, "defaulted": defaulted}
@@ -2,9 +2,16 @@ from sqlmodel import select, Session, delete
 from sqlalchemy.orm import selectinload
 from app.models.loan import Loan
 from app.models.payment import Payment
+from app.crud.payment import ledger_entry, new_collection_id
+from app.crud.borrower_stats import record_collections
+from app.crud.filters import loan_conditions
+from app.crud.archive import CLOSED_STATUSES, restore_payments
+from app.crud.lifecycle import reopen_unpaid_loans
+from app.crud.loan_balance import apply_schedule, refresh_loan_balances
+from app.core.schedule import compute_schedule
 from app.schemas.loan import LoanCreate, LoanUpdate
-from typing import List, Optional, Dict, Any
-from datetime import date, timedelta, datetime
+from typing import List, Optional, Dict, Any, Sequence
+from datetime import date, datetime
 
 async def create_loan(db: Session, loan: LoanCreate, user_id: str) -> Loan:
     db_loan = Loan(**loan.model_dump(), user_id=user_id)
@@ -23,17 +30,64 @@ async def get_loan(db: Session, loan_id: int, user_id: str) -> Optional[Loan]:
     )
     return result.scalars().first()
 
-async def get_loans(db: Session, user_id: str, skip: int = 0, limit: int = 100) -> List[Loan]:
+# Columns of the loan list and detail responses, selectable with ?fields=
+LOAN_FIELDS = (
+    "id", "user_id", "borrower_id", "principal", "interest_rate_percent", "term_units", "term_frequency",
+    "repayment_type", "start_date", "status", "created_at", "outstanding_amount", "paid_installments",
+    "next_due_date", "last_paid_at",
+)
+
+async def get_loan_row(db: Session, loan_id: int, user_id: str, fields: Sequence[str] = LOAN_FIELDS) -> Optional[Dict[str, Any]]:
+    """One loan's `fields` as a dict, selected as bare columns."""
     result = await db.execute(
-        select(Loan).where(Loan.user_id == user_id).offset(skip).limit(limit)
+        select(*[getattr(Loan, field) for field in fields]).where(Loan.id == loan_id).where(Loan.user_id == user_id)
     )
-    return result.scalars().all()
-
-async def get_loans_by_borrower(db: Session, borrower_id: int, user_id: str) -> List[Loan]:
+    row = result.mappings().first()
+    return dict(row) if row is not None else None
+
+# Each ordering has a (user_id, column) index, see the add_listing_indexes revision
+LOAN_SORT_COLUMNS = {
+    "created_at": Loan.created_at,
+    "start_date": Loan.start_date,
+    "principal": Loan.principal,
+}
+
+async def get_loans(
+    db: Session,
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: str = "created_at",
+    descending: bool = False,
+    fields: Sequence[str] = LOAN_FIELDS,
+    **filters
+) -> List[Dict[str, Any]]:
+    """
+    `fields` of the loans matching `filters` (see
+    `app.crud.filters.loan_conditions`), as dicts rather than entities.
+    """
+    order_column = LOAN_SORT_COLUMNS[sort_by]
+    result = await db.execute(
+        select(*[getattr(Loan, field) for field in fields])
+        .where(*loan_conditions(user_id, **filters))
+        .order_by(order_column.desc() if descending else order_column, Loan.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return [dict(row) for row in result.mappings()]
+
+async def get_loans_by_borrower(
+    db: Session,
+    borrower_id: int,
+    user_id: str,
+    fields: Sequence[str] = LOAN_FIELDS
+) -> List[Dict[str, Any]]:
     result = await db.execute(
-        select(Loan).where(Loan.borrower_id == borrower_id).where(Loan.user_id == user_id)
+        select(*[getattr(Loan, field) for field in fields])
+        .where(Loan.borrower_id == borrower_id)
+        .where(Loan.user_id == user_id)
     )
-    return result.scalars().all()
+    return [dict(row) for row in result.mappings()]
 
 async def update_loan(db: Session, loan_id: int, loan_update_data: LoanUpdate, user_id: str) -> Optional[Loan]:
     db_loan = await get_loan(db, loan_id, user_id=user_id)
@@ -44,8 +98,11 @@ async def update_loan(db: Session, loan_id: int, loan_update_data: LoanUpdate, u
     if 'user_id' in update_data:
         del update_data['user_id']
         
+    was_closed = db_loan.status in CLOSED_STATUSES
     for key, value in update_data.items():
         setattr(db_loan, key, value)
+    if was_closed and db_loan.status not in CLOSED_STATUSES:
+        await restore_payments(db, loan_id, user_id=user_id)
     
     await db.commit()
     await db.refresh(db_loan)
@@ -74,11 +131,20 @@ async def renew_loan(db: Session, loan_id: int, user_id: str) -> Optional[Loan]:
     if original_loan.status in ["completed", "cancelled"]:
         return None
 
+    collection_id = new_collection_id()
+    settlements = []
     for payment in original_loan.payments:
         if payment.paid_at is None or payment.amount_paid < payment.amount_due:
+            settled = round(payment.amount_due - payment.amount_paid, 2)
             payment.amount_paid = payment.amount_due
             payment.paid_at = datetime.utcnow()
             db.add(payment)
+            if settled:
+                db.add(ledger_entry(payment, settled, payment.paid_at, collection_id))
+                settlements.append((payment.loan_id, payment.due_date, payment.amount_due, payment.amount_paid, settled, payment.paid_at))
+
+    await record_collections(db, user_id, settlements)
+    await refresh_loan_balances(db, user_id, [original_loan.id])
 
     original_loan.status = "completed"
     db.add(original_loan)
@@ -101,101 +167,28 @@ async def renew_loan(db: Session, loan_id: int, user_id: str) -> Optional[Loan]:
     return newly_created_loan
 
 async def generate_schedule(db: Session, loan: Loan, user_id: str) -> None:
-    interest_cycle = getattr(loan, 'interest_cycle', 'yearly')
-    start_date = loan.start_date
-    
-    if loan.term_frequency.lower() == 'daily':
-        next_due_date = start_date + timedelta(days=1)
-    elif loan.term_frequency.lower() == 'weekly':
-        next_due_date = start_date + timedelta(days=7)
-    elif loan.term_frequency.lower() == 'monthly':
-        next_due_date = add_months(start_date, 1)
-    elif loan.term_frequency.lower() == 'quarterly':
-        next_due_date = add_months(start_date, 3)
-    elif loan.term_frequency.lower() == 'yearly':
-        next_due_date = add_months(start_date, 12)
-    else:
-        next_due_date = add_months(start_date, 1)
-    
-    annual_rate = loan.interest_rate_percent
-    if interest_cycle.lower() == 'one-time':
-        annual_rate = loan.interest_rate_percent
-    elif interest_cycle.lower() == 'daily':
-        annual_rate = loan.interest_rate_percent * 365
-    elif interest_cycle.lower() == 'weekly':
-        annual_rate = loan.interest_rate_percent * 52
-    elif interest_cycle.lower() == 'monthly':
-        annual_rate = loan.interest_rate_percent * 12
-    
-    periodic_rate = annual_rate
-    if loan.term_frequency.lower() == 'daily':
-        periodic_rate = annual_rate / 365
-    elif loan.term_frequency.lower() == 'weekly':
-        periodic_rate = annual_rate / 52
-    elif loan.term_frequency.lower() == 'monthly':
-        periodic_rate = annual_rate / 12
-    elif loan.term_frequency.lower() == 'quarterly':
-        periodic_rate = annual_rate / 4
-    
-    if loan.repayment_type.lower() == 'flat':
-        interest_per_period = (loan.principal * periodic_rate) / 100
-        principal_per_period = loan.principal / loan.term_units
-        payment_amount = principal_per_period + interest_per_period
-        
-        for i in range(loan.term_units):
-            if i > 0:
-                if loan.term_frequency.lower() == 'daily':
-                    next_due_date = next_due_date + timedelta(days=1)
-                elif loan.term_frequency.lower() == 'weekly':
-                    next_due_date = next_due_date + timedelta(days=7)
-                elif loan.term_frequency.lower() == 'monthly':
-                    next_due_date = add_months(next_due_date, 1)
-                elif loan.term_frequency.lower() == 'quarterly':
-                    next_due_date = add_months(next_due_date, 3)
-                elif loan.term_frequency.lower() == 'yearly':
-                    next_due_date = add_months(next_due_date, 12)
-            
-            db.add(Payment(
-                loan_id=loan.id, 
-                user_id=user_id,
-                due_date=next_due_date, 
-                amount_due=round(payment_amount, 2)
-            ))
-    else:  # Amortized loans
-        rate = periodic_rate / 100
-        payment_amount = loan.principal * rate / (1 - (1 + rate) ** (-loan.term_units))
-        remaining_principal = loan.principal
-        
-        for i in range(loan.term_units):
-            if i > 0:
-                if loan.term_frequency.lower() == 'daily':
-                    next_due_date = next_due_date + timedelta(days=1)
-                elif loan.term_frequency.lower() == 'weekly':
-                    next_due_date = next_due_date + timedelta(days=7)
-                elif loan.term_frequency.lower() == 'monthly':
-                    next_due_date = add_months(next_due_date, 1)
-                elif loan.term_frequency.lower() == 'quarterly':
-                    next_due_date = add_months(next_due_date, 3)
-                elif loan.term_frequency.lower() == 'yearly':
-                    next_due_date = add_months(next_due_date, 12)
-            
-            interest_payment = remaining_principal * rate
-            principal_payment = payment_amount - interest_payment
-            remaining_principal -= principal_payment
-            
-            db.add(Payment(
-                loan_id=loan.id, 
-                user_id=user_id,
-                due_date=next_due_date, 
-                amount_due=round(payment_amount, 2)
-            ))
-    
-    await db.commit()
+    schedule = compute_schedule(
+        loan.principal,
+        loan.interest_rate_percent,
+        loan.term_units,
+        loan.term_frequency,
+        loan.repayment_type,
+        getattr(loan, 'interest_cycle', 'yearly'),
+        loan.start_date
+    )
+    for installment in schedule.installments:
+        db.add(Payment(
+            loan_id=loan.id, 
+            user_id=user_id,
+            due_date=installment.due_date, 
+            amount_due=installment.amount_due,
+            principal_due=installment.principal,
+            interest_due=installment.interest
+        ))
+    apply_schedule(loan, schedule)
+    # A regenerated schedule of a completed loan has money to collect again
+    reopened = await reopen_unpaid_loans(db, user_id, [loan.id])
 
-def add_months(date_obj, months):
-    """Add a specified number of months to a date object."""
-    month = date_obj.month - 1 + months
-    year = date_obj.year + month // 12
-    month = month % 12 + 1
-    day = min(date_obj.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month-1])
-    return date(year, month, day) 
\ No newline at end of file
+    await db.commit()
+    if reopened:
+        await db.refresh(loan)
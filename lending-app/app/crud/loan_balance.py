@@ -0,0 +1,86 @@
+"""
+Denormalized balance columns on Loan.
+
+`outstanding_amount`, `paid_installments`, `next_due_date` and `last_paid_at`
+let loan lists show balances without touching the payment table. Schedule
+generation and renewal set them directly on the ORM object. Set-based
+collection paths call `refresh_loan_balances` for the loans they touched,
+inside the same transaction. The nightly `repair_loan_balances` job recomputes
+them in id batches from hot and archived installments and rewrites only the
+loans that drifted.
+"""
+from sqlmodel import select, Session, func
+from sqlalchemy import update, case, cast, or_, Float, Numeric
+from app.models.loan import Loan
+from app.crud.archive import payment_history
+from app.crud.sync import next_change_seq
+from app.core.schedule import Schedule
+from typing import Dict, Iterable
+from datetime import datetime
+
+REPAIR_BATCH_SIZE = 1000  # loans per transaction
+BALANCE_COLUMNS = ("outstanding_amount", "paid_installments", "next_due_date", "last_paid_at")
+
+def _round(value):
+    # Postgres only rounds numerics to a given scale
+    return cast(func.round(cast(value, Numeric), 2), Float)
+
+def _computed_balances() -> Dict:
+    """Correlated subqueries giving each column's true value for the outer Loan row."""
+    history = payment_history()
+    unpaid = history.c.amount_paid < history.c.amount_due
+
+    def aggregate(expression, *criteria):
+        return select(expression).where(history.c.loan_id == Loan.id, *criteria).scalar_subquery()
+
+    return {
+        "outstanding_amount": _round(func.coalesce(aggregate(func.sum(history.c.amount_due - history.c.amount_paid), unpaid), 0.0)),
+        "paid_installments": aggregate(func.count(), ~unpaid),
+        "next_due_date": aggregate(func.min(history.c.due_date), unpaid),
+        "last_paid_at": aggregate(func.max(history.c.paid_at)),
+    }
+
+def apply_schedule(loan: Loan, schedule: Schedule) -> None:
+    """Balances of a freshly generated, fully unpaid schedule."""
+    loan.outstanding_amount = schedule.total_payable
+    loan.paid_installments = 0
+    loan.next_due_date = schedule.installments[0].due_date if schedule.installments else None
+    loan.last_paid_at = None
+
+async def _write_balances(db: Session, loans) -> None:
+    seqs = {}
+    for user_id in sorted({user_id for _, user_id in loans}):
+        seqs[user_id] = await next_change_seq(db, user_id, "loan")
+    await db.execute(
+        update(Loan)
+        .where(Loan.id.in_([loan_id for loan_id, _ in loans]))
+        .values(**_computed_balances(), updated_at=datetime.utcnow(), change_seq=case(seqs, value=Loan.user_id))
+        # Derived from the installments, whose changes are audited
+        .execution_options(synchronize_session=False, audit=False)
+    )
+
+async def refresh_loan_balances(db: Session, user_id: str, loan_ids: Iterable[int]) -> None:
+    """Recompute the balance columns of the given loans. The caller commits."""
+    loan_ids = sorted(set(loan_ids))
+    if loan_ids:
+        await db.flush()
+        await _write_balances(db, [(loan_id, user_id) for loan_id in loan_ids])
+
+async def repair_loan_balances(db: Session, batch_size: int = REPAIR_BATCH_SIZE) -> int:
+    """Fix loans whose balance columns drifted from their installments. Returns the number fixed."""
+    computed = _computed_balances()
+    drifted = or_(*[getattr(Loan, column).is_distinct_from(computed[column]) for column in BALANCE_COLUMNS])
+    repaired, last_id = 0, 0
+    while True:
+        result = await db.execute(select(Loan.id).where(Loan.id > last_id).order_by(Loan.id).limit(batch_size))
+        loan_ids = result.scalars().all()
+        if not loan_ids:
+            return repaired
+        last_id = loan_ids[-1]
+
+        result = await db.execute(select(Loan.id, Loan.user_id).where(Loan.id.in_(loan_ids)).where(drifted))
+        loans = result.all()
+        if loans:
+            await _write_balances(db, loans)
+            await db.commit()
+            repaired += len(loans)
@@ -1,12 +1,48 @@
-from sqlmodel import select, Session
+from sqlmodel import select, Session, delete
+from sqlalchemy import update, insert, case
+from sqlalchemy.exc import IntegrityError
 from app.models.payment import Payment
+from app.models.payment_transaction import PaymentTransaction
+from app.models.payment_archive import PaymentArchive
+from app.models.collection_batch import CollectionBatch
+from app.models.penalty import PenaltyCharge
+from app.crud.sync import next_change_seq, record_tombstones
+from app.crud.borrower_stats import record_collections
+from app.crud.lifecycle import complete_paid_loans, reopen_unpaid_loans
+from app.crud.loan_balance import refresh_loan_balances
+from app.crud.filters import payment_conditions
+from app.core import audit
 from app.schemas.payment import PaymentCreate, PaymentUpdate
-from typing import List, Optional
-from datetime import datetime, date, timedelta
+from typing import Any, List, Optional, NamedTuple, Sequence, Tuple, Dict
+from datetime import datetime, date, timedelta, timezone
+import uuid
+
+class Allocation(NamedTuple):
+    payment_id: int
+    loan_id: int
+    due_date: date
+    amount_due: float
+    amount_paid: float  # balance after this allocation
+    applied: float
+
+def new_collection_id() -> str:
+    return uuid.uuid4().hex
+
+def ledger_entry(payment: Payment, amount: float, paid_at: datetime, collection_id: str) -> PaymentTransaction:
+    return PaymentTransaction(
+        user_id=payment.user_id,
+        loan_id=payment.loan_id,
+        payment_id=payment.id,
+        collection_id=collection_id,
+        amount=amount,
+        paid_at=paid_at
+    )
 
 async def create_payment(db: Session, payment_data: PaymentCreate, user_id: str) -> Payment:
     db_payment = Payment(**payment_data.model_dump(), user_id=user_id)
     db.add(db_payment)
+    await refresh_loan_balances(db, user_id, [db_payment.loan_id])
+    await reopen_unpaid_loans(db, user_id, [db_payment.loan_id])
     await db.commit()
     await db.refresh(db_payment)
     return db_payment
@@ -19,22 +55,71 @@ async def get_payment(db: Session, payment_id: int, user_id: str) -> Optional[Pa
     )
     return result.scalars().first()
 
-async def get_payments(db: Session, user_id: str, skip: int = 0, limit: int = 100) -> List[Payment]:
+# Columns of the installment list and detail responses, selectable with ?fields=
+PAYMENT_FIELDS = (
+    "id", "loan_id", "user_id", "due_date", "amount_due", "amount_paid", "paid_at",
+    "penalty_amount", "principal_due", "interest_due",
+)
+
+async def get_payment_row(db: Session, payment_id: int, user_id: str, fields: Sequence[str] = PAYMENT_FIELDS) -> Optional[Dict[str, Any]]:
+    """One installment's `fields` as a dict, selected as bare columns."""
     result = await db.execute(
-        select(Payment)
+        select(*[getattr(Payment, field) for field in fields])
+        .where(Payment.id == payment_id)
         .where(Payment.user_id == user_id)
-        .offset(skip)
-        .limit(limit)
     )
-    return result.scalars().all()
+    row = result.mappings().first()
+    return dict(row) if row is not None else None
+
+# Each ordering has a (user_id, column) index, see the add_listing_indexes revision
+PAYMENT_SORT_COLUMNS = {
+    "due_date": Payment.due_date,
+    "paid_at": Payment.paid_at,
+}
 
-async def get_payments_by_loan(db: Session, loan_id: int, user_id: str) -> List[Payment]:
+async def get_payments(
+    db: Session,
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: str = "due_date",
+    descending: bool = False,
+    fields: Sequence[str] = PAYMENT_FIELDS,
+    **filters
+) -> List[Dict[str, Any]]:
+    """
+    `fields` of the payments matching `filters` (see
+    `app.crud.filters.payment_conditions`), as dicts rather than entities.
+    """
+    order_column = PAYMENT_SORT_COLUMNS[sort_by]
     result = await db.execute(
-        select(Payment)
-        .where(Payment.loan_id == loan_id)
-        .where(Payment.user_id == user_id)
+        select(*[getattr(Payment, field) for field in fields])
+        .where(*payment_conditions(user_id, **filters))
+        .order_by(order_column.desc() if descending else order_column, Payment.id)
+        .offset(skip)
+        .limit(limit)
     )
-    return result.scalars().all()
+    return [dict(row) for row in result.mappings()]
+
+async def get_payments_by_loan(
+    db: Session,
+    loan_id: int,
+    user_id: str,
+    fields: Sequence[str] = PAYMENT_FIELDS
+) -> List[Dict[str, Any]]:
+    """A loan's installments in due date order, as dicts of `fields`."""
+    for model in (Payment, PaymentArchive):
+        # Closed loans may have been moved to the archive, see app/crud/archive.py
+        result = await db.execute(
+            select(*[getattr(model, field) for field in fields])
+            .where(model.loan_id == loan_id)
+            .where(model.user_id == user_id)
+            .order_by(model.due_date, model.id)
+        )
+        payments = [dict(row) for row in result.mappings()]
+        if payments:
+            return payments
+    return []
 
 async def update_payment(
     db: Session, 
@@ -47,6 +132,7 @@ async def update_payment(
     if not db_payment:
         return None
     
+    previous_paid = db_payment.amount_paid
     update_data_dict = payment_data.model_dump(exclude_unset=True)
     if 'user_id' in update_data_dict:
         del update_data_dict['user_id']
@@ -57,15 +143,35 @@ async def update_payment(
     if mark_as_paid:
         if payment_data.amount_paid is None:
              db_payment.amount_paid = db_payment.amount_due
-        if payment_data.paid_at is None:
-             db_payment.paid_at = datetime.utcnow()
+        if db_payment.paid_at is None:
+             db_payment.paid_at = payment_data.paid_at or datetime.utcnow()
     elif payment_data.paid_at and not db_payment.paid_at:
         db_payment.paid_at = payment_data.paid_at
+
+    delta = round(db_payment.amount_paid - previous_paid, 2)
+    if delta:
+        paid_at = db_payment.paid_at or datetime.utcnow()
+        db.add(ledger_entry(db_payment, delta, paid_at, new_collection_id()))
+        await record_collections(db, user_id, [
+            (db_payment.loan_id, db_payment.due_date, db_payment.amount_due, db_payment.amount_paid, delta, paid_at)
+        ])
+        await refresh_loan_balances(db, user_id, [db_payment.loan_id])
+        if delta > 0:
+            await complete_paid_loans(db, user_id, [db_payment.loan_id])
+        else:
+            await reopen_unpaid_loans(db, user_id, [db_payment.loan_id])
     
     await db.commit()
     await db.refresh(db_payment)
     return db_payment
 
+async def delete_payments_by_loan(db: Session, loan_id: int, user_id: str) -> None:
+    """Delete a loan's installments, leaving tombstones for delta sync. The caller commits."""
+    await record_tombstones(db, Payment, user_id, Payment.loan_id == loan_id)
+    await db.execute(delete(Payment).where(Payment.loan_id == loan_id).where(Payment.user_id == user_id))
+    await db.execute(delete(PaymentArchive).where(PaymentArchive.loan_id == loan_id).where(PaymentArchive.user_id == user_id))
+    await db.execute(delete(PenaltyCharge).where(PenaltyCharge.loan_id == loan_id).where(PenaltyCharge.user_id == user_id))
+
 async def get_upcoming_payments(db: Session, days: int = 7, user_id: str = None) -> List[Payment]:
     today = date.today()
     end_date = today + timedelta(days=days)
@@ -91,4 +197,244 @@ async def get_overdue_payments(db: Session, user_id: str = None) -> List[Payment
         query = query.where(Payment.user_id == user_id)
 
     result = await db.execute(query)
-    return result.scalars().all() 
\ No newline at end of file
+    return result.scalars().all() 
+
+def allocate_amount(open_installments: List[Payment], amount: float, paid_at: datetime) -> List[Tuple[Payment, float, datetime]]:
+    """Split `amount` across installments in the given order (oldest due first)."""
+    allocations = []
+    remaining = round(amount, 2)
+    for installment in open_installments:
+        if remaining <= 0:
+            break
+        balance = round(installment.amount_due - installment.amount_paid, 2)
+        if balance <= 0:
+            continue
+        applied = min(balance, remaining)
+        allocations.append((installment, applied, paid_at))
+        remaining = round(remaining - applied, 2)
+    return allocations
+
+async def apply_allocations(
+    db: Session,
+    allocations: List[Tuple[Payment, float, datetime]],
+    collection_id: str,
+    user_id: str
+) -> List[Allocation]:
+    """
+    Apply (payment, amount, paid_at) allocations with a single UPDATE on payment
+    and a single multi-row INSERT into the ledger. A payment may appear more
+    than once. The caller owns the transaction and commits.
+    """
+    if not allocations:
+        return []
+
+    increments: Dict[int, float] = {}
+    paid_dates: Dict[int, datetime] = {}
+    for payment, applied, paid_at in allocations:
+        increments[payment.id] = round(increments.get(payment.id, 0.0) + applied, 2)
+        paid_dates[payment.id] = max(paid_at, paid_dates.get(payment.id, paid_at))
+
+    now = datetime.utcnow()
+    await db.execute(
+        update(Payment)
+        .where(Payment.id.in_(list(increments)))
+        .where(Payment.user_id == user_id)
+        .values(
+            amount_paid=Payment.amount_paid + case(increments, value=Payment.id),
+            paid_at=case(paid_dates, value=Payment.id),
+            updated_at=now,
+            change_seq=await next_change_seq(db, user_id, "payment")
+        )
+        # Audited per installment below instead of as one statement
+        .execution_options(synchronize_session=False, audit=False)
+    )
+    audited = set()
+    for payment, _, _ in allocations:
+        if payment.id not in audited:
+            audited.add(payment.id)
+            audit.record(db, payment, "update", {
+                "amount_paid": [payment.amount_paid, round(payment.amount_paid + increments[payment.id], 2)],
+                "paid_at": [payment.paid_at, paid_dates[payment.id]],
+            })
+    await db.execute(
+        insert(PaymentTransaction),
+        [
+            {
+                "user_id": user_id,
+                "loan_id": payment.loan_id,
+                "payment_id": payment.id,
+                "collection_id": collection_id,
+                "amount": applied,
+                "paid_at": paid_at,
+                "created_at": now,
+            }
+            for payment, applied, paid_at in allocations
+        ]
+    )
+
+    applied_results = []
+    running_paid = {}
+    for payment, applied, paid_at in allocations:
+        running_paid[payment.id] = round(running_paid.get(payment.id, payment.amount_paid) + applied, 2)
+        applied_results.append(Allocation(
+            payment_id=payment.id,
+            loan_id=payment.loan_id,
+            due_date=payment.due_date,
+            amount_due=payment.amount_due,
+            amount_paid=running_paid[payment.id],
+            applied=applied
+        ))
+
+    await record_collections(db, user_id, (
+        (a.loan_id, a.due_date, a.amount_due, a.amount_paid, a.applied, paid_at)
+        for a, (_, _, paid_at) in zip(applied_results, allocations)
+    ))
+    await refresh_loan_balances(db, user_id, (a.loan_id for a in applied_results))
+    await complete_paid_loans(db, user_id, (a.loan_id for a in applied_results))
+    return applied_results
+
+async def collect_lump_sum(
+    db: Session,
+    loan_id: int,
+    amount: float,
+    user_id: str,
+    paid_at: Optional[datetime] = None
+) -> Tuple[str, List[Allocation]]:
+    """
+    Apply one cash amount across the loan's open installments, oldest first,
+    in one transaction. Raises ValueError if the amount is not positive or
+    exceeds the outstanding balance.
+    """
+    if amount <= 0:
+        raise ValueError("Amount must be greater than zero")
+
+    result = await db.execute(
+        select(Payment)
+        .where(Payment.loan_id == loan_id)
+        .where(Payment.user_id == user_id)
+        .where(Payment.amount_paid < Payment.amount_due)
+        .order_by(Payment.due_date, Payment.id)
+        .with_for_update()
+    )
+    open_installments = result.scalars().all()
+
+    outstanding = round(sum(p.amount_due - p.amount_paid for p in open_installments), 2)
+    if round(amount, 2) > outstanding:
+        await db.rollback()
+        raise ValueError(f"Amount {amount:.2f} exceeds the outstanding balance of {outstanding:.2f}")
+
+    collection_id = new_collection_id()
+    applied = await apply_allocations(
+        db,
+        allocate_amount(open_installments, amount, paid_at or datetime.utcnow()),
+        collection_id,
+        user_id
+    )
+    await db.commit()
+    return collection_id, applied
+
+async def get_transactions_by_loan(db: Session, loan_id: int, user_id: str) -> List[PaymentTransaction]:
+    result = await db.execute(
+        select(PaymentTransaction)
+        .where(PaymentTransaction.loan_id == loan_id)
+        .where(PaymentTransaction.user_id == user_id)
+        .order_by(PaymentTransaction.paid_at, PaymentTransaction.id)
+    )
+    return result.scalars().all()
+
+class BatchItemResult(NamedTuple):
+    index: int
+    payment_id: int
+    status: str  # applied | not_found | rejected
+    allocation: Optional[Allocation] = None
+    detail: Optional[str] = None
+
+def _dump_results(results: List[BatchItemResult]) -> List[Dict[str, Any]]:
+    return [
+        {**r._asdict(), "allocation": {**r.allocation._asdict(), "due_date": r.allocation.due_date.isoformat()} if r.allocation else None}
+        for r in results
+    ]
+
+def _load_results(rows: List[Dict[str, Any]]) -> List[BatchItemResult]:
+    return [
+        BatchItemResult(**{**row, "allocation": Allocation(**{**row["allocation"], "due_date": date.fromisoformat(row["allocation"]["due_date"])}) if row["allocation"] else None})
+        for row in rows
+    ]
+
+async def _stored_batch(db: Session, user_id: str, collection_id: str) -> Optional[List[BatchItemResult]]:
+    result = await db.execute(
+        select(CollectionBatch.results)
+        .where(CollectionBatch.user_id == user_id)
+        .where(CollectionBatch.collection_id == collection_id)
+    )
+    rows = result.scalars().first()
+    return None if rows is None else _load_results(rows)
+
+async def collect_batch(
+    db: Session,
+    items: List[Tuple[int, Optional[float], Optional[datetime]]],
+    user_id: str,
+    collection_id: Optional[str] = None
+) -> Tuple[str, List[BatchItemResult]]:
+    """
+    Apply many (payment_id, amount, paid_at) collections in one transaction.
+
+    Ownership is checked with one SELECT and every accepted item is applied by
+    `apply_allocations`, so the statement count does not grow with the batch.
+    An amount of None settles the remaining balance. Re-sending a batch with
+    the same `collection_id` applies nothing and returns the first results.
+    """
+    if collection_id:
+        stored = await _stored_batch(db, user_id, collection_id)
+        if stored is not None:
+            return collection_id, stored
+    collection_id = collection_id or new_collection_id()
+
+    # Claim the key before touching any installment: a concurrent request with
+    # the same key waits on this insert and then fails the unique constraint
+    batch = CollectionBatch(user_id=user_id, collection_id=collection_id)
+    db.add(batch)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        return collection_id, await _stored_batch(db, user_id, collection_id)
+
+    result = await db.execute(
+        select(Payment)
+        .where(Payment.id.in_(list({payment_id for payment_id, _, _ in items})))
+        .where(Payment.user_id == user_id)
+        .with_for_update()
+    )
+    owned = {payment.id: payment for payment in result.scalars().all()}
+
+    now = datetime.utcnow()
+    balances = {payment_id: round(p.amount_due - p.amount_paid, 2) for payment_id, p in owned.items()}
+    accepted = []
+    results: List[Optional[BatchItemResult]] = []
+    for i, (payment_id, amount, paid_at) in enumerate(items):
+        payment = owned.get(payment_id)
+        if payment is None:
+            results.append(BatchItemResult(index=i, payment_id=payment_id, status="not_found", detail="Payment not found or not owned by user"))
+            continue
+        balance = balances[payment_id]
+        applied = balance if amount is None else round(amount, 2)
+        if applied <= 0:
+            detail = "Payment is already fully paid" if balance <= 0 else "Amount must be greater than zero"
+            results.append(BatchItemResult(index=i, payment_id=payment_id, status="rejected", detail=detail))
+            continue
+        if applied > balance:
+            results.append(BatchItemResult(index=i, payment_id=payment_id, status="rejected", detail=f"Amount {applied:.2f} exceeds the remaining balance of {balance:.2f}"))
+            continue
+        if paid_at is not None and paid_at.tzinfo is not None:
+            paid_at = paid_at.astimezone(timezone.utc).replace(tzinfo=None)  # stored naive UTC, like utcnow()
+        balances[payment_id] = round(balance - applied, 2)
+        accepted.append((i, (payment, applied, paid_at or now)))
+        results.append(None)
+
+    allocations = await apply_allocations(db, [allocation for _, allocation in accepted], collection_id, user_id)
+    for (i, (payment, _, _)), allocation in zip(accepted, allocations):
+        results[i] = BatchItemResult(index=i, payment_id=payment.id, status="applied", allocation=allocation)
+    batch.results = _dump_results(results)
+    await db.commit()
+    return collection_id, results
@@ -0,0 +1,228 @@
+"""
+Late penalties on overdue installments.
+
+Each user can set a default `PenaltyRule` and override it per loan. The nightly
+`accrue_penalties` job charges one day at a time: for every user with
+overdue installments it walks the eligible installments in id batches,
+inserts that day's `PenaltyCharge` rows with one INSERT ... SELECT and then
+refreshes `Payment.penalty_amount` from the charges with one UPDATE. The
+unique (payment_id, charge_date) key makes reruns no-ops. `PenaltyAccrual`
+records the last finished day, so after downtime the job catches up on the
+days it missed and otherwise only charges today.
+
+Charges use the installment's balance at the time the job runs, so catch-up
+days only charge installments that are still open. A rule never charges days
+before it was last set.
+"""
+from sqlmodel import select, Session, func
+from sqlalchemy import update, case, cast, exists, and_, or_, literal, Float, Numeric
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.models.penalty import PenaltyRule, PenaltyCharge, PenaltyAccrual
+from app.crud.sync import next_change_seq
+from app.core import audit
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime, time, timedelta
+
+ACCRUAL_BATCH_SIZE = 1000  # installments per statement
+CATCH_UP_DAYS = 31  # oldest missed day the job will still charge
+RULE_DEFAULTS = {"grace_days": 0, "flat_fee": 0.0, "daily_rate_percent": 0.0, "max_penalty": None, "max_penalty_percent": None}
+
+async def get_penalty_rules(db: Session, user_id: str) -> List[PenaltyRule]:
+    result = await db.execute(
+        select(PenaltyRule)
+        .where(PenaltyRule.user_id == user_id)
+        .where(PenaltyRule.is_active == True)
+        .order_by(PenaltyRule.loan_id.is_not(None), PenaltyRule.loan_id)
+    )
+    return result.scalars().all()
+
+async def get_penalty_rule(db: Session, user_id: str, loan_id: Optional[int] = None) -> Optional[PenaltyRule]:
+    """The rule set for exactly this scope: the loan's own, or the default when loan_id is None."""
+    query = select(PenaltyRule).where(PenaltyRule.user_id == user_id).where(PenaltyRule.is_active == True)
+    query = query.where(PenaltyRule.loan_id.is_(None) if loan_id is None else PenaltyRule.loan_id == loan_id)
+    result = await db.execute(query)
+    return result.scalars().first()
+
+async def set_penalty_rule(db: Session, user_id: str, values: Dict[str, Any], loan_id: Optional[int] = None) -> PenaltyRule:
+    """Create or replace the rule for a scope; a scope has at most one active rule."""
+    rule = await get_penalty_rule(db, user_id, loan_id)
+    if rule is None:
+        rule = PenaltyRule(user_id=user_id, loan_id=loan_id)
+        db.add(rule)
+    for field, default in RULE_DEFAULTS.items():
+        setattr(rule, field, values.get(field, default))
+    rule.updated_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(rule)
+    return rule
+
+async def delete_penalty_rule(db: Session, user_id: str, loan_id: Optional[int] = None) -> bool:
+    rule = await get_penalty_rule(db, user_id, loan_id)
+    if rule is None:
+        return False
+    await db.delete(rule)
+    await db.commit()
+    return True
+
+async def get_charges_by_loan(db: Session, loan_id: int, user_id: str) -> List[PenaltyCharge]:
+    result = await db.execute(
+        select(PenaltyCharge)
+        .where(PenaltyCharge.loan_id == loan_id)
+        .where(PenaltyCharge.user_id == user_id)
+        .order_by(PenaltyCharge.charge_date, PenaltyCharge.payment_id)
+    )
+    return result.scalars().all()
+
+def _round(value):
+    # Postgres only rounds numerics to a given scale
+    return cast(func.round(cast(value, Numeric), 2), Float)
+
+def _days_overdue(day: date, due_date, dialect_name: str):
+    if dialect_name == "postgresql":
+        return literal(day) - due_date
+    return func.julianday(literal(day.isoformat())) - func.julianday(due_date)
+
+def _applicable_rule():
+    """Join condition picking the loan's own rule, else the user's default."""
+    loan_rule = aliased(PenaltyRule)
+    return and_(
+        PenaltyRule.user_id == Payment.user_id,
+        PenaltyRule.is_active == True,
+        or_(
+            PenaltyRule.loan_id == Payment.loan_id,
+            and_(
+                PenaltyRule.loan_id.is_(None),
+                ~exists().where(loan_rule.loan_id == Payment.loan_id).where(loan_rule.is_active == True)
+            )
+        )
+    )
+
+def _eligible(query, user_id: str, day: date, dialect_name: str):
+    return (
+        query
+        .join(Loan, Loan.id == Payment.loan_id)
+        .join(PenaltyRule, _applicable_rule())
+        .where(Payment.user_id == user_id)
+        .where(Payment.amount_paid < Payment.amount_due)
+        .where(Payment.due_date < day)
+        .where(Loan.status == "active")
+        .where(_days_overdue(day, Payment.due_date, dialect_name) > PenaltyRule.grace_days)
+        # set_penalty_rule bumps updated_at, so catch-up days before the rule
+        # existed, or had its current terms, are not charged under it
+        .where(PenaltyRule.updated_at < datetime.combine(day + timedelta(days=1), time.min))
+    )
+
+def _charge_amount():
+    balance = Payment.amount_due - Payment.amount_paid
+    raw = case((Payment.penalty_amount == 0, PenaltyRule.flat_fee), else_=0.0) + balance * PenaltyRule.daily_rate_percent / 100
+    percent_cap = PenaltyRule.max_penalty_percent * Payment.amount_due / 100
+    cap = case(
+        (PenaltyRule.max_penalty.is_(None), percent_cap),
+        (percent_cap.is_(None), PenaltyRule.max_penalty),
+        (PenaltyRule.max_penalty < percent_cap, PenaltyRule.max_penalty),
+        else_=percent_cap
+    )
+    remaining = cap - Payment.penalty_amount
+    return _round(case((cap.is_(None), raw), (raw < remaining, raw), else_=remaining))
+
+async def _accrue_user_day(db: Session, user_id: str, day: date, batch_size: int) -> int:
+    dialect_name = db.bind.dialect.name
+    upsert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    amount = _charge_amount()
+    charged, last_id = 0, 0
+    while True:
+        result = await db.execute(
+            _eligible(select(Payment.id), user_id, day, dialect_name)
+            .where(Payment.id > last_id)
+            .order_by(Payment.id)
+            .limit(batch_size)
+        )
+        payment_ids = result.scalars().all()
+        if not payment_ids:
+            return charged
+        last_id = payment_ids[-1]
+
+        inserted = await db.execute(
+            upsert(PenaltyCharge)
+            .from_select(
+                ["user_id", "loan_id", "payment_id", "rule_id", "charge_date", "amount", "created_at"],
+                _eligible(
+                    select(Payment.user_id, Payment.loan_id, Payment.id, PenaltyRule.id, literal(day), amount, literal(datetime.utcnow())),
+                    user_id, day, dialect_name
+                )
+                .where(Payment.id.in_(payment_ids))
+                .where(amount > 0)
+            )
+            .on_conflict_do_nothing(index_elements=["payment_id", "charge_date"])
+        )
+        charged += max(inserted.rowcount or 0, 0)
+
+        # Recomputed from the charges, so a rerun leaves the rows untouched
+        total = _round(
+            select(func.coalesce(func.sum(PenaltyCharge.amount), 0.0))
+            .where(PenaltyCharge.payment_id == Payment.id)
+            .scalar_subquery()
+        )
+        changed = (await db.execute(
+            select(Payment.id, Payment.penalty_amount, total)
+            .where(Payment.id.in_(payment_ids))
+            .where(Payment.penalty_amount != total)
+        )).all()
+        if changed:
+            await db.execute(
+                update(Payment)
+                .where(Payment.id.in_([payment_id for payment_id, _, _ in changed]))
+                .values(
+                    penalty_amount=total,
+                    updated_at=datetime.utcnow(),
+                    change_seq=await next_change_seq(db, user_id, "payment")
+                )
+                # Audited per installment below instead of as one statement
+                .execution_options(synchronize_session=False, audit=False)
+            )
+            for payment_id, old, new in changed:
+                audit.record_row(db, Payment, payment_id, user_id, "update", {"penalty_amount": [old, new]})
+        await db.commit()
+
+async def accrue_penalties(db: Session, day: Optional[date] = None, batch_size: int = ACCRUAL_BATCH_SIZE) -> int:
+    """
+    Charge penalties for `day` (default today) and any missed days before it
+    since the last finished run, up to CATCH_UP_DAYS back. Returns the number
+    of charges created.
+    """
+    day = day or date.today()
+    watermark = await db.get(PenaltyAccrual, 1)
+    first = day if watermark is None else watermark.accrued_through + timedelta(days=1)
+    first = max(first, day - timedelta(days=CATCH_UP_DAYS))
+    if first > day:
+        return 0
+
+    result = await db.execute(
+        select(Payment.user_id)
+        .join(PenaltyRule, PenaltyRule.user_id == Payment.user_id)
+        .where(PenaltyRule.is_active == True)
+        .where(Payment.amount_paid < Payment.amount_due)
+        .where(Payment.due_date < day)
+        .distinct()
+    )
+    user_ids = result.scalars().all()
+
+    charged = 0
+    current = first
+    while current <= day:
+        for user_id in user_ids:
+            charged += await _accrue_user_day(db, user_id, current, batch_size)
+        current += timedelta(days=1)
+
+    # Only once every user is done, so a failed run is retried in full
+    if watermark is None:
+        watermark = PenaltyAccrual(accrued_through=day)
+        db.add(watermark)
+    watermark.accrued_through = day
+    watermark.updated_at = datetime.utcnow()
+    await db.commit()
+    return charged
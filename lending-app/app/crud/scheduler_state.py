@@ -0,0 +1,113 @@
+"""
+Scheduler lease and per-job run state. The leader loop lives in app/core/scheduler.py.
+
+Both the lease and a job run are taken with a conditional UPDATE, so two
+processes can never both hold the lease, or both run the same fire time of
+a job, even while one of them still believes it leads.
+"""
+from sqlmodel import select, Session
+from sqlalchemy import update, case, or_
+from sqlalchemy.exc import IntegrityError
+from app.models.scheduler_state import SchedulerLease, ScheduledJobState
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+
+async def acquire_lease(db: Session, name: str, holder: str, lease_seconds: float) -> bool:
+    """Take or renew the lease. Returns False while another holder's lease is live."""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    result = await db.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name)
+        .where(or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now))
+        .values(
+            holder=holder,
+            expires_at=expires_at,
+            acquired_at=case((SchedulerLease.holder == holder, SchedulerLease.acquired_at), else_=now)
+        )
+    )
+    await db.commit()
+    if result.rowcount == 1:
+        return True
+    if await db.get(SchedulerLease, name) is not None:
+        return False
+    db.add(SchedulerLease(name=name, holder=holder, acquired_at=now, expires_at=expires_at))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another process created the lease first
+        await db.rollback()
+        return False
+    return True
+
+async def release_lease(db: Session, name: str, holder: str) -> None:
+    """Expire our lease so another process can take over without waiting it out."""
+    await db.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name)
+        .where(SchedulerLease.holder == holder)
+        .values(expires_at=datetime.utcnow())
+    )
+    await db.commit()
+
+async def get_lease(db: Session, name: str) -> Optional[SchedulerLease]:
+    return await db.get(SchedulerLease, name, populate_existing=True)
+
+async def ensure_job_states(db: Session, baselines: Dict[str, Optional[datetime]]) -> Dict[str, ScheduledJobState]:
+    """
+    State rows by job name. Jobs seen for the first time start from
+    `baselines[name]`, their latest fire time, so a new job is not treated
+    as having missed it.
+    """
+    result = await db.execute(select(ScheduledJobState).where(ScheduledJobState.name.in_(list(baselines))))
+    states = {state.name: state for state in result.scalars().all()}
+    missing = [name for name in baselines if name not in states]
+    if missing:
+        for name in missing:
+            db.add(ScheduledJobState(name=name, last_scheduled_for=baselines[name]))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+        result = await db.execute(select(ScheduledJobState).where(ScheduledJobState.name.in_(list(baselines))))
+        states = {state.name: state for state in result.scalars().all()}
+    return states
+
+async def claim_run(db: Session, name: str, scheduled_for: datetime, holder: str) -> bool:
+    """Record the start of a job's run for `scheduled_for`. Returns False if that run was already claimed."""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(ScheduledJobState)
+        .where(ScheduledJobState.name == name)
+        .where(or_(ScheduledJobState.last_scheduled_for.is_(None), ScheduledJobState.last_scheduled_for < scheduled_for))
+        .values(
+            last_scheduled_for=scheduled_for,
+            last_started_at=now,
+            last_finished_at=None,
+            last_lag_seconds=max(0.0, (now - scheduled_for).total_seconds()),
+            last_status="running",
+            last_error=None,
+            last_holder=holder
+        )
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+async def finish_run(db: Session, name: str, status: str, duration_seconds: float, error: Optional[str] = None) -> None:
+    await db.execute(
+        update(ScheduledJobState)
+        .where(ScheduledJobState.name == name)
+        .values(
+            last_finished_at=datetime.utcnow(),
+            last_duration_seconds=duration_seconds,
+            last_status=status,
+            last_error=error,
+            run_count=ScheduledJobState.run_count + 1,
+            failure_count=ScheduledJobState.failure_count + (1 if status == "failed" else 0)
+        )
+    )
+    await db.commit()
+
+async def get_job_states(db: Session) -> List[ScheduledJobState]:
+    result = await db.execute(select(ScheduledJobState).order_by(ScheduledJobState.name))
+    return result.scalars().all()
@@ -0,0 +1,176 @@
+from sqlmodel import select, Session, func, delete
+from sqlalchemy import case, and_, insert
+from app.models.borrower import Borrower
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.models.payment_transaction import PaymentTransaction
+from app.models.snapshot import PortfolioSnapshot
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
+
+# (column, first day past due, last day past due); None means open-ended
+AGING_BUCKETS = [
+    ("overdue_1_7", 1, 7),
+    ("overdue_8_30", 8, 30),
+    ("overdue_31_60", 31, 60),
+    ("overdue_over_60", 61, None),
+]
+
+async def take_snapshots(db: Session, snapshot_date: Optional[date] = None) -> int:
+    """
+    Snapshot every user's portfolio for `snapshot_date` (default today).
+
+    Each source table is scanned once with a GROUP BY user_id, so the cost does
+    not depend on the number of users. Rerunning for the same date replaces
+    that date's rows. Returns the number of users snapshotted.
+    """
+    day = snapshot_date or date.today()
+    remaining = Payment.amount_due - Payment.amount_paid
+
+    def past_due(first_day: int, last_day: Optional[int]):
+        # Compare against precomputed dates so the same SQL works on every dialect
+        condition = Payment.due_date <= day - timedelta(days=first_day)
+        if last_day is not None:
+            condition = and_(condition, Payment.due_date >= day - timedelta(days=last_day))
+        return func.sum(case((condition, remaining), else_=0))
+
+    snapshots: Dict[str, Dict] = {}
+
+    def row_for(user_id: str) -> Dict:
+        return snapshots.setdefault(user_id, {"user_id": user_id, "snapshot_date": day})
+
+    payments = await db.execute(
+        select(
+            Payment.user_id,
+            func.sum(remaining),
+            *[past_due(first, last) for _, first, last in AGING_BUCKETS]
+        )
+        .where(Payment.amount_paid < Payment.amount_due)
+        .group_by(Payment.user_id)
+    )
+    for user_id, outstanding, *buckets in payments.all():
+        row = row_for(user_id)
+        row["outstanding"] = round(outstanding or 0, 2)
+        for (column, _, _), amount in zip(AGING_BUCKETS, buckets):
+            row[column] = round(amount or 0, 2)
+
+    start = datetime.combine(day, datetime.min.time())
+    collected = await db.execute(
+        select(PaymentTransaction.user_id, func.sum(PaymentTransaction.amount))
+        .where(PaymentTransaction.paid_at >= start)
+        .where(PaymentTransaction.paid_at < start + timedelta(days=1))
+        .group_by(PaymentTransaction.user_id)
+    )
+    for user_id, amount in collected.all():
+        row_for(user_id)["collected"] = round(amount or 0, 2)
+
+    borrowers = await db.execute(
+        select(Borrower.user_id, func.count()).group_by(Borrower.user_id)
+    )
+    for user_id, count in borrowers.all():
+        row_for(user_id)["borrowers"] = count
+
+    loans = await db.execute(
+        select(Loan.user_id, func.count()).where(Loan.status == "active").group_by(Loan.user_id)
+    )
+    for user_id, count in loans.all():
+        row_for(user_id)["active_loans"] = count
+
+    await db.execute(delete(PortfolioSnapshot).where(PortfolioSnapshot.snapshot_date == day))
+    if snapshots:
+        now = datetime.utcnow()
+        defaults = {
+            "borrowers": 0, "active_loans": 0, "outstanding": 0.0, "collected": 0.0,
+            **{column: 0.0 for column, _, _ in AGING_BUCKETS},
+        }
+        await db.execute(
+            insert(PortfolioSnapshot),
+            [{**defaults, **row, "created_at": now} for row in snapshots.values()]
+        )
+    await db.commit()
+    return len(snapshots)
+
+async def get_snapshots(db: Session, user_id: str, start: date, end: date) -> List[PortfolioSnapshot]:
+    result = await db.execute(
+        select(PortfolioSnapshot)
+        .where(PortfolioSnapshot.user_id == user_id)
+        .where(PortfolioSnapshot.snapshot_date.between(start, end))
+        .order_by(PortfolioSnapshot.snapshot_date)
+    )
+    return result.scalars().all()
+
+async def get_latest_snapshot_on_or_before(db: Session, user_id: str, day: date) -> Optional[PortfolioSnapshot]:
+    result = await db.execute(
+        select(PortfolioSnapshot)
+        .where(PortfolioSnapshot.user_id == user_id)
+        .where(PortfolioSnapshot.snapshot_date <= day)
+        .order_by(PortfolioSnapshot.snapshot_date.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+def _percent_change(current: float, previous: float) -> Optional[float]:
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 2)
+
+STOCK_METRICS = ["outstanding", "borrowers", "active_loans", "overdue"]
+
+def _stock_values(snapshot: PortfolioSnapshot) -> Dict[str, float]:
+    return {
+        "outstanding": snapshot.outstanding,
+        "borrowers": snapshot.borrowers,
+        "active_loans": snapshot.active_loans,
+        "overdue": round(sum(getattr(snapshot, column) for column, _, _ in AGING_BUCKETS), 2),
+    }
+
+async def get_trends(db: Session, user_id: str, today: Optional[date] = None) -> Dict:
+    """
+    Week-over-week and month-over-month changes from one index range read of
+    the last 60 days of snapshots. Balances compare the latest snapshot with
+    the one a period earlier; `collected` compares period totals.
+    """
+    today = today or date.today()
+    snapshots = await get_snapshots(db, user_id, today - timedelta(days=60), today)
+    if not snapshots:
+        return {"as_of": None, "week_over_week": None, "month_over_month": None}
+
+    latest = snapshots[-1]
+    by_date = {s.snapshot_date: s for s in snapshots}
+
+    def period(days: int) -> Dict:
+        previous = next(
+            (s for s in reversed(snapshots) if s.snapshot_date <= latest.snapshot_date - timedelta(days=days)),
+            None
+        )
+        current_values = _stock_values(latest)
+        previous_values = _stock_values(previous) if previous else {}
+        metrics = {
+            name: {
+                "current": current_values[name],
+                "previous": previous_values.get(name),
+                "change_percent": _percent_change(current_values[name], previous_values.get(name)),
+            }
+            for name in STOCK_METRICS
+        }
+
+        def collected_between(first: date, last: date) -> float:
+            return round(sum(s.collected for d, s in by_date.items() if first <= d <= last), 2)
+
+        current_collected = collected_between(latest.snapshot_date - timedelta(days=days - 1), latest.snapshot_date)
+        previous_collected = collected_between(
+            latest.snapshot_date - timedelta(days=2 * days - 1),
+            latest.snapshot_date - timedelta(days=days)
+        )
+        metrics["collected"] = {
+            "current": current_collected,
+            "previous": previous_collected,
+            "change_percent": _percent_change(current_collected, previous_collected),
+        }
+        return {"compared_to": previous.snapshot_date if previous else None, "metrics": metrics}
+
+    return {
+        "as_of": latest.snapshot_date,
+        "week_over_week": period(7),
+        "month_over_month": period(30),
+    }
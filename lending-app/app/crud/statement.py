@@ -0,0 +1,119 @@
+"""
+Rows for monthly borrower statements, rendered by app/core/statements.py.
+
+One streamed query per run: installment rows joined to their loan and
+borrower, ordered by borrower, with the ledger amounts paid during the period
+joined per installment. Rows are grouped into borrowers as they arrive and
+handed out in chunks, so memory holds one chunk, never the tenant.
+
+Only installments that can appear on a statement are read: those due in the
+period or the upcoming window, older ones still unpaid, and older ones paid
+during the period. Loans closed before the period are skipped. Loans closed
+during it may already be archived when the period is older than
+ARCHIVE_AFTER_DAYS, so such runs read `payment_history()` instead of the hot
+table.
+
+A loan's `outstanding` is its balance at the end of the period: today's
+balance plus whatever the ledger collected for it since.
+"""
+from sqlmodel import select, Session, func
+from sqlalchemy import or_
+from app.models.borrower import Borrower
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.models.payment_transaction import PaymentTransaction
+from app.crud.archive import payment_history
+from app.crud.lifecycle import OPEN_STATUSES
+from app.core.config import settings
+from typing import Any, AsyncIterator, Dict, List
+from datetime import date, datetime, time, timedelta
+
+STREAM_BATCH_SIZE = 2000  # rows fetched per round trip
+
+def _statement_rows(user_id: str, period_start: date, period_end: date, upcoming_end: date):
+    period_from = datetime.combine(period_start, time.min)
+    period_to = datetime.combine(period_end + timedelta(days=1), time.min)
+    paid = (
+        select(PaymentTransaction.payment_id, func.sum(PaymentTransaction.amount).label("amount"))
+        .where(PaymentTransaction.user_id == user_id)
+        .where(PaymentTransaction.paid_at >= period_from)
+        .where(PaymentTransaction.paid_at < period_to)
+        .group_by(PaymentTransaction.payment_id)
+        .subquery()
+    )
+    paid_since = (
+        select(PaymentTransaction.loan_id, func.sum(PaymentTransaction.amount).label("amount"))
+        .where(PaymentTransaction.user_id == user_id)
+        .where(PaymentTransaction.paid_at >= period_to)
+        .group_by(PaymentTransaction.loan_id)
+        .subquery()
+    )
+    archive_cutoff = datetime.utcnow() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    payments = payment_history() if period_from < archive_cutoff else Payment.__table__
+    return (
+        select(
+            Borrower.id, Borrower.name, Borrower.mobile,
+            Loan.id, Loan.principal, Loan.status, Loan.start_date,
+            Loan.outstanding_amount + func.coalesce(paid_since.c.amount, 0.0),
+            payments.c.due_date, payments.c.amount_due, payments.c.amount_paid, payments.c.penalty_amount,
+            func.coalesce(paid.c.amount, 0.0),
+        )
+        .join(Loan, Loan.borrower_id == Borrower.id)
+        .join(payments, payments.c.loan_id == Loan.id)
+        .outerjoin(paid, paid.c.payment_id == payments.c.id)
+        .outerjoin(paid_since, paid_since.c.loan_id == Loan.id)
+        .where(Borrower.user_id == user_id)
+        .where(Loan.user_id == user_id)
+        .where(payments.c.user_id == user_id)
+        .where(Loan.start_date <= period_end)
+        .where(or_(Loan.status.in_(OPEN_STATUSES), Loan.closed_at >= period_from))
+        .where(payments.c.due_date <= upcoming_end)
+        .where(or_(
+            payments.c.due_date >= period_start,
+            payments.c.amount_paid < payments.c.amount_due,
+            paid.c.amount.is_not(None),
+        ))
+        .order_by(Borrower.id, Loan.id, payments.c.due_date)
+    )
+
+async def count_statement_borrowers(db: Session, user_id: str, period_start: date, period_end: date) -> int:
+    """Upper bound on the borrowers a run will produce, for progress reporting."""
+    result = await db.execute(
+        select(func.count(func.distinct(Loan.borrower_id)))
+        .where(Loan.user_id == user_id)
+        .where(Loan.start_date <= period_end)
+        .where(or_(Loan.status.in_(OPEN_STATUSES), Loan.closed_at >= datetime.combine(period_start, time.min)))
+    )
+    return result.scalar_one()
+
+async def stream_statement_borrowers(
+    db: Session,
+    user_id: str,
+    period_start: date,
+    period_end: date,
+    upcoming_end: date,
+    chunk_size: int
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield chunks of borrowers in the shape app/core/statements.py renders."""
+    result = await db.stream(
+        _statement_rows(user_id, period_start, period_end, upcoming_end)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    chunk: List[Dict[str, Any]] = []
+    borrower = loan = None
+    async for (borrower_id, name, mobile, loan_id, principal, status, start_date, outstanding,
+               due_date, amount_due, amount_paid, penalty, paid_in_period) in result:
+        if borrower is None or borrower["id"] != borrower_id:
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+            borrower = {"id": borrower_id, "name": name, "mobile": mobile, "loans": []}
+            chunk.append(borrower)
+            loan = None
+        if loan is None or loan["id"] != loan_id:
+            loan = {"id": loan_id, "principal": principal, "status": status, "start_date": start_date,
+                    "outstanding": round(outstanding, 2), "installments": []}
+            borrower["loans"].append(loan)
+        loan["installments"].append((due_date, amount_due, amount_paid, penalty or 0.0, round(paid_in_period, 2)))
+    if chunk:
+        yield chunk
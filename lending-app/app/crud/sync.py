@@ -0,0 +1,156 @@
+"""
+Per-user change feed for delta sync.
+
+Every flush that touches a Borrower, Loan or Payment bumps the user's counter
+in `sync_state` once and stamps the changed rows with the new value, so
+`change_seq > :since` on the (user_id, change_seq) indexes returns exactly the
+rows a client has not seen. The counter row is locked until commit, which keeps
+commit order and sequence order the same for a given user.
+
+Set-based statements bypass the ORM flush, so they must stamp rows themselves
+with `next_change_seq` and record deletes with `record_tombstones`.
+
+After commit, the touched entity types are published per user through
+`app.core.pubsub` so push subscribers can refresh.
+"""
+from sqlmodel import select, Session
+from sqlalchemy import event, insert, literal
+from sqlalchemy.orm import Session as OrmSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models.borrower import Borrower
+from app.models.loan import Loan
+from app.models.payment import Payment
+from app.models.sync import SyncState, SyncTombstone
+from app.core.pubsub import publish_changes
+from typing import Any, Dict
+from datetime import datetime
+
+SYNCED_MODELS = {Borrower: "borrower", Loan: "loan", Payment: "payment"}
+
+def _mark_changed(session: OrmSession, user_id: str, entity: str) -> None:
+    session.info.setdefault("changed_entities", {}).setdefault(user_id, set()).add(entity)
+
+def _change_seq_statement(dialect_name: str, user_id: str):
+    upsert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    return (
+        upsert(SyncState)
+        .values(user_id=user_id, last_seq=1)
+        .on_conflict_do_update(
+            index_elements=[SyncState.user_id],
+            set_={"last_seq": SyncState.last_seq + 1}
+        )
+        .returning(SyncState.last_seq)
+    )
+
+async def next_change_seq(db: Session, user_id: str, entity: str) -> int:
+    _mark_changed(db.sync_session, user_id, entity)
+    result = await db.execute(_change_seq_statement(db.bind.dialect.name, user_id))
+    return result.scalar_one()
+
+async def record_tombstones(db: Session, model, user_id: str, *criteria) -> int:
+    """
+    Write tombstones for every `model` row matching `criteria` with one
+    INSERT ... SELECT. Call before the matching DELETE. Returns the change seq used.
+    """
+    seq = await next_change_seq(db, user_id, SYNCED_MODELS[model])
+    await db.execute(
+        insert(SyncTombstone).from_select(
+            ["user_id", "entity", "entity_id", "change_seq", "deleted_at"],
+            select(
+                model.user_id,
+                literal(SYNCED_MODELS[model]),
+                model.id,
+                literal(seq),
+                literal(datetime.utcnow())
+            ).where(model.user_id == user_id, *criteria)
+        )
+    )
+    return seq
+
+@event.listens_for(OrmSession, "before_flush")
+def _stamp_changes(session, flush_context, instances):
+    changed = [obj for obj in session.new if type(obj) in SYNCED_MODELS]
+    changed += [
+        obj for obj in session.dirty
+        if type(obj) in SYNCED_MODELS and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj for obj in session.deleted if type(obj) in SYNCED_MODELS]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    seqs = {
+        user_id: connection.execute(_change_seq_statement(connection.dialect.name, user_id)).scalar_one()
+        for user_id in sorted({obj.user_id for obj in changed + deleted})
+    }
+
+    for obj in changed + deleted:
+        _mark_changed(session, obj.user_id, SYNCED_MODELS[type(obj)])
+
+    now = datetime.utcnow()
+    for obj in changed:
+        obj.updated_at = now
+        obj.change_seq = seqs[obj.user_id]
+
+    if deleted:
+        connection.execute(
+            insert(SyncTombstone),
+            [
+                {
+                    "user_id": obj.user_id,
+                    "entity": SYNCED_MODELS[type(obj)],
+                    "entity_id": obj.id,
+                    "change_seq": seqs[obj.user_id],
+                    "deleted_at": now,
+                }
+                for obj in deleted
+            ]
+        )
+
+@event.listens_for(OrmSession, "after_commit")
+def _publish_changes(session):
+    for user_id, entities in session.info.pop("changed_entities", {}).items():
+        publish_changes(user_id, entities)
+
+@event.listens_for(OrmSession, "after_soft_rollback")
+def _discard_changes(session, previous_transaction):
+    session.info.pop("changed_entities", None)
+
+async def get_changes(db: Session, user_id: str, since: int, limit: int = 5000) -> Dict[str, Any]:
+    """
+    Rows changed after `since`, up to the user's current sequence. If any
+    entity has more than `limit` changes the feed reports `reset` and the
+    client should refetch the full lists, then continue from `token`.
+    """
+    state = await db.execute(select(SyncState.last_seq).where(SyncState.user_id == user_id))
+    token = state.scalar_one_or_none() or 0
+
+    changes: Dict[str, Any] = {"token": str(token), "reset": False}
+    if token <= since:
+        changes.update(borrowers=[], loans=[], payments=[], deleted=[])
+        return changes
+
+    for model, key in ((Borrower, "borrowers"), (Loan, "loans"), (Payment, "payments")):
+        result = await db.execute(
+            select(model)
+            .where(model.user_id == user_id)
+            .where(model.change_seq > since)
+            .where(model.change_seq <= token)
+            .order_by(model.change_seq)
+            .limit(limit + 1)
+        )
+        rows = result.scalars().all()
+        if len(rows) > limit:
+            return {"token": str(token), "reset": True}
+        changes[key] = [row.model_dump() for row in rows]
+
+    result = await db.execute(
+        select(SyncTombstone.entity, SyncTombstone.entity_id)
+        .where(SyncTombstone.user_id == user_id)
+        .where(SyncTombstone.change_seq > since)
+        .where(SyncTombstone.change_seq <= token)
+        .order_by(SyncTombstone.change_seq)
+    )
+    changes["deleted"] = [{"entity": entity, "id": entity_id} for entity, entity_id in result.all()]
+    return changes
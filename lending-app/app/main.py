@@ -1,12 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import select, delete
+from app.core.config import settings
 from app.core.database import get_session
-from app.routers import loan, borrower, payment, dashboard, reminders
-from app.core.scheduler import build_scheduler
+from app.core.startup import ROUTERS, ServerlessMiddleware, include_router
 
 app = FastAPI(title="Lending‑MVP")
 
+# Added before CORS so 429 responses still get CORS headers
+if settings.ADMISSION_CONTROL and not settings.SERVERLESS:
+    from app.core.admission import AdmissionMiddleware
+    app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -20,25 +25,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(borrower.router, prefix="/borrowers", tags=["Borrowers"])
-app.include_router(loan.router, prefix="/loans", tags=["Loans"])
-app.include_router(payment.router, prefix="/payments", tags=["Payments"])
-app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
-app.include_router(reminders.router, prefix="/reminders", tags=["Reminders"])
+if settings.SERVERLESS:
+    # Routers are imported on first request to their prefix
+    app.add_middleware(ServerlessMiddleware, fastapi_app=app)
+else:
+    for name, prefix, tag in ROUTERS:
+        include_router(app, name, prefix, tag)
 
 # Initialize models
-from app.models import borrower, loan, payment
+from app.models import borrower, loan, payment, payment_transaction, sync, snapshot, borrower_stats, payment_archive, penalty, job, scheduler_state, audit, collection_batch
 from sqlmodel import SQLModel
 from app.core.database import engine
+from app.core import audit as audit_log  # registers the audit session events
 
 @app.on_event("startup")
 async def on_startup():
+    # Serverless deployments are migrated with Alembic and cannot keep a
+    # scheduler alive; the schema revision is checked on first request instead
+    if settings.SERVERLESS:
+        return
+
     # Create tables
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
     
-    # Start scheduler
-    build_scheduler()
+    # Start scheduler; only the process holding the lease runs jobs
+    from app.core.scheduler import leader
+    leader.start()
+
+    # Start background job workers
+    from app.core.jobs import pool
+    pool.start()
+
+    # Without the writer every commit writes its own audit records
+    audit_log.writer.start()
 
 # Add a startup event to recalculate payment schedules if needed
 @app.on_event("startup")
@@ -83,6 +103,16 @@ async def recalculate_payment_schedules():
         
         logging.info("Payment schedule recalculation completed.")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    from app.core.scheduler import leader
+    await leader.stop()
+    from app.core.jobs import pool
+    await pool.stop()
+    await audit_log.writer.stop()
+    from app.core.executor import shutdown_process_pool
+    shutdown_process_pool()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Lending MVP API"}
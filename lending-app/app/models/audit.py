@@ -0,0 +1,24 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Index, JSON
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+class AuditLog(SQLModel, table=True):
+    """
+    One committed change to a borrower, loan or installment, written behind
+    the request by app/core/audit.py.
+    """
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        Index("ix_audit_log_user_id_created_at", "user_id", "created_at"),
+        Index("ix_audit_log_user_id_entity_entity_id", "user_id", "entity", "entity_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: Optional[str] = None               # owner of the changed rows; None for cross-user jobs
+    actor: str                                  # user id, "job:<kind>" or "system"
+    entity: str                                 # borrower, loan, payment
+    entity_id: Optional[int] = None             # None for set-based statements
+    action: str                                 # insert, update, delete, bulk_update, bulk_delete
+    changes: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)  # commit time
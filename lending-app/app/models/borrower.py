@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import datetime
 from typing import List, TYPE_CHECKING, Optional
 
@@ -6,10 +7,15 @@ if TYPE_CHECKING:
     from .loan import Loan
 
 class Borrower(SQLModel, table=True):
+    __table_args__ = (Index("ix_borrower_user_id_change_seq", "user_id", "change_seq"),)
+
     id: int | None = Field(default=None, primary_key=True)
     user_id: str = Field(index=True)
     name: str
     mobile: str | None = None
-    created_at: datetime = Field(default_factory=datetime.utcnow) 
+    mobile_digits: str | None = None  # normalized mobile for search, see app/core/search.py
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    change_seq: int = Field(default=0)  # per-user change feed position, see app/crud/sync.py
     
     loans: List["Loan"] = Relationship(back_populates="borrower") 
\ No newline at end of file
@@ -0,0 +1,24 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from datetime import datetime
+
+class BorrowerStats(SQLModel, table=True):
+    """
+    Repayment statistics per borrower, maintained incrementally by the
+    collection paths and the daily missed-due job, and recomputed exactly by
+    `recompute_borrower_stats`. See app/crud/borrower_stats.py.
+    """
+    __tablename__ = "borrower_stats"
+    __table_args__ = (Index("ix_borrower_stats_user_id_risk_score", "user_id", "risk_score"),)
+
+    borrower_id: int = Field(sa_column=Column(Integer, ForeignKey("borrower.id", ondelete="CASCADE"), primary_key=True))
+    user_id: str = Field(index=True)
+    installments_due: int = 0       # installments whose due date has passed
+    missed_installments: int = 0    # of those, not fully paid by the end of the due date
+    late_settlements: int = 0       # installments fully paid after their due date
+    total_days_late: int = 0        # summed over late_settlements
+    arrears: float = 0.0            # unpaid amount on installments past due
+    on_time_ratio: float = 1.0
+    avg_days_late: float = 0.0
+    risk_score: float = 0.0         # 0 (safe) .. 100 (risky)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
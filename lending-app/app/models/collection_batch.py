@@ -0,0 +1,23 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, JSON, UniqueConstraint
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+class CollectionBatch(SQLModel, table=True):
+    """
+    One POST /payments/collect-batch, keyed by the client's `collection_id`.
+
+    The unique key is taken before any installment is touched, so a retried
+    or concurrent request with the same key cannot apply the batch twice and
+    gets the stored results of the first one instead.
+    """
+    __tablename__ = "collection_batch"
+    __table_args__ = (
+        UniqueConstraint("user_id", "collection_id", name="uq_collection_batch_user_id_collection_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str
+    collection_id: str
+    results: List[Dict[str, Any]] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
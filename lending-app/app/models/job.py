@@ -0,0 +1,34 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Index, JSON
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+class Job(SQLModel, table=True):
+    """
+    A unit of background work, claimed and run by the worker pool in
+    app/core/jobs.py. Rows outlive the process that enqueued them, so clients
+    poll GET /jobs/{id} instead of holding a connection open.
+    """
+    __tablename__ = "job"
+    __table_args__ = (
+        Index("ix_job_status_run_after", "status", "run_after"),
+        Index("ix_job_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id: str = Field(primary_key=True)
+    user_id: str
+    kind: str                                   # handler name, see app/core/job_handlers.py
+    params: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    status: str = "queued"                      # queued, running, succeeded, failed, cancelled
+    progress: float = 0.0                       # 0..1
+    progress_message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    error: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int = 3
+    cancel_requested: bool = False
+    run_after: datetime = Field(default_factory=datetime.utcnow)  # retries are delayed by backing this off
+    heartbeat_at: Optional[datetime] = None     # refreshed while running; stale means the worker died
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
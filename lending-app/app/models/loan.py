@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import date, datetime
 from typing import List, TYPE_CHECKING, Optional
 from .borrower import Borrower
@@ -7,6 +8,15 @@ if TYPE_CHECKING:
     from .payment import Payment
 
 class Loan(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_loan_user_id_change_seq", "user_id", "change_seq"),
+        # Listing filters and orderings, see app/crud/filters.py
+        Index("ix_loan_user_id_status_start_date", "user_id", "status", "start_date"),
+        Index("ix_loan_user_id_borrower_id", "user_id", "borrower_id"),
+        Index("ix_loan_user_id_created_at", "user_id", "created_at"),
+        Index("ix_loan_user_id_principal", "user_id", "principal"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(index=True)
     borrower_id: int = Field(foreign_key="borrower.id")
@@ -20,5 +30,13 @@ class Loan(SQLModel, table=True):
     start_date: date
     created_at: datetime = Field(default_factory=datetime.utcnow)
     status: str = Field(default="active")  # active, completed, defaulted, cancelled
+    closed_at: datetime | None = None  # set when status becomes completed or cancelled
+    # Denormalized from the installments, see app/crud/loan_balance.py
+    outstanding_amount: float = 0.0
+    paid_installments: int = 0
+    next_due_date: date | None = None
+    last_paid_at: datetime | None = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    change_seq: int = Field(default=0)  # per-user change feed position, see app/crud/sync.py
     
     payments: List["Payment"] = Relationship(back_populates="loan", sa_relationship_kwargs={"cascade": "all, delete-orphan"}) 
\ No newline at end of file
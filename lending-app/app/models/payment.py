@@ -1,8 +1,17 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import date, datetime
 from .loan import Loan
 
 class Payment(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_payment_user_id_change_seq", "user_id", "change_seq"),
+        # Listing filters and orderings, see app/crud/filters.py
+        Index("ix_payment_user_id_due_date", "user_id", "due_date"),
+        Index("ix_payment_user_id_paid_at", "user_id", "paid_at"),
+        Index("ix_payment_loan_id_due_date", "loan_id", "due_date"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     user_id: str = Field(index=True)
     loan_id: int = Field(foreign_key="loan.id")
@@ -10,4 +19,10 @@ class Payment(SQLModel, table=True):
     due_date: date
     amount_due: float
     amount_paid: float = 0.0
-    paid_at: datetime | None = None 
\ No newline at end of file
+    paid_at: datetime | None = None
+    penalty_amount: float = 0.0  # accrued late penalties, see app/crud/penalty.py
+    # Split of amount_due from the schedule; NULL for manual installments
+    principal_due: float | None = None
+    interest_due: float | None = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    change_seq: int = Field(default=0)  # per-user change feed position, see app/crud/sync.py 
\ No newline at end of file
@@ -0,0 +1,26 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Integer, ForeignKey
+from datetime import date, datetime
+
+class PaymentArchive(SQLModel, table=True):
+    """
+    Installments of loans closed long ago, moved out of the hot payment table.
+
+    Rows keep their original payment id so ledger entries still resolve, see
+    app/crud/archive.py.
+    """
+    __tablename__ = "payment_archive"
+
+    id: int = Field(primary_key=True)
+    user_id: str = Field(index=True)
+    loan_id: int = Field(sa_column=Column(Integer, ForeignKey("loan.id", ondelete="CASCADE"), nullable=False, index=True))
+    due_date: date
+    amount_due: float
+    amount_paid: float = 0.0
+    paid_at: datetime | None = None
+    penalty_amount: float = 0.0
+    principal_due: float | None = None
+    interest_due: float | None = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    change_seq: int = Field(default=0)
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Integer, ForeignKey
+from datetime import datetime
+
+class PaymentTransaction(SQLModel, table=True):
+    """
+    Append-only ledger of money applied to installments.
+
+    Rows are never updated or deleted by the app. `payment_id` deliberately has
+    no foreign key so the history survives schedule recalculation.
+    """
+    __tablename__ = "payment_transaction"
+
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: str = Field(index=True)
+    loan_id: int = Field(sa_column=Column(Integer, ForeignKey("loan.id", ondelete="CASCADE"), nullable=False, index=True))
+    payment_id: int | None = Field(default=None, index=True)
+    collection_id: str = Field(index=True)  # groups the rows of one lump-sum collection
+    amount: float                           # negative for corrections made via PUT /payments/{id}
+    paid_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,55 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Integer, ForeignKey, Index, UniqueConstraint
+from datetime import date, datetime
+from typing import Optional
+
+class PenaltyRule(SQLModel, table=True):
+    """
+    How overdue installments accrue penalties. A rule with a loan_id applies to
+    that loan only and overrides the user's default rule (loan_id NULL).
+    See app/crud/penalty.py.
+    """
+    __tablename__ = "penalty_rule"
+    __table_args__ = (Index("ix_penalty_rule_user_id_loan_id", "user_id", "loan_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str
+    loan_id: Optional[int] = Field(default=None, sa_column=Column(Integer, ForeignKey("loan.id", ondelete="CASCADE"), nullable=True))
+    grace_days: int = 0                        # days after the due date before anything accrues
+    flat_fee: float = 0.0                      # charged once, on the first day past the grace period
+    daily_rate_percent: float = 0.0            # of the unpaid balance, every day past the grace period
+    max_penalty: Optional[float] = None        # cap per installment
+    max_penalty_percent: Optional[float] = None  # cap per installment, as a percent of amount_due
+    is_active: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class PenaltyCharge(SQLModel, table=True):
+    """
+    One day's penalty on one installment. The unique (payment_id, charge_date)
+    pair makes the nightly accrual idempotent. `payment_id` has no foreign key
+    because installments move to payment_archive.
+    """
+    __tablename__ = "penalty_charge"
+    __table_args__ = (UniqueConstraint("payment_id", "charge_date", name="uq_penalty_charge_payment_id_charge_date"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(index=True)
+    loan_id: int = Field(sa_column=Column(Integer, ForeignKey("loan.id", ondelete="CASCADE"), nullable=False, index=True))
+    payment_id: int
+    rule_id: Optional[int] = None
+    charge_date: date
+    amount: float
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class PenaltyAccrual(SQLModel, table=True):
+    """
+    How far `accrue_penalties` has got: every day up to and including
+    `accrued_through` has been charged for every user, including days that
+    produced no charges. The next run starts on the day after.
+    """
+    __tablename__ = "penalty_accrual"
+
+    id: int = Field(default=1, primary_key=True)  # a single row
+    accrued_through: date
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
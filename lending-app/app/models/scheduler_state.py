@@ -0,0 +1,32 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+class SchedulerLease(SQLModel, table=True):
+    """
+    Which process runs the cron jobs in app/core/scheduler.py. The holder
+    renews `expires_at` while it is alive; once it lapses any other process
+    may take the lease over.
+    """
+    __tablename__ = "scheduler_lease"
+
+    name: str = Field(primary_key=True)
+    holder: str                                 # host:pid:nonce of the leading process
+    acquired_at: datetime
+    expires_at: datetime
+
+class ScheduledJobState(SQLModel, table=True):
+    """The last run of a cron job, used to catch up missed runs and to report lag."""
+    __tablename__ = "scheduled_job_state"
+
+    name: str = Field(primary_key=True)
+    last_scheduled_for: Optional[datetime] = None  # fire time (UTC) of the last claimed run
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_seconds: Optional[float] = None
+    last_lag_seconds: Optional[float] = None       # start minus fire time
+    last_status: Optional[str] = None              # running, succeeded, failed
+    last_error: Optional[str] = None
+    last_holder: Optional[str] = None
+    run_count: int = 0
+    failure_count: int = 0
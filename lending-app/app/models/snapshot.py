@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint
+from datetime import date, datetime
+
+class PortfolioSnapshot(SQLModel, table=True):
+    """End-of-day portfolio figures per user, written by the nightly snapshot job."""
+    __tablename__ = "portfolio_snapshot"
+    __table_args__ = (UniqueConstraint("user_id", "snapshot_date", name="uq_portfolio_snapshot_user_id_date"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: str
+    snapshot_date: date
+    borrowers: int = 0
+    active_loans: int = 0
+    outstanding: float = 0.0   # unpaid amount_due across all installments
+    collected: float = 0.0     # ledger amounts with paid_at on snapshot_date
+    overdue_1_7: float = 0.0   # unpaid amounts by days past due
+    overdue_8_30: float = 0.0
+    overdue_31_60: float = 0.0
+    overdue_over_60: float = 0.0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
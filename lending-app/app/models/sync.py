@@ -0,0 +1,22 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from datetime import datetime
+
+class SyncState(SQLModel, table=True):
+    """Per-user change counter. Every write bumps `last_seq` once per flush."""
+    __tablename__ = "sync_state"
+
+    user_id: str = Field(primary_key=True)
+    last_seq: int = 0
+
+class SyncTombstone(SQLModel, table=True):
+    """Deleted borrower/loan/payment ids, so delta clients can drop them."""
+    __tablename__ = "sync_tombstone"
+    __table_args__ = (Index("ix_sync_tombstone_user_id_change_seq", "user_id", "change_seq"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: str
+    entity: str  # borrower | loan | payment
+    entity_id: int
+    change_seq: int
+    deleted_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+from typing import Dict, Any
+
+from app.core.auth import get_current_user
+from app.core.admission import controller
+from app.models.user import User
+
+router = APIRouter()
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def read_admission_stats(current_user: User = Depends(get_current_user)):
+    """
+    Slots in use and queued requests across the server, plus this account's
+    in-flight requests, queue depth per priority and rejection counts.
+    """
+    return controller.stats(current_user.id)
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+from app.core.database import get_session
+from app.core.auth import get_current_user
+from app.core.audit import AUDITED, writer
+from app.crud import audit as audit_crud
+from app.models.user import User
+
+router = APIRouter()
+
+class AuditLogResponse(BaseModel):
+    id: int
+    actor: str
+    entity: str
+    entity_id: Optional[int] = None
+    action: str
+    changes: Dict[str, Any]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+@router.get("/", response_model=List[AuditLogResponse])
+async def read_audit_log(
+    entity: Optional[str] = Query(None, pattern="^(" + "|".join(AUDITED.values()) + ")$"),
+    entity_id: Optional[int] = None,
+    actor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Changes to your borrowers, loans and installments, newest first. Updates
+    list each changed column as [before, after]. Records are written
+    shortly after the change commits, so the last second may be missing.
+    """
+    return await audit_crud.get_audit_logs(
+        db,
+        user_id=current_user.id,
+        entity=entity,
+        entity_id=entity_id,
+        actor=actor,
+        since=since,
+        until=until,
+        before_id=before_id,
+        limit=limit
+    )
+
+@router.get("/writer", response_model=Dict[str, Any])
+async def read_audit_writer_stats(current_user: User = Depends(get_current_user)):
+    """Records queued in this process, and how many were written in batches, inline or dropped."""
+    return {"running": writer.running, **writer.stats()}
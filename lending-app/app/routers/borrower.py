@@ -1,15 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any
-from sqlmodel import select, func
+from typing import List, Dict, Any, Optional
 
 from app.core.database import get_session
 from app.core.auth import get_current_user, User
 from app.schemas.borrower import BorrowerCreate, BorrowerUpdate, BorrowerResponse
 from app.crud import borrower as borrower_crud
 from app.schemas import ResponseModel
-from app.models.loan import Loan
-from app.models.borrower import Borrower
 
 router = APIRouter()
 
@@ -21,80 +18,97 @@ async def create_borrower(
 ):
     return await borrower_crud.create_borrower(db, borrower, user_id=current_user.id)
 
+@router.get("/search", response_model=List[Dict[str, Any]])
+async def search_borrowers(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    rows = await borrower_crud.search_borrowers(db, user_id=current_user.id, q=q, limit=limit)
+    return [
+        {
+            "id": borrower_obj.id,
+            "name": borrower_obj.name,
+            "mobile": borrower_obj.mobile,
+            "match": match,
+            "score": score
+        }
+        for borrower_obj, match, score in rows
+    ]
+
+@router.get("/{borrower_id}/overview", response_model=Dict[str, Any])
+async def read_borrower_overview(
+    borrower_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    overview = await borrower_crud.get_borrower_overview(db, borrower_id, user_id=current_user.id)
+    if overview is None:
+        raise HTTPException(status_code=404, detail="Borrower not found or not owned by user")
+    return overview
+
 @router.get("/{borrower_id}", response_model=Dict[str, Any])
 async def read_borrower(
     borrower_id: int, 
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    db_borrower = await borrower_crud.get_borrower(db, borrower_id, user_id=current_user.id)
-    if db_borrower is None:
+    row = await borrower_crud.get_borrower_with_stats(db, borrower_id, user_id=current_user.id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Borrower not found or not owned by user")
+    db_borrower, stats, loan_count, total_principal = row
     
-    # Get all loans for the borrower, ensuring they also belong to the current user
-    loans_result = await db.execute(
-        select(Loan).where(Loan.borrower_id == borrower_id).where(Loan.user_id == current_user.id)
-    )
-    loans = loans_result.scalars().all()
-    
-    active_loans_count = len(loans)
-    total_principal = sum(loan.principal for loan in loans)
-    total_loans = active_loans_count
-    
-    borrower_dict = {
+    return {
         "id": db_borrower.id,
         "user_id": db_borrower.user_id,
         "name": db_borrower.name,
         "mobile": db_borrower.mobile,
         "created_at": db_borrower.created_at,
-        "active_loans_count": active_loans_count,
-        "total_principal": total_principal,
-        "total_loans": total_loans,
-        "repayment_rate": 100
+        "active_loans_count": loan_count or 0,
+        "total_principal": total_principal or 0.0,
+        "total_loans": loan_count or 0,
+        **borrower_crud.repayment_fields(stats)
     }
-    
-    return borrower_dict
 
 @router.get("/", response_model=List[Dict[str, Any]])
 async def read_borrowers(
     skip: int = 0, 
     limit: int = 100, 
+    sort_by: str = Query("created_at", pattern="^(" + "|".join(borrower_crud.BORROWER_SORT_COLUMNS) + ")$"),
+    descending: bool = False,
+    min_risk: Optional[float] = None,
+    max_risk: Optional[float] = None,
+    in_arrears: Optional[bool] = None,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    borrowers = await borrower_crud.get_borrowers(db, user_id=current_user.id, skip=skip, limit=limit)
+    rows = await borrower_crud.get_borrowers_with_stats(
+        db,
+        user_id=current_user.id,
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        descending=descending,
+        min_risk=min_risk,
+        max_risk=max_risk,
+        in_arrears=in_arrears
+    )
     
-    result = []
-    for borrower_obj in borrowers:
-        # Get active loans count for this borrower, ensuring loans belong to current user
-        active_loans_count_result = await db.execute(
-            select(func.count(Loan.id)).select_from(Loan)
-            .where(Loan.borrower_id == borrower_obj.id)
-            .where(Loan.user_id == current_user.id)
-        )
-        active_loans_count = active_loans_count_result.scalar_one_or_none() or 0
-        
-        # Get total principal for this borrower, ensuring loans belong to current user
-        total_principal_result = await db.execute(
-            select(func.sum(Loan.principal)).select_from(Loan)
-            .where(Loan.borrower_id == borrower_obj.id)
-            .where(Loan.user_id == current_user.id)
-        )
-        total_principal = total_principal_result.scalar_one_or_none() or 0.0
-        
-        result.append({
+    return [
+        {
             "id": borrower_obj.id,
             "user_id": borrower_obj.user_id,
             "name": borrower_obj.name,
             "mobile": borrower_obj.mobile,
             "created_at": borrower_obj.created_at,
-            "active_loans_count": active_loans_count,
-            "total_principal": total_principal,
-            "total_loans": active_loans_count,
-            "repayment_rate": 100
-        })
-    
-    return result
+            "active_loans_count": loan_count or 0,
+            "total_principal": total_principal or 0.0,
+            "total_loans": loan_count or 0,
+            **borrower_crud.repayment_fields(stats)
+        }
+        for borrower_obj, stats, loan_count, total_principal in rows
+    ]
 
 @router.put("/{borrower_id}", response_model=BorrowerResponse)
 async def update_borrower(
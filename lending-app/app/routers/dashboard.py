@@ -1,104 +1,158 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select, func
-from typing import Dict, Any, List
-from sqlalchemy import extract
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from pydantic import BaseModel, Field
 
-from app.core.database import get_session
+from app.core.config import settings
+from app.core.database import get_session, async_session
 from app.core.auth import get_current_user
+from app.crud import dashboard as dashboard_crud
+from app.crud import payment as payment_crud
+from app.crud import snapshot as snapshot_crud
+from app.crud import forecast as forecast_crud
+from app.crud import simulation as simulation_crud
 from app.models.user import User
-from app.models.loan import Loan
-from app.models.payment import Payment
-from app.models.borrower import Borrower
-from datetime import date, timedelta, datetime
-import calendar
+from app.schemas.payment import PaymentResponse
+from datetime import date, timedelta
+import asyncio
 
 router = APIRouter()
 
 @router.get("/summary")
 async def get_dashboard_summary(db: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
-    today = date.today()
+    return await dashboard_crud.get_summary(db, current_user.id)
+
+async def _overdue_payments(db: AsyncSession, user_id: str) -> List[Dict[str, Any]]:
+    payments = await payment_crud.get_overdue_payments(db, user_id=user_id)
+    return [PaymentResponse.model_validate(payment).model_dump() for payment in payments]
+
+async def _load_section(load: Callable[[AsyncSession], Awaitable[Any]], timeout: float, slots: asyncio.Semaphore) -> Any:
+    # Each section gets its own session, and so its own pooled connection; the
+    # request holds one admission slot per concurrent section, see app/core/admission.py
+    async with slots, async_session() as db:
+        return await asyncio.wait_for(load(db), timeout)
+
+@router.get("/bootstrap", response_model=Dict[str, Any])
+async def get_dashboard_bootstrap(
+    months: int = Query(12, ge=1, le=60),
+    recent_limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Everything the dashboard shows on load in one response: the summary,
+    expected profit, today's reminders, and recent and overdue payments.
+    Up to DASHBOARD_BOOTSTRAP_CONCURRENCY sections run concurrently. One that
+    fails or takes longer than DASHBOARD_SECTION_TIMEOUT_SECONDS comes back as
+    null and is named in `errors`, and the other sections are still returned.
+    """
     user_id = current_user.id
-    
-    # Count active borrowers
-    borrower_count_result = await db.execute(select(func.count()).select_from(Borrower).where(Borrower.user_id == user_id))
-    active_borrowers = borrower_count_result.scalar() or 0
-    
-    # Count loans
-    loan_count_result = await db.execute(select(func.count()).select_from(Loan).where(Loan.user_id == user_id))
-    loan_count = loan_count_result.scalar() or 0
-    
-    # Get all active loans with outstanding balances
-    # Calculate the total loans value (includes both principal and interest)
-    outstanding_balance_result = await db.execute(
-        select(func.sum(Payment.amount_due - Payment.amount_paid))
-        .join(Loan, Payment.loan_id == Loan.id)
-        .where(Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id)
-    )
-    outstanding_balance = outstanding_balance_result.scalar() or 0
-    
-    # Also get the principal sum for historical comparison
-    principal_result = await db.execute(select(func.sum(Loan.principal)).where(Loan.user_id == user_id))
-    principal_sum = principal_result.scalar() or 0
-    
-    # Use the sum of outstanding balances as the total loans amount
-    total_loans_amount = outstanding_balance
-    
-    # Sum payments due today
-    due_today_result = await db.execute(
-        select(func.sum(Payment.amount_due - Payment.amount_paid))
-        .join(Loan, Payment.loan_id == Loan.id)
-        .where(Payment.due_date == today, Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id)
-    )
-    due_today = due_today_result.scalar() or 0
-    
-    # Sum overdue payments
-    overdue_result = await db.execute(
-        select(func.sum(Payment.amount_due - Payment.amount_paid))
-        .join(Loan, Payment.loan_id == Loan.id)
-        .where(Payment.due_date < today, Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id)
+    sections = {
+        "summary": lambda db: dashboard_crud.get_summary(db, user_id),
+        "expected_profit": lambda db: dashboard_crud.get_expected_profit(db, user_id, months=months),
+        "reminders": lambda db: dashboard_crud.get_todays_reminders(db, user_id),
+        "recent_payments": lambda db: dashboard_crud.get_recent_payments(db, user_id, limit=recent_limit),
+        "overdue_payments": lambda db: _overdue_payments(db, user_id),
+    }
+    slots = asyncio.Semaphore(settings.DASHBOARD_BOOTSTRAP_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_load_section(load, settings.DASHBOARD_SECTION_TIMEOUT_SECONDS, slots) for load in sections.values()),
+        return_exceptions=True
     )
-    overdue_amount = overdue_result.scalar() or 0
-    
-    # Calculate percentage changes (if possible)
-    # For loans, try to compare with previous week's data
-    last_week = today - timedelta(days=7)
-    
-    # For outstanding balances, get last week's data
-    last_week_outstanding_result = await db.execute(
-        select(func.sum(Payment.amount_due - Payment.amount_paid))
-        .join(Loan, Payment.loan_id == Loan.id)
-        .where(Loan.created_at <= last_week, Payment.amount_paid < Payment.amount_due, Loan.user_id == user_id)
+
+    response: Dict[str, Any] = {"errors": {}}
+    for name, result in zip(sections, results):
+        if isinstance(result, BaseException):
+            timed_out = isinstance(result, asyncio.TimeoutError)
+            print(f"[DASHBOARD] bootstrap section {name} {'timed out' if timed_out else 'failed'}: {result!r}")
+            response[name] = None
+            response["errors"][name] = "timeout" if timed_out else "error"
+        else:
+            response[name] = result
+    return response
+
+@router.get("/trends", response_model=Dict[str, Any])
+async def get_dashboard_trends(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Week-over-week and month-over-month changes from the nightly portfolio snapshots.
+    """
+    return await snapshot_crud.get_trends(db, current_user.id)
+
+@router.get("/aging", response_model=List[Dict[str, Any]])
+async def get_aging_history(
+    days: int = 30,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Daily overdue amounts by aging bucket for the last X days (default 30), for the aging chart.
+    """
+    today = date.today()
+    snapshots = await snapshot_crud.get_snapshots(db, current_user.id, today - timedelta(days=days), today)
+    return [
+        {
+            "date": s.snapshot_date,
+            "outstanding": s.outstanding,
+            "collected": s.collected,
+            "overdue_1_7": s.overdue_1_7,
+            "overdue_8_30": s.overdue_8_30,
+            "overdue_31_60": s.overdue_31_60,
+            "overdue_over_60": s.overdue_over_60,
+        }
+        for s in snapshots
+    ]
+
+@router.get("/forecast", response_model=Dict[str, Any])
+async def get_cash_flow_forecast(
+    horizon_days: int = Query(90, ge=1, le=1830),
+    granularity: str = Query("week", pattern="^(" + "|".join(forecast_crud.GRANULARITIES) + ")$"),
+    borrower_id: Optional[int] = None,
+    include_overdue: bool = True,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Expected collections per day, week or month over the horizon, split into
+    principal and interest, for the whole portfolio or one borrower.
+    """
+    return await forecast_crud.get_cash_flow_forecast(
+        db,
+        current_user.id,
+        horizon_days=horizon_days,
+        granularity=granularity,
+        borrower_id=borrower_id,
+        include_overdue=include_overdue
     )
-    last_week_outstanding = last_week_outstanding_result.scalar() or 1  # avoid division by zero
-    
-    # For borrowers, compare with previous week
-    last_week_borrowers_result = await db.execute(
-        select(func.count())
-        .select_from(Borrower)
-        .where(Borrower.created_at <= last_week, Borrower.user_id == user_id)
+
+class SimulationRequest(BaseModel):
+    scenarios: int = Field(2000, ge=100, le=20000)
+    horizon_months: int = Field(12, ge=1, le=36)
+    default_shock: float = Field(0.0, ge=-1.0, le=1.0)  # added to every borrower's annual default probability
+    borrower_id: Optional[int] = None
+    seed: Optional[int] = None
+
+@router.post("/simulate", response_model=Dict[str, Any])
+async def simulate_collections(
+    request: SimulationRequest,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Monte Carlo of monthly collections and losses on the open installments.
+    Default and delay probabilities come from each borrower's repayment
+    history; returns 5/25/50/75/95th percentile bands per month and in total.
+    """
+    return await simulation_crud.simulate_collections(
+        db,
+        current_user.id,
+        scenarios=request.scenarios,
+        horizon_months=request.horizon_months,
+        default_shock=request.default_shock,
+        borrower_id=request.borrower_id,
+        seed=request.seed
     )
-    last_week_borrowers = last_week_borrowers_result.scalar() or 1  # avoid division by zero
-    
-    # Calculate percentage changes
-    if last_week_outstanding > 0 and total_loans_amount > 0:
-        loans_change = round(((total_loans_amount - last_week_outstanding) / last_week_outstanding) * 100)
-    else:
-        loans_change = 0
-        
-    if last_week_borrowers > 0 and active_borrowers > 0:
-        borrowers_change = round(((active_borrowers - last_week_borrowers) / last_week_borrowers) * 100)
-    else:
-        borrowers_change = 0
-    
-    return {
-        "active_borrowers": int(active_borrowers),
-        "total_loans_amount": float(total_loans_amount),
-        "due_today": float(due_today),
-        "overdue_amount": float(overdue_amount),
-        "loans_change": int(loans_change),
-        "borrowers_change": int(borrowers_change)
-    }
 
 @router.get("/expected-profit", response_model=List[Dict[str, Any]])
 async def get_expected_monthly_profit(
@@ -110,61 +164,4 @@ async def get_expected_monthly_profit(
     Calculate expected profit per month for the next X months (default 12).
     This endpoint returns data for dashboard graphs showing projected earnings.
     """
-    today = date.today()
-    result = []
-    user_id = current_user.id
-    
-    # Calculate the expected profit for each month
-    for i in range(months):
-        # Calculate the month we're looking at
-        target_month = today.month + i
-        target_year = today.year + (target_month - 1) // 12
-        target_month = ((target_month - 1) % 12) + 1
-        
-        # Get the first and last day of the target month
-        first_day = date(target_year, target_month, 1)
-        last_day = date(target_year, target_month, 
-                        calendar.monthrange(target_year, target_month)[1])
-        
-        # Query for expected payments in this month from active loans
-        # For profit calculation, we only consider the interest portion of payments
-        query = select(
-            func.sum(Payment.amount_due - Payment.amount_paid)
-        ).join(
-            Loan, Payment.loan_id == Loan.id
-        ).where(
-            Payment.due_date >= first_day,
-            Payment.due_date <= last_day,
-            Loan.status == "active",
-            Loan.user_id == user_id
-        )
-        
-        total_due_result = await db.execute(query)
-        total_due = total_due_result.scalar() or 0
-        
-        # Get principal portion from the same time period to calculate interest
-        principal_query = select(
-            func.sum(Loan.principal / Loan.term_units)
-        ).join(
-            Payment, Payment.loan_id == Loan.id
-        ).where(
-            Payment.due_date >= first_day,
-            Payment.due_date <= last_day,
-            Loan.status == "active",
-            Loan.user_id == user_id
-        )
-        
-        principal_result = await db.execute(principal_query)
-        principal_portion = principal_result.scalar() or 0
-        
-        # Calculate expected profit (total due minus principal portion)
-        expected_profit = max(0, total_due - principal_portion)
-        
-        # Add to results
-        result.append({
-            "month": f"{calendar.month_name[target_month]} {target_year}",
-            "month_key": f"{target_year}-{target_month:02d}",
-            "expected_profit": round(expected_profit, 2)
-        })
-    
-    return result 
\ No newline at end of file
+    return await dashboard_crud.get_expected_profit(db, current_user.id, months=months)
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Set
+import asyncio
+import json
+
+from app.core.auth import get_current_user_for_stream
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.pubsub import get_broker, user_channel
+from app.crud import dashboard as dashboard_crud
+from app.models.user import User
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 25
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+async def _load_summary(user_id: str) -> Dict[str, Any]:
+    async with async_session() as db:
+        return await dashboard_crud.get_summary(db, user_id)
+
+async def _dashboard_stream(request: Request, user_id: str) -> AsyncIterator[str]:
+    broker = get_broker()
+    channel = user_channel(user_id)
+    queue = await broker.subscribe(channel)
+    try:
+        last_summary = await _load_summary(user_id)
+        yield _sse("summary", last_summary)
+
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            # Debounce: a collection sync can commit many times in a burst,
+            # recompute once after it settles.
+            await asyncio.sleep(settings.PUSH_DEBOUNCE_SECONDS)
+            entities: Set[str] = set(json.loads(message)["entities"])
+            while not queue.empty():
+                entities.update(json.loads(queue.get_nowait())["entities"])
+
+            yield _sse("changed", {"entities": sorted(entities)})
+
+            summary = await _load_summary(user_id)
+            delta = {key: value for key, value in summary.items() if last_summary.get(key) != value}
+            if delta:
+                last_summary = summary
+                yield _sse("summary", delta)
+    finally:
+        await broker.unsubscribe(channel, queue)
+
+@router.get("/dashboard")
+async def stream_dashboard(
+    request: Request,
+    current_user: User = Depends(get_current_user_for_stream)
+):
+    """
+    Server-sent events for the dashboard. Sends the full summary on connect,
+    then `changed` (entity types written since) and `summary` (only the
+    fields that changed) events, debounced, whenever the user's data changes.
+    """
+    return StreamingResponse(
+        _dashboard_stream(request, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
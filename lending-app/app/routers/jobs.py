@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field
+
+from app.core.database import get_session
+from app.core.auth import get_current_user, User
+from app.core import jobs
+from app.crud import job as job_crud
+from app.schemas.job import JobResponse
+
+router = APIRouter()
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job: JobCreate,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Enqueue a job. Poll GET /jobs/{id} for its progress and result."""
+    handler = jobs.HANDLERS.get(job.kind)
+    if handler is None or not handler.public:
+        kinds = sorted(kind for kind, h in jobs.HANDLERS.items() if h.public)
+        raise HTTPException(status_code=400, detail=f"Unknown job kind. Must be one of: {', '.join(kinds)}")
+    return await jobs.submit(db, current_user.id, job.kind, job.params)
+
+@router.get("/", response_model=List[JobResponse])
+async def read_jobs(
+    status: Optional[str] = Query(None, pattern="^(queued|running|succeeded|failed|cancelled)$"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """The account's most recent jobs, newest first."""
+    return await job_crud.get_jobs(db, current_user.id, status=status, limit=limit)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def read_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    job = await job_crud.get_job(db, job_id, user_id=current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel a queued job, or ask a running one to stop at its next progress report."""
+    job = await job_crud.get_job(db, job_id, user_id=current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in job_crud.FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return await job_crud.request_cancel(db, job)
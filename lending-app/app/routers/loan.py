@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy import select
-from typing import List, Dict, Any
-from pydantic import BaseModel
+from typing import List, Dict, Any, Optional, Tuple
+from pydantic import BaseModel, Field
 from datetime import date, datetime
 
 from app.core.database import get_session
 from app.core.auth import get_current_user, User
+from app.core import jobs
+from app.core.fields import fields_query
 from app.schemas.loan import LoanCreate, LoanUpdate, LoanResponse
 from app.crud import loan as loan_crud
+from app.crud.archive import CLOSED_STATUSES, restore_payments
+from app.core.schedule import Schedule, compute_schedule, effective_annual_rate_percent
 from app.schemas import ResponseModel
-from app.models.payment import Payment
+from app.schemas.job import JobResponse
 from app.models.loan import Loan
 
 router = APIRouter()
@@ -40,6 +44,70 @@ class LoanStatusUpdatedResponse(BaseModel):
     status: str
     message: str = "Loan status updated successfully"
 
+class LoanPreviewRequest(BaseModel):
+    principal: float = Field(gt=0)
+    interest_rate_percent: float = Field(ge=0)
+    term_units: int = Field(ge=1, le=3660)
+    term_frequency: str = Field(pattern="(?i)^(daily|weekly|monthly|quarterly|yearly)$")
+    repayment_type: str = Field("flat", pattern="(?i)^(flat|amortized|amortised)$")
+    interest_cycle: Optional[str] = Field("yearly", pattern="(?i)^(one-time|daily|weekly|monthly|yearly)$")
+    start_date: date = Field(default_factory=date.today)
+
+class PreviewInstallment(BaseModel):
+    number: int
+    due_date: date
+    amount_due: float
+    principal: float
+    interest: float
+    balance: float
+
+class LoanPreview(BaseModel):
+    installment_amount: float
+    installments_count: int
+    total_payable: float
+    total_interest: float
+    periodic_rate_percent: float
+    effective_annual_rate_percent: Optional[float]  # None when too large to represent
+    payoff_date: date
+    schedule: Optional[List[PreviewInstallment]] = None
+
+class LoanPreviewBatch(BaseModel):
+    options: List[LoanPreviewRequest] = Field(min_length=1, max_length=20)  # up to 20 x 3660 installments per request
+    include_schedule: bool = False
+
+def _preview(terms: LoanPreviewRequest, include_schedule: bool = True) -> LoanPreview:
+    schedule: Schedule = compute_schedule(**terms.model_dump())
+    return LoanPreview(
+        installment_amount=schedule.installment_amount,
+        installments_count=len(schedule.installments),
+        total_payable=schedule.total_payable,
+        total_interest=schedule.total_interest,
+        periodic_rate_percent=schedule.periodic_rate_percent,
+        effective_annual_rate_percent=effective_annual_rate_percent(schedule, terms.principal, terms.term_frequency),
+        payoff_date=schedule.payoff_date,
+        schedule=[PreviewInstallment(**installment._asdict()) for installment in schedule.installments] if include_schedule else None
+    )
+
+@router.post("/preview", response_model=LoanPreview)
+def preview_loan(
+    terms: LoanPreviewRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The schedule and totals a loan with these terms would get, without saving
+    anything. Amounts match what POST /loans/ persists. A plain def so the
+    schedule is built in the threadpool rather than on the event loop.
+    """
+    return _preview(terms)
+
+@router.post("/preview/batch", response_model=List[LoanPreview])
+def preview_loans(
+    batch: LoanPreviewBatch,
+    current_user: User = Depends(get_current_user)
+):
+    """Compare several term options in one call; schedules are omitted unless requested."""
+    return [_preview(terms, batch.include_schedule) for terms in batch.options]
+
 @router.post("/", response_model=LoanCreatedResponse, status_code=status.HTTP_201_CREATED)
 async def create_loan(
     loan: LoanCreate, 
@@ -63,75 +131,63 @@ async def create_loan(
 @router.get("/{loan_id}", response_model=Dict[str, Any])
 async def read_loan(
     loan_id: int, 
+    fields: Tuple[str, ...] = Depends(fields_query(loan_crud.LOAN_FIELDS)),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    db_loan = await loan_crud.get_loan(db, loan_id, user_id=current_user.id)
+    db_loan = await loan_crud.get_loan_row(db, loan_id, user_id=current_user.id, fields=fields)
     if db_loan is None:
         raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
-    
-    return {
-        "id": db_loan.id,
-        "user_id": db_loan.user_id,
-        "borrower_id": db_loan.borrower_id,
-        "principal": db_loan.principal,
-        "interest_rate_percent": db_loan.interest_rate_percent,
-        "term_units": db_loan.term_units,
-        "term_frequency": db_loan.term_frequency,
-        "repayment_type": db_loan.repayment_type,
-        "start_date": db_loan.start_date,
-        "status": db_loan.status,
-        "created_at": db_loan.created_at
-    }
+    return db_loan
 
 @router.get("/", response_model=List[Dict[str, Any]])
 async def read_loans(
     skip: int = 0, 
-    limit: int = 100, 
+    limit: int = Query(100, ge=1, le=500), 
+    sort_by: str = Query("created_at", pattern="^(" + "|".join(loan_crud.LOAN_SORT_COLUMNS) + ")$"),
+    descending: bool = False,
+    status: Optional[str] = None,
+    term_frequency: Optional[str] = None,
+    repayment_type: Optional[str] = None,
+    borrower_id: Optional[int] = None,
+    start_from: Optional[date] = None,
+    start_to: Optional[date] = None,
+    principal_min: Optional[float] = None,
+    principal_max: Optional[float] = None,
+    outstanding_min: Optional[float] = None,
+    outstanding_max: Optional[float] = None,
+    fields: Tuple[str, ...] = Depends(fields_query(loan_crud.LOAN_FIELDS)),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    loans = await loan_crud.get_loans(db, user_id=current_user.id, skip=skip, limit=limit)
-    return [
-        {
-            "id": loan.id,
-            "user_id": loan.user_id,
-            "borrower_id": loan.borrower_id,
-            "principal": loan.principal,
-            "interest_rate_percent": loan.interest_rate_percent,
-            "term_units": loan.term_units,
-            "term_frequency": loan.term_frequency,
-            "repayment_type": loan.repayment_type,
-            "start_date": loan.start_date,
-            "status": loan.status,
-            "created_at": loan.created_at,
-        }
-        for loan in loans
-    ]
+    return await loan_crud.get_loans(
+        db,
+        user_id=current_user.id,
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        descending=descending,
+        fields=fields,
+        status=status,
+        term_frequency=term_frequency,
+        repayment_type=repayment_type,
+        borrower_id=borrower_id,
+        start_from=start_from,
+        start_to=start_to,
+        principal_min=principal_min,
+        principal_max=principal_max,
+        outstanding_min=outstanding_min,
+        outstanding_max=outstanding_max
+    )
 
 @router.get("/borrower/{borrower_id}", response_model=List[Dict[str, Any]])
 async def read_loans_by_borrower(
     borrower_id: int, 
+    fields: Tuple[str, ...] = Depends(fields_query(loan_crud.LOAN_FIELDS)),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    loans = await loan_crud.get_loans_by_borrower(db, borrower_id, user_id=current_user.id)
-    return [
-        {
-            "id": loan.id,
-            "user_id": loan.user_id,
-            "borrower_id": loan.borrower_id,
-            "principal": loan.principal,
-            "interest_rate_percent": loan.interest_rate_percent,
-            "term_units": loan.term_units,
-            "term_frequency": loan.term_frequency,
-            "repayment_type": loan.repayment_type,
-            "start_date": loan.start_date,
-            "status": loan.status,
-            "created_at": loan.created_at,
-        }
-        for loan in loans
-    ]
+    return await loan_crud.get_loans_by_borrower(db, borrower_id, user_id=current_user.id, fields=fields)
 
 @router.put("/{loan_id}", response_model=LoanResponse)
 async def update_loan(
@@ -156,25 +212,18 @@ async def delete_loan(
         raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
     return ResponseModel(success=True, message="Loan deleted successfully")
 
-@router.post("/{loan_id}/recalculate-schedule", response_model=ResponseModel)
+@router.post("/{loan_id}/recalculate-schedule", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def recalculate_payment_schedule(
     loan_id: int, 
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
+    """Queue a schedule regeneration. Poll GET /jobs/{id} for the result."""
     db_loan = await loan_crud.get_loan(db, loan_id, user_id=current_user.id)
     if db_loan is None:
         raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
     
-    from sqlmodel import delete
-    await db.execute(delete(Payment).where(Payment.loan_id == loan_id).where(Payment.user_id == current_user.id))
-    
-    await loan_crud.generate_schedule(db, db_loan, user_id=current_user.id)
-    
-    return ResponseModel(
-        success=True, 
-        message=f"Payment schedule for loan {loan_id} has been recalculated."
-    )
+    return await jobs.submit(db, current_user.id, "loan.recalculate_schedule", {"loan_id": loan_id})
 
 @router.patch("/{loan_id}/status", response_model=LoanStatusUpdatedResponse)
 async def update_loan_status(
@@ -194,7 +243,10 @@ async def update_loan_status(
             detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
         )
     
+    was_closed = db_loan.status in CLOSED_STATUSES
     db_loan.status = status_update.status
+    if was_closed and db_loan.status not in CLOSED_STATUSES:
+        await restore_payments(db, loan_id, user_id=current_user.id)
     await db.commit()
     await db.refresh(db_loan)
     
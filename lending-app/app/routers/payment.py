@@ -1,18 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
-from datetime import datetime
-from sqlmodel import select, desc
+from typing import List, Dict, Any, Optional, Tuple
+from pydantic import BaseModel, Field
+from datetime import datetime, date
+from sqlmodel import select
 
 from app.core.database import get_session
 from app.core.auth import get_current_user, User
+from app.core import jobs
+from app.core.fields import fields_query
 from app.schemas.payment import PaymentResponse, PaymentUpdate, PaymentCreate
+from app.schemas.job import JobResponse
 from app.crud import payment as payment_crud
 from app.crud import loan as loan_crud
+from app.crud import dashboard as dashboard_crud
 from app.models.payment import Payment
 from app.models.loan import Loan
-from app.models.borrower import Borrower
 from app.crud.loan import generate_schedule  # Import the payment calculation logic
 
 router = APIRouter()
@@ -95,24 +98,70 @@ async def calculate_payment_amount(db: AsyncSession, loan_id: int, user_id: str)
             payment = loan.principal * rate / (1 - (1 + rate) ** (-loan.term_units))
             return round(payment, 2)
 
-class PaymentSimpleResponse(BaseModel):
+class PaymentCollected(BaseModel):
     id: int
     loan_id: int
     user_id: str
-    due_date: str
     amount_due: float
     amount_paid: float
+    paid_at: datetime
+    message: str = "Payment collected successfully"
+
+class LumpSumCollect(BaseModel):
+    amount: float
     paid_at: Optional[datetime] = None
 
-class PaymentCollected(BaseModel):
-    id: int
-    loan_id: int
-    user_id: str
+class AllocationResponse(BaseModel):
+    payment_id: int
+    due_date: date
     amount_due: float
     amount_paid: float
-    paid_at: datetime
+    amount_applied: float
+    fully_paid: bool
+
+class LumpSumCollected(BaseModel):
+    collection_id: str
+    loan_id: int
+    amount_applied: float
+    allocations: List[AllocationResponse]
     message: str = "Payment collected successfully"
 
+class BatchCollectItem(BaseModel):
+    payment_id: int
+    amount: Optional[float] = None  # None settles the remaining balance
+    paid_at: Optional[datetime] = None
+
+class BatchCollect(BaseModel):
+    items: List[BatchCollectItem] = Field(..., min_length=1, max_length=1000)
+    collection_id: Optional[str] = None  # client-generated key; re-sending it returns the first response
+
+class BatchCollectItemResult(BaseModel):
+    index: int
+    payment_id: int
+    status: str  # applied, not_found, rejected
+    amount_applied: float = 0.0
+    amount_due: Optional[float] = None
+    amount_paid: Optional[float] = None
+    detail: Optional[str] = None
+
+class BatchCollected(BaseModel):
+    collection_id: str
+    applied_count: int
+    amount_applied: float
+    results: List[BatchCollectItemResult]
+
+class TransactionResponse(BaseModel):
+    id: int
+    loan_id: int
+    payment_id: Optional[int] = None
+    collection_id: str
+    amount: float
+    paid_at: datetime
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class RecentPaymentResponse(BaseModel):
     id: int
     loan_id: int
@@ -123,25 +172,106 @@ class RecentPaymentResponse(BaseModel):
     payment_date: datetime
     payment_method: str = "cash"
 
-@router.get("/{payment_id}", response_model=PaymentResponse)
+@router.post("/collect-batch", response_model=BatchCollected)
+async def collect_payments_batch(
+    batch: BatchCollect,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply a collector's day of collections in one request and one transaction.
+    Each item gets its own result; invalid items do not block the rest.
+    """
+    collection_id, item_results = await payment_crud.collect_batch(
+        db,
+        [(item.payment_id, item.amount, item.paid_at) for item in batch.items],
+        user_id=current_user.id,
+        collection_id=batch.collection_id
+    )
+
+    results = []
+    for r in item_results:
+        a = r.allocation
+        results.append(BatchCollectItemResult(
+            index=r.index,
+            payment_id=r.payment_id,
+            status=r.status,
+            amount_applied=a.applied if a else 0.0,
+            amount_due=a.amount_due if a else None,
+            amount_paid=a.amount_paid if a else None,
+            detail=r.detail
+        ))
+
+    return BatchCollected(
+        collection_id=collection_id,
+        applied_count=sum(1 for r in results if r.status == "applied"),
+        amount_applied=round(sum(r.amount_applied for r in results), 2),
+        results=results
+    )
+
+@router.get("/{payment_id}", response_model=Dict[str, Any])
 async def read_payment(
     payment_id: int, 
+    fields: Tuple[str, ...] = Depends(fields_query(payment_crud.PAYMENT_FIELDS)),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    db_payment = await payment_crud.get_payment(db, payment_id, user_id=current_user.id)
+    db_payment = await payment_crud.get_payment_row(db, payment_id, user_id=current_user.id, fields=fields)
     if db_payment is None:
         raise HTTPException(status_code=404, detail="Payment not found or not owned by user")
     return db_payment
 
-@router.get("/", response_model=List[PaymentResponse])
+@router.get("/", response_model=List[Dict[str, Any]])
 async def read_payments(
     skip: int = 0, 
-    limit: int = 100, 
+    limit: int = Query(100, ge=1, le=500), 
+    sort_by: str = Query("due_date", pattern="^(" + "|".join(payment_crud.PAYMENT_SORT_COLUMNS) + ")$"),
+    descending: bool = False,
+    status: Optional[str] = Query(None, pattern="^(paid|unpaid|overdue)$"),
+    loan_id: Optional[int] = None,
+    borrower_id: Optional[int] = None,
+    term_frequency: Optional[str] = None,
+    repayment_type: Optional[str] = None,
+    loan_status: Optional[str] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    paid_from: Optional[date] = None,
+    paid_to: Optional[date] = None,
+    principal_min: Optional[float] = None,
+    principal_max: Optional[float] = None,
+    outstanding_min: Optional[float] = None,
+    outstanding_max: Optional[float] = None,
+    fields: Tuple[str, ...] = Depends(fields_query(payment_crud.PAYMENT_FIELDS)),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    payments = await payment_crud.get_payments(db, user_id=current_user.id, skip=skip, limit=limit)
+    """
+    Installments filtered by their own status and dates, and by the loan's
+    borrower, terms, principal or outstanding balance.
+    """
+    payments = await payment_crud.get_payments(
+        db,
+        user_id=current_user.id,
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        descending=descending,
+        fields=fields,
+        status=status,
+        loan_id=loan_id,
+        due_from=due_from,
+        due_to=due_to,
+        paid_from=paid_from,
+        paid_to=paid_to,
+        borrower_id=borrower_id,
+        term_frequency=term_frequency,
+        repayment_type=repayment_type,
+        principal_min=principal_min,
+        principal_max=principal_max,
+        outstanding_min=outstanding_min,
+        outstanding_max=outstanding_max,
+        loan_status=loan_status
+    )
     return payments
 
 @router.get("/recent/", response_model=List[RecentPaymentResponse])
@@ -150,71 +280,84 @@ async def get_recent_payments(
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    # Get payments that have been paid (paid_at is not null)
-    query = (
-        select(Payment, Loan, Borrower)
-        .join(Loan, Payment.loan_id == Loan.id)
-        .join(Borrower, Loan.borrower_id == Borrower.id)
-        .where(Payment.paid_at.is_not(None))
-        .where(Payment.user_id == current_user.id)
-        .order_by(desc(Payment.paid_at))
-        .limit(limit)
-    )
-    
-    result = await db.execute(query)
-    recent_payments = []
-    
-    for payment, loan, borrower in result:
-        recent_payments.append(
-            RecentPaymentResponse(
-                id=payment.id,
-                loan_id=payment.loan_id,
-                user_id=payment.user_id,
-                borrower_id=borrower.id,
-                borrower_name=borrower.name,
-                amount_paid=payment.amount_paid,
-                payment_date=payment.paid_at,
-                payment_method="cash"  # Default to cash as payment method isn't stored
-            )
-        )
-    
-    return recent_payments
+    return await dashboard_crud.get_recent_payments(db, current_user.id, limit=limit)
 
-@router.get("/loan/{loan_id}", response_model=List[PaymentSimpleResponse])
+@router.get("/loan/{loan_id}", response_model=List[Dict[str, Any]])
 async def read_payments_by_loan(
     loan_id: int, 
     recalculate: bool = False,
+    fields: Tuple[str, ...] = Depends(fields_query(payment_crud.PAYMENT_FIELDS)),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     # First, verify the loan belongs to the user
-    db_loan = await loan_crud.get_loan(db, loan_id=loan_id, user_id=current_user.id)
-    if not db_loan:
+    if await loan_crud.get_loan_row(db, loan_id, user_id=current_user.id, fields=("id",)) is None:
         raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
         
-    payments = await payment_crud.get_payments_by_loan(db, loan_id=loan_id, user_id=current_user.id)
+    payments = await payment_crud.get_payments_by_loan(db, loan_id=loan_id, user_id=current_user.id, fields=fields)
     
-    correct_amount = None
-    if recalculate:
+    if recalculate and "amount_due" in fields:
         try:
             correct_amount = await calculate_payment_amount(db, loan_id, user_id=current_user.id)
         except Exception as e:
             # Log the error but continue with stored amounts
             print(f"Error calculating payment amount: {e}")
-    
-    result = []
-    for payment_obj in payments:
-        amount_due = correct_amount if correct_amount is not None else payment_obj.amount_due
-        result.append(PaymentSimpleResponse(
-            id=payment_obj.id,
-            loan_id=payment_obj.loan_id,
-            user_id=payment_obj.user_id,
-            due_date=str(payment_obj.due_date),
-            amount_due=amount_due,
-            amount_paid=payment_obj.amount_paid,
-            paid_at=payment_obj.paid_at
-        ))
-    return result
+        else:
+            for payment in payments:
+                payment["amount_due"] = correct_amount
+    return payments
+
+@router.post("/loan/{loan_id}/collect", response_model=LumpSumCollected)
+async def collect_loan_payment(
+    loan_id: int,
+    payment_data: LumpSumCollect,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply a single cash amount across the loan's open installments, oldest first.
+    """
+    db_loan = await loan_crud.get_loan(db, loan_id=loan_id, user_id=current_user.id)
+    if not db_loan:
+        raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
+
+    try:
+        collection_id, allocations = await payment_crud.collect_lump_sum(
+            db, loan_id, payment_data.amount, user_id=current_user.id, paid_at=payment_data.paid_at
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return LumpSumCollected(
+        collection_id=collection_id,
+        loan_id=loan_id,
+        amount_applied=round(sum(a.applied for a in allocations), 2),
+        allocations=[
+            AllocationResponse(
+                payment_id=a.payment_id,
+                due_date=a.due_date,
+                amount_due=a.amount_due,
+                amount_paid=a.amount_paid,
+                amount_applied=a.applied,
+                fully_paid=a.amount_paid >= a.amount_due
+            )
+            for a in allocations
+        ]
+    )
+
+@router.get("/loan/{loan_id}/transactions", response_model=List[TransactionResponse])
+async def read_loan_transactions(
+    loan_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ledger history of every amount applied to the loan's installments.
+    """
+    db_loan = await loan_crud.get_loan(db, loan_id=loan_id, user_id=current_user.id)
+    if not db_loan:
+        raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
+    return await payment_crud.get_transactions_by_loan(db, loan_id=loan_id, user_id=current_user.id)
 
 @router.put("/{payment_id}", response_model=PaymentResponse)
 async def update_payment(
@@ -284,39 +427,19 @@ async def create_payment(
     db_payment = await payment_crud.create_payment(db, payment_data, user_id=current_user.id)
     return db_payment
 
-@router.post("/loan/{loan_id}/recalculate", response_model=Dict[str, Any])
+@router.post("/loan/{loan_id}/recalculate", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def recalculate_loan_payments(
     loan_id: int,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Recalculate all payment schedules for a loan based on its interest_cycle.
+    Queue a recalculation of all payment schedules for a loan based on its
+    interest_cycle. The finished job's result holds the new payment_count.
     """
     # First, verify the loan belongs to the user
     db_loan = await loan_crud.get_loan(db, loan_id=loan_id, user_id=current_user.id)
     if not db_loan:
         raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
     
-    try:
-        # Delete existing payments
-        from sqlmodel import delete
-        await db.execute(delete(Payment).where(Payment.loan_id == loan_id).where(Payment.user_id == current_user.id))
-        
-        # Regenerate schedule (generate_schedule in loan_crud already handles user_id for new payments)
-        await loan_crud.generate_schedule(db, db_loan, user_id=current_user.id)
-        
-        # Fetch the new payments to return (optional, or return a success message)
-        payments_result = await payment_crud.get_payments_by_loan(db, loan_id=loan_id, user_id=current_user.id)
-        
-        return {
-            "success": True,
-            "message": f"Recalculated {len(payments_result)} payments for loan {loan_id}",
-            "loan_id": loan_id,
-            "payment_count": len(payments_result)
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error recalculating payments: {str(e)}"
-        ) 
\ No newline at end of file
+    return await jobs.submit(db, current_user.id, "loan.recalculate_schedule", {"loan_id": loan_id})
@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+
+from app.core.database import get_session
+from app.core.auth import get_current_user, User
+from app.crud import loan as loan_crud
+from app.crud import penalty as penalty_crud
+from app.schemas import ResponseModel
+
+router = APIRouter()
+
+class PenaltyRuleUpdate(BaseModel):
+    grace_days: int = Field(0, ge=0)
+    flat_fee: float = Field(0.0, ge=0)
+    daily_rate_percent: float = Field(0.0, ge=0, le=100)
+    max_penalty: Optional[float] = Field(None, ge=0)
+    max_penalty_percent: Optional[float] = Field(None, ge=0)
+
+class PenaltyRuleResponse(PenaltyRuleUpdate):
+    id: int
+    loan_id: Optional[int] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class PenaltyChargeResponse(BaseModel):
+    payment_id: int
+    charge_date: date
+    amount: float
+
+    class Config:
+        from_attributes = True
+
+async def _require_loan(db: AsyncSession, loan_id: int, user_id: str) -> None:
+    if await loan_crud.get_loan(db, loan_id, user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="Loan not found or not owned by user")
+
+@router.get("/rules", response_model=List[PenaltyRuleResponse])
+async def read_penalty_rules(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """The default rule (loan_id null) first, then per-loan overrides."""
+    return await penalty_crud.get_penalty_rules(db, current_user.id)
+
+@router.put("/rules/default", response_model=PenaltyRuleResponse)
+async def set_default_penalty_rule(
+    rule: PenaltyRuleUpdate,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    return await penalty_crud.set_penalty_rule(db, current_user.id, rule.model_dump())
+
+@router.delete("/rules/default", response_model=ResponseModel)
+async def delete_default_penalty_rule(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    if not await penalty_crud.delete_penalty_rule(db, current_user.id):
+        raise HTTPException(status_code=404, detail="No default penalty rule")
+    return ResponseModel(success=True, message="Penalty rule deleted")
+
+@router.put("/rules/loan/{loan_id}", response_model=PenaltyRuleResponse)
+async def set_loan_penalty_rule(
+    loan_id: int,
+    rule: PenaltyRuleUpdate,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Overrides the default rule for this loan; all zeros exempts the loan."""
+    await _require_loan(db, loan_id, current_user.id)
+    return await penalty_crud.set_penalty_rule(db, current_user.id, rule.model_dump(), loan_id=loan_id)
+
+@router.delete("/rules/loan/{loan_id}", response_model=ResponseModel)
+async def delete_loan_penalty_rule(
+    loan_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    if not await penalty_crud.delete_penalty_rule(db, current_user.id, loan_id=loan_id):
+        raise HTTPException(status_code=404, detail="No penalty rule for this loan")
+    return ResponseModel(success=True, message="Penalty rule deleted")
+
+@router.get("/loan/{loan_id}", response_model=List[PenaltyChargeResponse])
+async def read_loan_penalties(
+    loan_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    await _require_loan(db, loan_id, current_user.id)
+    return await penalty_crud.get_charges_by_loan(db, loan_id, current_user.id)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any
+from datetime import datetime, timezone
+
+from app.core.database import get_session
+from app.core.auth import get_current_user
+from app.core.scheduler import JOBS, LEASE_NAME, leader, next_fire_time
+from app.crud import scheduler_state as state_crud
+from app.models.user import User
+
+router = APIRouter()
+
+@router.get("/jobs", response_model=Dict[str, Any])
+async def read_scheduled_jobs(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The process running scheduled jobs, and for each job its schedule, next
+    fire time and last run: fire time, start lag, duration and outcome.
+    """
+    now = datetime.now(timezone.utc)
+    lease = await state_crud.get_lease(db, LEASE_NAME)
+    states = {state.name: state for state in await state_crud.get_job_states(db)}
+    jobs = []
+    for name, job in JOBS.items():
+        state = states.get(name)
+        fire_time = next_fire_time(job, now)
+        jobs.append({
+            "name": name,
+            "schedule": job.schedule,
+            "next_run_at": fire_time.astimezone(timezone.utc).replace(tzinfo=None) if fire_time else None,
+            "last_scheduled_for": state.last_scheduled_for if state else None,
+            "last_started_at": state.last_started_at if state else None,
+            "last_finished_at": state.last_finished_at if state else None,
+            "last_lag_seconds": state.last_lag_seconds if state else None,
+            "last_duration_seconds": state.last_duration_seconds if state else None,
+            "last_status": state.last_status if state else None,
+            "last_error": state.last_error if state else None,
+            "run_count": state.run_count if state else 0,
+            "failure_count": state.failure_count if state else 0,
+        })
+    return {
+        "leader": lease.holder if lease is not None and lease.expires_at > now.replace(tzinfo=None) else None,
+        "lease_expires_at": lease.expires_at if lease is not None else None,
+        "this_process": leader.holder,
+        "this_process_leads": leader.leading,
+        "jobs": jobs,
+    }
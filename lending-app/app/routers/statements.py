@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+from app.core.database import get_session
+from app.core.auth import get_current_user, User
+from app.core import jobs
+from app.core.job_handlers import statement_archive_path
+from app.crud import job as job_crud
+from app.schemas.job import JobResponse
+
+router = APIRouter()
+
+class StatementRequest(BaseModel):
+    format: Literal["csv", "html", "text"] = "html"
+    month: Optional[str] = Field(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$")  # YYYY-MM, default previous month
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def generate_statements(
+    request: StatementRequest,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue statements for every borrower with an open loan (or one closed
+    during the month). When the job succeeds, download the zip archive from
+    GET /statements/{job_id}/download.
+    """
+    return await jobs.submit(db, current_user.id, "statements.generate", request.model_dump(exclude_none=True))
+
+@router.get("/{job_id}/download")
+async def download_statements(
+    job_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    job = await job_crud.get_job(db, job_id, user_id=current_user.id)
+    if job is None or job.kind != "statements.generate":
+        raise HTTPException(status_code=404, detail="Statement job not found")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Statements are not ready, job is {job.status}")
+    path = statement_archive_path(current_user.id, job.result["file"])
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Statement archive no longer available")
+    return FileResponse(path, media_type="application/zip", filename=job.result["file"])
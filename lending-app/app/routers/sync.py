@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any
+
+from app.core.database import get_session
+from app.core.auth import get_current_user
+from app.models.user import User
+from app.crud import sync as sync_crud
+
+router = APIRouter()
+
+@router.get("", response_model=Dict[str, Any])
+async def read_changes(
+    since: str = "0",
+    limit: int = Query(5000, ge=1, le=5000),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Borrowers, loans and payments changed since the client's last token, plus
+    ids deleted since then. Pass the returned `token` as `since` on the next
+    call; `since=0` returns everything.
+    """
+    try:
+        since_seq = int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+    return await sync_crud.get_changes(db, current_user.id, since=since_seq, limit=limit)
@@ -32,6 +32,10 @@ class LoanResponse(LoanBase):
     id: int
     user_id: str
     created_at: datetime
+    outstanding_amount: float = 0.0
+    paid_installments: int = 0
+    next_due_date: Optional[date] = None
+    last_paid_at: Optional[datetime] = None
     borrower: Optional[BorrowerResponse] = None
     
     class Config:
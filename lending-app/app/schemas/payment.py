@@ -21,6 +21,9 @@ class PaymentResponse(PaymentBase):
     user_id: str
     amount_paid: float
     paid_at: Optional[datetime] = None
+    penalty_amount: float = 0.0
+    principal_due: Optional[float] = None
+    interest_due: Optional[float] = None
     # Remove the loan relationship
     # loan: Optional[LoanResponse] = None
     
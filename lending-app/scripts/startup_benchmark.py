@@ -0,0 +1,65 @@
+"""
+Measure cold start cost in the default and serverless startup modes.
+
+Each run starts a fresh interpreter and reports the time to import
+app.main, to run the startup handlers, and to serve the first and second
+authenticated request. Needs DATABASE_URL and SUPABASE_JWT_SECRET.
+
+    poetry run python scripts/startup_benchmark.py --runs 5 --path /borrowers/
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+from jose import jwt
+token = jwt.encode({"sub": "startup-benchmark", "aud": "authenticated"}, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+headers = {"Authorization": f"Bearer {token}"}
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    client.get(sys.argv[1], headers=headers)
+    first = time.perf_counter()
+    client.get(sys.argv[1], headers=headers)
+    second = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "first_request_ms": (first - started) * 1000,
+    "second_request_ms": (second - first) * 1000,
+}))
+"""
+
+def run_once(serverless: bool, path: str) -> dict:
+    env = dict(os.environ, SERVERLESS="true" if serverless else "false")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, path],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/borrowers/")
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'import':>10}{'startup':>10}{'1st req':>10}{'2nd req':>10}   (median ms of {args.runs})")
+    for serverless in (False, True):
+        runs = [run_once(serverless, args.path) for _ in range(args.runs)]
+        medians = [statistics.median(run[key] for run in runs) for key in ("import_ms", "startup_ms", "first_request_ms", "second_request_ms")]
+        mode = "serverless" if serverless else "default"
+        print(f"{mode:<12}" + "".join(f"{value:>10.1f}" for value in medians))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import tempfile
+from datetime import date
+
+import pytest
+
+# Settings are read at import time, so point them at a scratch SQLite file first
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.gettempdir()}/lending-app-tests.db")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test")
+
+from sqlmodel import SQLModel
+
+import app.main  # registers every model
+from app.core.database import async_session, engine
+from app.crud.borrower import create_borrower
+from app.crud.loan import create_loan
+from app.schemas.borrower import BorrowerCreate
+from app.schemas.loan import LoanCreate
+
+
+@pytest.fixture
+def run():
+    """`run(fn)` awaits `fn(session)` against empty tables and returns its result."""
+    loop = asyncio.new_event_loop()
+
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    async def in_session(fn):
+        async with async_session() as db:
+            return await fn(db)
+
+    loop.run_until_complete(reset())
+    yield lambda fn: loop.run_until_complete(in_session(fn))
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+async def make_loan(db, user_id="user-a", **terms):
+    """A borrower and a loan with its schedule; weekly flat 1000 over 4 weeks unless overridden."""
+    borrower = await create_borrower(db, BorrowerCreate(name="Ann", mobile="1"), user_id)
+    values = {
+        "borrower_id": borrower.id, "principal": 1000, "interest_rate_percent": 10, "term_units": 4,
+        "term_frequency": "weekly", "repayment_type": "flat", "interest_cycle": "monthly",
+        "start_date": date(2026, 1, 1),
+    }
+    return await create_loan(db, LoanCreate(**{**values, **terms}), user_id)
@@ -0,0 +1,57 @@
+from datetime import date, datetime
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from app.crud.loan_balance import repair_loan_balances
+from app.crud.payment import collect_batch, collect_lump_sum
+from app.models.loan import Loan
+from app.models.payment import Payment
+from tests.conftest import make_loan
+
+
+async def _balances(db, loan_id):
+    """(stored, computed from the installments) balance columns of a loan."""
+    loan = (await db.execute(select(Loan).where(Loan.id == loan_id).execution_options(populate_existing=True))).scalar_one()
+    installments = (await db.execute(select(Payment).where(Payment.loan_id == loan_id))).scalars().all()
+    unpaid = [p for p in installments if p.amount_paid < p.amount_due]
+    stored = (loan.outstanding_amount, loan.paid_installments, loan.next_due_date, loan.last_paid_at)
+    computed = (
+        round(sum(p.amount_due - p.amount_paid for p in unpaid), 2),
+        len(installments) - len(unpaid),
+        min((p.due_date for p in unpaid), default=None),
+        max((p.paid_at for p in installments if p.paid_at), default=None),
+    )
+    return stored, computed
+
+
+def test_collections_refresh_the_loan_balance(run):
+    async def scenario(db):
+        loan_id = (await make_loan(db)).id
+        before = await _balances(db, loan_id)
+        await collect_lump_sum(db, loan_id, 300, "user-a", paid_at=datetime(2026, 1, 9))
+        after_lump_sum = await _balances(db, loan_id)
+        last = (await db.execute(select(Payment.id).where(Payment.loan_id == loan_id).order_by(Payment.due_date.desc()))).scalars().first()
+        await collect_batch(db, [(last, 100, datetime(2026, 1, 20))], "user-a")
+        return before, after_lump_sum, await _balances(db, loan_id)
+
+    snapshots = run(scenario)
+    assert all(stored == computed for stored, computed in snapshots)
+    # 1092.32 owed, less both collections; only the oldest installment is settled
+    assert snapshots[-1][0] == (692.32, 1, date(2026, 1, 15), datetime(2026, 1, 20))
+
+
+def test_repair_rewrites_only_drifted_loans(run):
+    async def scenario(db):
+        drifted = (await make_loan(db)).id
+        intact = (await make_loan(db, user_id="user-b")).id
+        await collect_lump_sum(db, drifted, 300, "user-a", paid_at=datetime(2026, 1, 9))
+        await db.execute(update(Loan).where(Loan.id == drifted).values(outstanding_amount=0, paid_installments=4, next_due_date=None))
+        await db.commit()
+        repaired = await repair_loan_balances(db, batch_size=1)
+        return repaired, await repair_loan_balances(db), await _balances(db, drifted), await _balances(db, intact)
+
+    repaired, again, drifted, intact = run(scenario)
+    assert (repaired, again) == (1, 0)
+    assert drifted[0] == drifted[1]
+    assert intact[0] == intact[1]
@@ -0,0 +1,129 @@
+from datetime import date, datetime
+
+import pytest
+from sqlmodel import select
+
+from app.crud import payment as payment_crud
+from app.crud.payment import allocate_amount, collect_batch, collect_lump_sum
+from app.models.collection_batch import CollectionBatch
+from app.models.payment import Payment
+from app.models.payment_transaction import PaymentTransaction
+from tests.conftest import make_loan
+
+
+async def _installments(db, loan_id):
+    result = await db.execute(
+        select(Payment).where(Payment.loan_id == loan_id).order_by(Payment.due_date)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().all()
+
+
+async def _ledger(db):
+    result = await db.execute(select(PaymentTransaction).order_by(PaymentTransaction.id))
+    return result.scalars().all()
+
+
+def test_allocate_amount_fills_oldest_first_and_stops_at_the_amount():
+    paid_at = datetime(2026, 1, 10)
+    installments = [
+        Payment(id=1, loan_id=1, user_id="user-a", due_date=date(2026, 1, 8), amount_due=100, amount_paid=100),
+        Payment(id=2, loan_id=1, user_id="user-a", due_date=date(2026, 1, 15), amount_due=100, amount_paid=40),
+        Payment(id=3, loan_id=1, user_id="user-a", due_date=date(2026, 1, 22), amount_due=100, amount_paid=0),
+        Payment(id=4, loan_id=1, user_id="user-a", due_date=date(2026, 1, 29), amount_due=100, amount_paid=0),
+    ]
+    allocations = allocate_amount(installments, 90, paid_at)
+    assert [(p.id, applied) for p, applied, _ in allocations] == [(2, 60), (3, 30)]
+    assert sum(applied for _, applied, _ in allocate_amount(installments, 1000, paid_at)) == 260
+
+
+def test_collect_lump_sum_rejects_more_than_the_outstanding_balance(run):
+    async def scenario(db):
+        loan_id = (await make_loan(db)).id
+        with pytest.raises(ValueError, match="exceeds the outstanding balance of 1092.32"):
+            await collect_lump_sum(db, loan_id, 1092.33, "user-a")
+        with pytest.raises(ValueError, match="greater than zero"):
+            await collect_lump_sum(db, loan_id, 0, "user-a")
+        untouched = [p.amount_paid for p in await _installments(db, loan_id)]
+        _, allocations = await collect_lump_sum(db, loan_id, 1092.32, "user-a")
+        return untouched, allocations, await _installments(db, loan_id), await _ledger(db)
+
+    untouched, allocations, installments, ledger = run(scenario)
+    assert untouched == [0, 0, 0, 0]
+    assert [a.applied for a in allocations] == [273.08] * 4
+    assert all(p.amount_paid == p.amount_due for p in installments)
+    assert round(sum(entry.amount for entry in ledger), 2) == 1092.32
+
+
+def test_collect_batch_rejects_items_without_blocking_the_rest(run):
+    async def scenario(db):
+        loan = await make_loan(db)
+        other = await make_loan(db, user_id="user-b")
+        first, second, *_ = await _installments(db, loan.id)
+        foreign = (await _installments(db, other.id))[0]
+        _, results = await collect_batch(db, [
+            (first.id, 100, None),
+            (first.id, None, None),         # settles the rest of the same installment
+            (second.id, 9999, None),        # more than is owed
+            (second.id, 0, None),
+            (foreign.id, 10, None),         # another user's installment
+        ], "user-a")
+        return results, await _installments(db, loan.id)
+
+    results, installments = run(scenario)
+    assert [r.status for r in results] == ["applied", "applied", "rejected", "rejected", "not_found"]
+    assert [r.allocation.applied for r in results[:2]] == [100, 173.08]
+    assert installments[0].amount_paid == installments[0].amount_due
+    assert installments[1].amount_paid == 0
+
+
+def test_collect_batch_replay_returns_the_stored_results(run):
+    async def scenario(db):
+        loan = await make_loan(db)
+        first, second, *_ = await _installments(db, loan.id)
+        items = [(first.id, 50, None), (second.id, 9999, None)]
+        applied = await collect_batch(db, items, "user-a", collection_id="day-1")
+        replayed = await collect_batch(db, items, "user-a", collection_id="day-1")
+        return applied, replayed, await _installments(db, loan.id), await _ledger(db)
+
+    applied, replayed, installments, ledger = run(scenario)
+    assert replayed == applied
+    assert installments[0].amount_paid == 50
+    assert [entry.amount for entry in ledger] == [50]
+
+
+def test_collect_batch_lost_race_returns_the_winners_results(run, monkeypatch):
+    async def scenario(db):
+        loan = await make_loan(db)
+        first = (await _installments(db, loan.id))[0]
+        # Another request claimed the key after our lookup found nothing
+        db.add(CollectionBatch(user_id="user-a", collection_id="day-1", results=[
+            {"index": 0, "payment_id": first.id, "status": "rejected", "allocation": None, "detail": "stored"}
+        ]))
+        await db.commit()
+        lookup, calls = payment_crud._stored_batch, []
+
+        async def miss_first(*args):
+            calls.append(args)
+            return None if len(calls) == 1 else await lookup(*args)
+
+        monkeypatch.setattr(payment_crud, "_stored_batch", miss_first)
+        _, results = await collect_batch(db, [(first.id, 50, None)], "user-a", collection_id="day-1")
+        return results, await _ledger(db)
+
+    results, ledger = run(scenario)
+    assert [r.detail for r in results] == ["stored"]
+    assert ledger == []
+
+
+def test_collect_batch_mixes_aware_and_naive_paid_at(run):
+    async def scenario(db):
+        loan = await make_loan(db)
+        first = (await _installments(db, loan.id))[0]
+        aware = datetime.fromisoformat("2026-01-08T10:00:00+08:00")
+        _, results = await collect_batch(db, [(first.id, 10, aware), (first.id, 10, None)], "user-a")
+        return results, await _ledger(db)
+
+    results, ledger = run(scenario)
+    assert [r.status for r in results] == ["applied", "applied"]
+    assert ledger[0].paid_at == datetime(2026, 1, 8, 2, 0)
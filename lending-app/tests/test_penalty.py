@@ -0,0 +1,98 @@
+from datetime import date, datetime
+
+from sqlmodel import select
+
+from app.crud.penalty import accrue_penalties
+from app.models.audit import AuditLog
+from app.models.payment import Payment
+from app.models.penalty import PenaltyAccrual, PenaltyCharge, PenaltyRule
+from tests.conftest import make_loan
+
+
+async def _with_rule(db, set_at=datetime(2025, 12, 1)):
+    """One loan whose first installment fell due on 2026-01-08, and a 1% a day rule."""
+    await make_loan(db)
+    db.add(PenaltyRule(user_id="user-a", daily_rate_percent=1.0, created_at=set_at, updated_at=set_at))
+    await db.commit()
+
+
+async def _charge_dates(db):
+    result = await db.execute(select(PenaltyCharge.charge_date).order_by(PenaltyCharge.charge_date))
+    return result.scalars().all()
+
+
+async def _penalty(db):
+    result = await db.execute(select(Payment.penalty_amount).order_by(Payment.due_date).limit(1))
+    return result.scalar()
+
+
+def test_rerunning_a_day_charges_nothing_new(run):
+    async def scenario(db):
+        await _with_rule(db)
+        first = await accrue_penalties(db, date(2026, 1, 10))
+        again = await accrue_penalties(db, date(2026, 1, 10))
+        return first, again, await _charge_dates(db), await _penalty(db)
+
+    first, again, dates, penalty = run(scenario)
+    assert (first, again) == (1, 0)
+    assert dates == [date(2026, 1, 10)]
+    assert penalty == 2.73
+
+
+def test_catches_up_only_on_days_since_the_last_run(run):
+    async def scenario(db):
+        await _with_rule(db)
+        db.add(PenaltyAccrual(accrued_through=date(2026, 1, 9)))
+        await db.commit()
+        caught_up = await accrue_penalties(db, date(2026, 1, 12))
+        nightly = await accrue_penalties(db, date(2026, 1, 13))
+        return caught_up, nightly, await _charge_dates(db)
+
+    caught_up, nightly, dates = run(scenario)
+    assert (caught_up, nightly) == (3, 1)
+    assert dates == [date(2026, 1, d) for d in (10, 11, 12, 13)]
+
+
+def test_days_without_charges_still_advance_the_watermark(run):
+    async def scenario(db):
+        await _with_rule(db)
+        # Nothing is overdue yet, but the day is still done
+        assert await accrue_penalties(db, date(2026, 1, 5)) == 0
+        watermark = (await db.get(PenaltyAccrual, 1)).accrued_through
+        return watermark, await accrue_penalties(db, date(2026, 1, 9)), await _charge_dates(db)
+
+    watermark, charged, dates = run(scenario)
+    assert watermark == date(2026, 1, 5)
+    assert charged == 1  # 2026-01-09 only; the installment was not overdue on 6-8
+    assert dates == [date(2026, 1, 9)]
+
+
+def test_new_rule_does_not_charge_days_before_it_was_set(run):
+    async def scenario(db):
+        await _with_rule(db, set_at=datetime(2026, 1, 12, 9, 30))
+        db.add(PenaltyAccrual(accrued_through=date(2026, 1, 8)))
+        await db.commit()
+        return await accrue_penalties(db, date(2026, 1, 12)), await _charge_dates(db)
+
+    charged, dates = run(scenario)
+    assert charged == 1
+    assert dates == [date(2026, 1, 12)]
+
+
+def test_penalty_changes_are_audited_per_installment(run):
+    async def scenario(db):
+        await _with_rule(db)
+        await accrue_penalties(db, date(2026, 1, 10))
+        await accrue_penalties(db, date(2026, 1, 11))
+        result = await db.execute(
+            select(AuditLog)
+            .where(AuditLog.entity == "payment")
+            .where(AuditLog.action != "insert")
+            .order_by(AuditLog.id)
+        )
+        return [(log.user_id, log.entity_id, log.action, log.changes) for log in result.scalars().all()]
+
+    assert run(scenario) == [
+        ("user-a", 1, "update", {"penalty_amount": [0.0, 2.73]}),
+        ("user-a", 1, "update", {"penalty_amount": [2.73, 5.46]}),
+    ]
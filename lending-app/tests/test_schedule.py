@@ -0,0 +1,33 @@
+from datetime import date
+
+import pytest
+
+from app.core.schedule import _effective_annual_rate, compute_schedule, effective_annual_rate_percent
+
+
+def test_long_daily_schedule():
+    # 1024+ installments used to overflow the effective rate bisection
+    for term_units in (1023, 1024, 1095, 3660):
+        schedule = compute_schedule(10000, 5, term_units, "daily", "flat", "daily", date(2024, 1, 1))
+        assert len(schedule.installments) == term_units
+        assert schedule.total_payable > 10000
+
+
+def test_effective_rate_of_long_schedule():
+    schedule = compute_schedule(10000, 5, 1095, "daily", "flat", "daily", date(2024, 1, 1))
+    assert effective_annual_rate_percent(schedule, 10000, "daily") > 0
+    schedule = compute_schedule(10000, 1000, 1095, "daily", "flat", "daily", date(2024, 1, 1))
+    assert effective_annual_rate_percent(schedule, 10000, "daily") is None
+
+
+def test_effective_rate():
+    schedule = compute_schedule(12000, 12, 12, "monthly", "amortized", "yearly", date(2024, 1, 1))
+    assert effective_annual_rate_percent(schedule, 12000, "monthly") == pytest.approx(12.68, abs=0.01)
+    zero = compute_schedule(12000, 0, 12, "monthly", "amortized", "yearly", date(2024, 1, 1))
+    assert effective_annual_rate_percent(zero, 12000, "monthly") == 0.0
+
+
+def test_level_installments_match_discounting_each_one():
+    payments = (105.0,) * 3660
+    uneven = payments[:-1] + (105.0000001,)
+    assert _effective_annual_rate(100000, payments, 365) == pytest.approx(_effective_annual_rate(100000, uneven, 365))
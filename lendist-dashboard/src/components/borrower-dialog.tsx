@@ -10,9 +10,7 @@ import { Avatar, AvatarFallback } from "./ui/avatar"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "./ui/table"
 import { Phone, CreditCard, Calendar, ArrowUpRight, Loader2 } from "lucide-react"
 import { useNavigate } from "react-router-dom"
-import { useBorrower, Borrower } from "../hooks/useBorrowers"
-import { useLoansByBorrower } from "../hooks/useLoans"
-import { usePaymentsByBorrower } from "../hooks/usePayments"
+import { useBorrowerOverview, Borrower } from "../hooks/useBorrowers"
 import { formatCurrency } from "../utils/format"
 import { format } from "date-fns"
 
@@ -26,14 +24,17 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
   const navigate = useNavigate()
   const [activeTab, setActiveTab] = useState("overview")
   
-  // Fetch detailed borrower data
-  const { data: borrowerDetails, isLoading: borrowerLoading } = useBorrower(borrower.id);
-  
-  // Fetch borrower's loans
-  const { data: loans, isLoading: loansLoading } = useLoansByBorrower(borrower.id);
-  
-  // Fetch borrower's payments
-  const { data: payments, isLoading: paymentsLoading } = usePaymentsByBorrower(borrower.id);
+  // Borrower, loans and installments in one request
+  const { data: overview, isLoading } = useBorrowerOverview(borrower.id);
+  const borrowerDetails = overview?.borrower;
+  const loans = overview?.loans;
+  const payments = (loans ?? [])
+    .flatMap((loan) =>
+      loan.installments
+        .filter((installment) => installment.paid_at)
+        .map((installment) => ({ ...installment, loan_id: loan.id, payment_date: installment.paid_at as string }))
+    )
+    .sort((a, b) => b.payment_date.localeCompare(a.payment_date));
 
   if (!borrower) return null
 
@@ -91,7 +92,7 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
                   </div>
                   <div className="flex items-center gap-3">
                     <CreditCard className="h-4 w-4 text-muted-foreground" />
-                    <span>{borrowerDetails?.active_loans_count || 0} Active Loans</span>
+                    <span>{overview?.stats.open_loans || 0} Active Loans</span>
                   </div>
                   <div className="flex items-center gap-3">
                     <Calendar className="h-4 w-4 text-muted-foreground" />
@@ -112,7 +113,7 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
 
               <div className="tabs-content-container min-h-[400px]">
                 <TabsContent value="overview" className="space-y-4 h-full">
-                  {borrowerLoading ? (
+                  {isLoading ? (
                     <div className="flex justify-center items-center h-60">
                       <Loader2 className="h-8 w-8 animate-spin text-primary/70" />
                     </div>
@@ -126,15 +127,15 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
                           <div className="grid grid-cols-2 gap-4">
                             <div>
                               <p className="text-sm text-muted-foreground">Total Loan Amount</p>
-                              <p className="text-2xl font-bold">{formatCurrency(borrowerDetails?.total_principal || 0)}</p>
+                              <p className="text-2xl font-bold">{formatCurrency(overview?.stats.total_principal || 0)}</p>
                             </div>
                             <div>
                               <p className="text-sm text-muted-foreground">Active Loans</p>
-                              <p className="text-2xl font-bold">{borrowerDetails?.active_loans_count || 0}</p>
+                              <p className="text-2xl font-bold">{overview?.stats.open_loans || 0}</p>
                             </div>
                             <div>
                               <p className="text-sm text-muted-foreground">Total Loans</p>
-                              <p className="text-2xl font-bold">{borrowerDetails?.total_loans || 0}</p>
+                              <p className="text-2xl font-bold">{overview?.stats.total_loans || 0}</p>
                             </div>
                             <div>
                               <p className="text-sm text-muted-foreground">Repayment Rate</p>
@@ -179,7 +180,7 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
                       <CardTitle>Active Loans</CardTitle>
                     </CardHeader>
                     <CardContent>
-                      {loansLoading ? (
+                      {isLoading ? (
                         <div className="flex justify-center items-center h-60">
                           <Loader2 className="h-8 w-8 animate-spin text-primary/70" />
                         </div>
@@ -240,7 +241,7 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
                       <CardTitle>Payment History</CardTitle>
                     </CardHeader>
                     <CardContent>
-                      {paymentsLoading ? (
+                      {isLoading ? (
                         <div className="flex justify-center items-center h-60">
                           <Loader2 className="h-8 w-8 animate-spin text-primary/70" />
                         </div>
@@ -250,7 +251,7 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
                             <TableRow className="hover:bg-transparent">
                               <TableHead>DATE</TableHead>
                               <TableHead>AMOUNT</TableHead>
-                              <TableHead>METHOD</TableHead>
+                              <TableHead>DUE DATE</TableHead>
                               <TableHead>LOAN</TableHead>
                             </TableRow>
                           </TableHeader>
@@ -259,14 +260,7 @@ export function BorrowerDialog({ borrower, isOpen, onClose }: BorrowerDialogProp
                               <TableRow key={payment.id} className="hover:bg-secondary/50">
                                 <TableCell>{formatDate(payment.payment_date)}</TableCell>
                                 <TableCell className="font-medium">{formatCurrency(payment.amount_paid)}</TableCell>
-                                <TableCell>
-                                  <Badge
-                                    variant="outline"
-                                    className="bg-emerald-500/10 text-emerald-500 border-emerald-500/20"
-                                  >
-                                    {payment.payment_method.replace('_', ' ')}
-                                  </Badge>
-                                </TableCell>
+                                <TableCell>{formatDate(payment.due_date)}</TableCell>
                                 <TableCell>
                                   <Button
                                     variant="ghost"
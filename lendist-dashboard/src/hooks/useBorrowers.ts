@@ -26,6 +26,66 @@ export function useBorrower(id: number) {
   );
 }
 
+export interface BorrowerInstallment {
+  id: number;
+  due_date: string;
+  amount_due: number;
+  amount_paid: number;
+  paid_at?: string | null;
+  penalty_amount: number;
+  principal_due?: number | null;
+  interest_due?: number | null;
+}
+
+export interface BorrowerOverview {
+  borrower: Borrower & {
+    on_time_ratio: number;
+    avg_days_late: number;
+    arrears: number;
+    risk_score: number;
+  };
+  loans: Array<{
+    id: number;
+    principal: number;
+    interest_rate_percent: number;
+    term_units: number;
+    term_frequency: string;
+    repayment_type: string;
+    start_date: string;
+    status: string;
+    outstanding_amount: number;
+    paid_installments: number;
+    next_due_date?: string | null;
+    last_paid_at?: string | null;
+    installments: BorrowerInstallment[];
+  }>;
+  stats: {
+    total_loans: number;
+    open_loans: number;
+    loans_by_status: Record<string, number>;
+    total_principal: number;
+    outstanding_amount: number;
+    overdue_amount: number;
+    overdue_installments: number;
+    penalty_amount: number;
+    total_paid: number;
+    next_due_date?: string | null;
+    last_paid_at?: string | null;
+  };
+  token: string;
+}
+
+// Borrower, loans, installments and totals in one request
+export function useBorrowerOverview(id: number) {
+  return useQuery<BorrowerOverview>(
+    ['borrower', id, 'overview'],
+    () => api.get(`/borrowers/${id}/overview`).then(res => res.data),
+    {
+      enabled: !!id
+    }
+  );
+}
+
 export function useCreateBorrower() {
   const queryClient = useQueryClient();
   
@@ -1,6 +1,7 @@
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { api } from '../api/useApi';
 import { AxiosResponse } from 'axios';
+import { RecentPayment, Payment } from './usePayments';
 
 interface DashboardSummary {
   active_borrowers: number;
@@ -29,7 +30,7 @@ export function useDashboardSummary() {
       }
     },
     {
-      refetchInterval: 1000 * 60 * 5, // Refetch every 5 minutes
+      refetchInterval: 1000 * 60 * 30, // Fallback only, useDashboardStream pushes updates
       retry: 3,
       staleTime: 1000 * 60, // Consider data stale after 1 minute
     }
@@ -51,9 +52,51 @@ export function useExpectedProfit(months: number = 12) {
       }
     },
     {
-      refetchInterval: 1000 * 60 * 5, // Refetch every 5 minutes
+      refetchInterval: 1000 * 60 * 30, // Fallback only, useDashboardStream pushes updates
       retry: 3,
       staleTime: 1000 * 60, // Consider data stale after 1 minute
     }
   );
-} 
\ No newline at end of file
+}
+
+interface DashboardBootstrap {
+  summary: DashboardSummary | null;
+  expected_profit: ExpectedProfitData[] | null;
+  reminders: unknown[] | null;
+  recent_payments: RecentPayment[] | null;
+  overdue_payments: Payment[] | null;
+  errors: Record<string, 'timeout' | 'error'>;
+}
+
+const BOOTSTRAP_PROFIT_MONTHS = 12;
+const BOOTSTRAP_RECENT_LIMIT = 10;
+
+// Loads every dashboard section in one request and seeds the per-section
+// queries, so the widgets render from cache. Sections the server could not
+// load in time are left out and fetched by their own hooks as before.
+export function useDashboardBootstrap() {
+  const queryClient = useQueryClient();
+  return useQuery<DashboardBootstrap, Error>(
+    ['dashboardBootstrap'],
+    async () => {
+      const response: AxiosResponse<DashboardBootstrap> = await api.get('/dashboard/bootstrap', {
+        params: { months: BOOTSTRAP_PROFIT_MONTHS, recent_limit: BOOTSTRAP_RECENT_LIMIT }
+      });
+      return response.data;
+    },
+    {
+      retry: false,
+      staleTime: 1000 * 60,
+      onSuccess: (data) => {
+        if (data.summary) queryClient.setQueryData(['dashboardSummary'], data.summary);
+        if (data.expected_profit) queryClient.setQueryData(['expectedProfit', BOOTSTRAP_PROFIT_MONTHS], data.expected_profit);
+        if (data.reminders) queryClient.setQueryData(['remindersToday'], data.reminders);
+        if (data.recent_payments) queryClient.setQueryData(['payments', 'recent', BOOTSTRAP_RECENT_LIMIT], data.recent_payments);
+      },
+      onError: (error) => {
+        console.error('Failed to fetch dashboard bootstrap:', error);
+      }
+    }
+  );
+}
+
@@ -0,0 +1,52 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { api } from '../api/useApi';
+import { supabase } from '../supabaseClient';
+
+const RECONNECT_DELAY_MS = 5000;
+
+// Subscribes to /events/dashboard and patches the cached dashboard queries,
+// so the page stays fresh without polling.
+export function useDashboardStream() {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    let source: EventSource | null = null;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const connect = async () => {
+      const { data: { session } } = await supabase.auth.getSession();
+      if (closed || !session?.access_token) return;
+
+      const url = `${api.defaults.baseURL}/events/dashboard?access_token=${encodeURIComponent(session.access_token)}`;
+      source = new EventSource(url);
+
+      source.addEventListener('summary', (event) => {
+        const delta = JSON.parse((event as MessageEvent).data);
+        queryClient.setQueryData(['dashboardSummary'], (previous: object | undefined) => ({ ...(previous ?? {}), ...delta }));
+      });
+
+      source.addEventListener('changed', () => {
+        queryClient.invalidateQueries(['expectedProfit']);
+        queryClient.invalidateQueries(['remindersToday']);
+      });
+
+      // Reconnect with a fresh token instead of letting EventSource retry an expired one
+      source.onerror = () => {
+        source?.close();
+        if (!closed) {
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      source?.close();
+    };
+  }, [queryClient]);
+}
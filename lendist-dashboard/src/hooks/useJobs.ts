@@ -0,0 +1,54 @@
+import { useQuery } from '@tanstack/react-query';
+import { api } from '../api/useApi';
+import { AxiosResponse } from 'axios';
+
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+
+export interface Job<R = Record<string, unknown>> {
+  id: string;
+  kind: string;
+  status: JobStatus;
+  params: Record<string, unknown>;
+  progress: number;
+  progress_message: string | null;
+  result: R | null;
+  error: string | null;
+  attempts: number;
+  max_attempts: number;
+  cancel_requested: boolean;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+const FINISHED: JobStatus[] = ['succeeded', 'failed', 'cancelled'];
+
+export const isFinished = (job: Job) => FINISHED.includes(job.status);
+
+// Polls GET /jobs/{id} until the job finishes; rejects unless it succeeded
+export async function waitForJob<R = Record<string, unknown>>(job: Job<R>, intervalMs = 1000): Promise<Job<R>> {
+  let current = job;
+  while (!isFinished(current)) {
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+    const response: AxiosResponse<Job<R>> = await api.get(`/jobs/${current.id}`);
+    current = response.data;
+  }
+  if (current.status !== 'succeeded') {
+    throw new Error(current.error ?? `Job ${current.status}`);
+  }
+  return current;
+}
+
+export function useJob(jobId: string | null) {
+  return useQuery<Job, Error>(
+    ['job', jobId],
+    async () => {
+      const response: AxiosResponse<Job> = await api.get(`/jobs/${jobId}`);
+      return response.data;
+    },
+    {
+      enabled: !!jobId,
+      refetchInterval: (job) => (job && isFinished(job) ? false : 1000),
+    }
+  );
+}
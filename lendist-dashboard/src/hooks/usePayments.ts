@@ -1,6 +1,7 @@
 import { useMutation, useQueryClient, useQuery } from '@tanstack/react-query';
 import { api } from '../api/useApi';
 import { AxiosResponse } from 'axios';
+import { Job, waitForJob } from './useJobs';
 
 export interface Payment {
   id: number;
@@ -122,8 +123,9 @@ export function useUpdatePayment() {
 export function useRecalculatePayments() {
   const queryClient = useQueryClient();
   
-  return useMutation<unknown, Error, number>(
-    (loanId: number) => api.post(`/payments/loan/${loanId}/recalculate`).then(res => res.data),
+  return useMutation<Job, Error, number>(
+    // The server answers 202 with a job; resolve once it has finished
+    (loanId: number) => api.post<Job>(`/payments/loan/${loanId}/recalculate`).then(res => waitForJob(res.data)),
     {
       onSuccess: (data, loanId) => {
         // Invalidate related queries
@@ -22,7 +22,7 @@ export function useReminders() {
       }
     },
     {
-      refetchInterval: 1000 * 60 * 15, // Refetch every 15 minutes
+      refetchInterval: 1000 * 60 * 30, // Fallback only, useDashboardStream pushes updates
       retry: 3,
       staleTime: 1000 * 60 * 5, // Consider data stale after 5 minutes
     }
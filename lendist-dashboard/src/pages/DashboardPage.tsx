@@ -6,11 +6,16 @@ import { Header } from "../components/header";
 import KPICards from '../components/KPICards';
 import AlertsTab from '../components/AlertsTab';
 import ProfitChart from '../components/ProfitChart';
+import { useDashboardStream } from '../hooks/useDashboardStream';
+import { useDashboardBootstrap } from '../hooks/useDashboard';
 
 export default function DashboardPage() {
   const { user, signOut, isLoading } = useAuth();
+  useDashboardStream();
+  // Widgets mount once the bootstrap settles and read its sections from cache
+  const { isLoading: bootstrapLoading } = useDashboardBootstrap();
 
-  if (isLoading) {
+  if (isLoading || bootstrapLoading) {
     return (
       <div className="flex h-screen items-center justify-center">
         <p>Loading...</p>